@@ -0,0 +1,38 @@
+"""
+Add a unique index on attendance (student_id, date) and an index on date.
+
+Revision ID: attendance_student_date_unique
+Revises: face_image_storage
+Create Date: 2025-05-06
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'attendance_student_date_unique'
+down_revision = 'face_image_storage'
+branch_labels = None
+depends_on = None
+
+attendance = sa.table(
+    'attendance',
+    sa.column('id', sa.Integer),
+    sa.column('student_id', sa.Integer),
+    sa.column('date', sa.Date),
+)
+
+def upgrade():
+    # Keep the first check-in of any duplicated (student_id, date) pair so the unique index can be built
+    first_ids = (
+        sa.select(sa.func.min(attendance.c.id))
+        .group_by(attendance.c.student_id, attendance.c.date)
+        .scalar_subquery()
+    )
+    op.execute(attendance.delete().where(attendance.c.id.not_in(first_ids)))
+
+    op.create_index('uq_attendance_student_date', 'attendance', ['student_id', 'date'], unique=True)
+    op.create_index(op.f('ix_attendance_date'), 'attendance', ['date'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_attendance_date'), table_name='attendance')
+    op.drop_index('uq_attendance_student_date', table_name='attendance')
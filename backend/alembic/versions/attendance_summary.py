@@ -0,0 +1,74 @@
+"""
+Add the attendance_summary rollup table and backfill it from attendance.
+
+Revision ID: attendance_summary
+Revises: attendance_student_date_unique
+Create Date: 2025-05-08
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'attendance_summary'
+down_revision = 'attendance_student_date_unique'
+branch_labels = None
+depends_on = None
+
+attendance = sa.table(
+    'attendance',
+    sa.column('student_id', sa.Integer),
+    sa.column('date', sa.Date),
+    sa.column('status', sa.String),
+)
+students = sa.table(
+    'students',
+    sa.column('id', sa.Integer),
+    sa.column('batch_id', sa.Integer),
+)
+
+def upgrade():
+    summary = op.create_table(
+        'attendance_summary',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_attendance_summary_id'), 'attendance_summary', ['id'], unique=False)
+    op.create_index(
+        'uq_attendance_summary_key', 'attendance_summary', ['student_id', 'batch_id', 'month', 'status'], unique=True
+    )
+    op.create_index('ix_attendance_summary_batch_month', 'attendance_summary', ['batch_id', 'month'], unique=False)
+
+    # Backfill with the current batch of each student
+    year = sa.extract('year', attendance.c.date)
+    month = sa.extract('month', attendance.c.date)
+    batch_id = sa.func.coalesce(students.c.batch_id, 0)
+    rows = op.get_bind().execute(
+        sa.select(attendance.c.student_id, batch_id, year, month, attendance.c.status, sa.func.count())
+        .select_from(attendance.outerjoin(students, students.c.id == attendance.c.student_id))
+        .group_by(attendance.c.student_id, batch_id, year, month, attendance.c.status)
+    ).all()
+    if rows:
+        op.bulk_insert(summary, [
+            {
+                'student_id': row[0],
+                'batch_id': row[1],
+                'month': date(int(row[2]), int(row[3]), 1),
+                'status': row[4],
+                'count': row[5],
+            }
+            for row in rows
+        ])
+
+def downgrade():
+    op.drop_index('ix_attendance_summary_batch_month', table_name='attendance_summary')
+    op.drop_index('uq_attendance_summary_key', table_name='attendance_summary')
+    op.drop_index(op.f('ix_attendance_summary_id'), table_name='attendance_summary')
+    op.drop_table('attendance_summary')
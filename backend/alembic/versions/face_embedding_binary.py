@@ -0,0 +1,61 @@
+"""
+Store face embeddings as packed float32 bytes instead of JSON/CSV text.
+
+Revision ID: face_embedding_binary
+Revises: add_gender_to_users
+Create Date: 2025-05-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.embedding_codec import encode_embedding, format_embedding, parse_embedding
+
+# revision identifiers, used by Alembic.
+revision = 'face_embedding_binary'
+down_revision = 'add_gender_to_users'
+branch_labels = None
+depends_on = None
+
+face_images = sa.table(
+    'face_images',
+    sa.column('id', sa.Integer),
+    sa.column('embedding', sa.String),
+    sa.column('embedding_vector', sa.LargeBinary),
+)
+
+def upgrade():
+    op.add_column('face_images', sa.Column('embedding_vector', sa.LargeBinary(), nullable=True))
+
+    # Convert existing text embeddings (JSON arrays or comma-separated floats)
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(face_images.c.id, face_images.c.embedding)).fetchall()
+    for face_id, embedding in rows:
+        vector = parse_embedding(embedding)
+        if vector is None:
+            continue
+        conn.execute(
+            face_images.update()
+            .where(face_images.c.id == face_id)
+            .values(embedding_vector=encode_embedding(vector))
+        )
+
+    with op.batch_alter_table('face_images') as batch_op:
+        batch_op.drop_column('embedding')
+
+def downgrade():
+    op.add_column('face_images', sa.Column('embedding', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(face_images.c.id, face_images.c.embedding_vector)).fetchall()
+    for face_id, data in rows:
+        embedding = format_embedding(data)
+        if embedding is None:
+            continue
+        conn.execute(
+            face_images.update()
+            .where(face_images.c.id == face_id)
+            .values(embedding=embedding)
+        )
+
+    with op.batch_alter_table('face_images') as batch_op:
+        batch_op.drop_column('embedding_vector')
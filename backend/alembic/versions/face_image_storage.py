@@ -0,0 +1,81 @@
+"""
+Move face image payloads out of face_images into content-addressed file storage.
+
+Revision ID: face_image_storage
+Revises: face_embedding_binary
+Create Date: 2025-05-03
+"""
+import base64
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.settings import settings
+from app.services.file_storage_service import FileStorageService
+
+# revision identifiers, used by Alembic.
+revision = 'face_image_storage'
+down_revision = 'face_embedding_binary'
+branch_labels = None
+depends_on = None
+
+face_images = sa.table(
+    'face_images',
+    sa.column('id', sa.Integer),
+    sa.column('image_data', sa.String),
+    sa.column('image_path', sa.String),
+)
+
+def upgrade():
+    op.add_column('face_images', sa.Column('image_path', sa.String(), nullable=True))
+
+    # Write each stored image to disk one row at a time to keep memory flat
+    conn = op.get_bind()
+    face_ids = [row[0] for row in conn.execute(sa.select(face_images.c.id)).fetchall()]
+    for face_id in face_ids:
+        image_data = conn.execute(
+            sa.select(face_images.c.image_data).where(face_images.c.id == face_id)
+        ).scalar()
+        if not image_data:
+            continue
+        if ',' in image_data:
+            image_data = image_data.split(',', 1)[1]
+        try:
+            content = base64.b64decode(image_data)
+        except Exception:
+            continue
+        image_path = FileStorageService.save_content_addressed(
+            content,
+            ext=FileStorageService.image_extension(content),
+            max_size_mb=None,
+            base_dir=settings.FACE_IMAGE_DIR
+        )
+        conn.execute(
+            face_images.update()
+            .where(face_images.c.id == face_id)
+            .values(image_path=image_path)
+        )
+
+    with op.batch_alter_table('face_images') as batch_op:
+        batch_op.drop_column('image_data')
+
+def downgrade():
+    op.add_column('face_images', sa.Column('image_data', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(face_images.c.id, face_images.c.image_path)).fetchall()
+    for face_id, image_path in rows:
+        if not image_path:
+            continue
+        try:
+            content = FileStorageService.read_file(image_path, base_dir=settings.FACE_IMAGE_DIR)
+        except FileNotFoundError:
+            continue
+        conn.execute(
+            face_images.update()
+            .where(face_images.c.id == face_id)
+            .values(image_data=base64.b64encode(content).decode('utf-8'))
+        )
+
+    with op.batch_alter_table('face_images') as batch_op:
+        batch_op.drop_column('image_path')
@@ -1,27 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Path, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_db, get_async_db
-import face_recognition
+from app.db.session import get_db, get_async_db, AsyncSessionLocal
 import numpy as np
-from PIL import Image
-import io
 import base64
-from datetime import datetime
+import json
+from datetime import datetime, date as date_type
 
 router = APIRouter()
 
-from app.services import attendance_service, face_service
-from app.schemas.attendance import AttendanceCreate
+from app.services import attendance_service, face_service, export_service
+from app.services.face_index import face_index
+from app.services.face_compute import face_compute
+from app.services.attendance_buffer import attendance_buffer
+from app.services.attendance_events import attendance_events
+from app.core.embedding_codec import parse_embedding
+from app.core.settings import settings
+from app.schemas.attendance import AttendanceCreate, AttendanceStatus
 from app.core.dependencies import get_current_user, require_role
 from app.db import models
-from fastapi import Depends, Body, Path, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from typing import List, Literal, Optional, Tuple, Union
+
+# Maximum face distance accepted as a match for check-in
+FACE_MATCH_THRESHOLD = 0.6
 
-from typing import Optional
 class FaceCheckinRequest(BaseModel):
     image: Optional[str] = None  # base64-encoded image
     embedding: Optional[str] = None  # embedding from client
+    batch_id: Optional[int] = None  # only match students of this batch
 
 class FaceCheckinResponse(BaseModel):
     success: bool
@@ -54,8 +64,8 @@ async def check_in(
             detail="Students can only check in for themselves."
         )
     
-    # Create attendance record
-    db_attendance = await attendance_service.check_in_async(db, attendance)
+    # Create attendance record (acknowledged before it is written when the write-behind buffer is enabled)
+    db_attendance = await attendance_buffer.check_in_async(db, attendance)
     
     if not db_attendance:
         raise HTTPException(
@@ -79,7 +89,8 @@ async def check_in(
     responses={
         200: {"description": "Face check-in successful."},
         400: {"description": "Face not recognized or already checked in."},
-        415: {"description": "Invalid image format."}
+        415: {"description": "Invalid image format."},
+        503: {"description": "Face recognition is busy; retry after the Retry-After delay."}
     },
     response_description="Result of face check-in."
 )
@@ -92,67 +103,55 @@ async def face_checkin(
     try:
         # Prefer embedding from client if provided
         if payload.embedding:
-            try:
-                import json
-                emb = json.loads(payload.embedding) if payload.embedding.strip().startswith("[") else [float(x) for x in payload.embedding.split(",")]
-                if not isinstance(emb, list) or len(emb) < 10:
-                    raise ValueError
-                face_encoding = np.array(emb)
-            except Exception:
+            face_encoding = parse_embedding(payload.embedding)
+            if face_encoding is None:
                 raise HTTPException(status_code=400, detail="Invalid embedding format.")
         elif payload.image:
-            # Fallback: extract embedding from image
+            # Fallback: extract embedding from image in the face compute pool
             image_data = payload.image.split(',')[1] if ',' in payload.image else payload.image
             image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image_array = np.array(image)
-            face_locations = face_recognition.face_locations(image_array)
-            if not face_locations:
+            face_result = await face_compute.extract_embedding(image_bytes)
+            if not face_result.face_count:
                 raise HTTPException(status_code=400, detail="No face detected in the image")
-            if len(face_locations) > 1:
+            if face_result.face_count > 1:
                 raise HTTPException(status_code=400, detail="Multiple faces detected. Please upload an image with only one face.")
-            face_encoding = face_recognition.face_encodings(image_array, face_locations)[0]
+            face_encoding = np.array(face_result.embedding)
         else:
             raise HTTPException(status_code=400, detail="No image or embedding provided.")
         
-        # Get all stored face images for comparison
-        stored_faces = await face_service.FaceService.get_all_face_images_async(db)
-        if not stored_faces:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No registered faces found in the system")
-        
-        # Compare with stored face encodings
-        best_match = None
-        min_distance = float('inf')
+        # Compare with stored face encodings in one batched distance computation
+        await face_index.ensure_loaded_async(db)
+        matches = face_index.search(face_encoding, k=1, batch_id=payload.batch_id)
+        if not matches:
+            detail = "No registered faces found for this batch" if payload.batch_id else "No registered faces found in the system"
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
         
-        for stored_face in stored_faces:
-            # Convert stored embedding from string to numpy array
-            stored_encoding = np.array([float(x) for x in stored_face.embedding.split(',')])
-            distance = face_recognition.face_distance([stored_encoding], face_encoding)[0]
-            
-            if distance < min_distance:
-                min_distance = distance
-                best_match = stored_face
+        _, matched_user_id, min_distance = matches[0]
         
-        # Check if the best match is good enough (threshold = 0.6)
-        if min_distance > 0.6:
+        # Check if the best match is good enough
+        if min_distance > FACE_MATCH_THRESHOLD:
             raise HTTPException(status_code=400, detail="Face not recognized")
         
+        # Faces are enrolled per user; attendance is recorded per student
+        result = await db.execute(select(models.Student.id).where(models.Student.user_id == matched_user_id))
+        student_id = result.scalar()
+        if student_id is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Matched user is not a student")
+        
         # Create attendance record
         attendance = AttendanceCreate(
-            student_id=best_match.user_id,
+            student_id=student_id,
             date=datetime.now().date(),
             status="present"
         )
         
-        db_attendance = await attendance_service.check_in_async(db, attendance)
+        db_attendance = await attendance_buffer.check_in_async(db, attendance)
         if not db_attendance:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already checked in for today")
         
         return FaceCheckinResponse(
             success=True,
-            message=f"Face check-in successful for student {best_match.user_id}",
+            message=f"Face check-in successful for student {student_id}",
             attendance_id=db_attendance.id
         )
         
@@ -161,28 +160,333 @@ async def face_checkin(
             raise e
         raise HTTPException(status_code=400, detail=str(e))
 
+# Maximum number of faces accepted by one batch check-in request
+MAX_BATCH_CHECKIN_ITEMS = 500
+
+class FaceBatchCheckinItem(BaseModel):
+    image: Optional[str] = None  # base64-encoded image
+    embedding: Optional[str] = None  # embedding from client
+
+class FaceBatchCheckinRequest(BaseModel):
+    items: List[FaceBatchCheckinItem] = Field(..., min_length=1, max_length=MAX_BATCH_CHECKIN_ITEMS)
+    date: Optional[date_type] = None  # defaults to today
+    status: str = "present"
+    batch_id: int  # only students of this batch are matched and checked in
+
+class FaceBatchCheckinResult(BaseModel):
+    index: int
+    status: Literal["recognized", "duplicate", "unknown", "invalid"]
+    student_id: int | None = None
+    user_id: int | None = None
+    distance: float | None = None
+    attendance_id: int | None = None
+    message: str | None = None
+
+class FaceBatchCheckinResponse(BaseModel):
+    date: str
+    recognized: int
+    duplicate: int
+    unknown: int
+    invalid: int
+    results: List[FaceBatchCheckinResult]
+
+async def _require_own_batch(db: AsyncSession, batch_id: int, current_user: models.User) -> None:
+    """Raise 404 if the batch does not exist and 403 if the current instructor does not teach it."""
+    result = await db.execute(
+        select(models.Batch.id, models.Instructor.user_id)
+        .outerjoin(models.Instructor, models.Instructor.id == models.Batch.instructor_id)
+        .where(models.Batch.id == batch_id)
+    )
+    batch = result.first()
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    if batch.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Instructors can only mark attendance for their own batches"
+        )
+
+@router.post(
+    '/face-checkin/batch',
+    tags=["Attendance", "Facial Recognition"],
+    summary="Check in many students via facial recognition",
+    description="Kiosk endpoint: submit many face images or embeddings in one request for one of the instructor's "
+                "batches. All faces are matched against the batch's students in one matrix operation and all "
+                "attendance rows are written in one transaction. Each item is reported as recognized, duplicate "
+                "(already checked in), unknown (no matching student of the batch) or invalid.",
+    response_model=FaceBatchCheckinResponse,
+    responses={
+        200: {"description": "Per-item check-in results."},
+        403: {"description": "Not the instructor of this batch."},
+        404: {"description": "Batch not found."},
+        503: {"description": "Face recognition is busy; retry after the Retry-After delay."}
+    },
+    response_description="Per-item results of the batch face check-in."
+)
+async def face_checkin_batch(
+    payload: FaceBatchCheckinRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_role("instructor"))
+):
+    """Check in many students at once by matching their faces."""
+    await _require_own_batch(db, payload.batch_id, current_user)
+    
+    checkin_date = payload.date or datetime.now().date()
+    results = [FaceBatchCheckinResult(index=i, status="invalid") for i in range(len(payload.items))]
+    embeddings = {}  # {item index: embedding}
+    
+    # Client-provided embeddings
+    image_indexes = []
+    image_payloads = []
+    for i, item in enumerate(payload.items):
+        if item.embedding:
+            embedding = parse_embedding(item.embedding)
+            if embedding is None:
+                results[i].message = "Invalid embedding format."
+            else:
+                embeddings[i] = embedding
+        elif item.image:
+            try:
+                image_data = item.image.split(',')[1] if ',' in item.image else item.image
+                image_payloads.append(base64.b64decode(image_data))
+                image_indexes.append(i)
+            except Exception:
+                results[i].message = "Invalid image format."
+        else:
+            results[i].message = "No image or embedding provided."
+    
+    # Images go through the face compute pool as one batch
+    if image_payloads:
+        face_results = await face_compute.extract_embeddings(image_payloads)
+        for i, face_result in zip(image_indexes, face_results):
+            if face_result.error:
+                results[i].message = face_result.error
+            elif not face_result.face_count:
+                results[i].message = "No face detected in the image"
+            elif face_result.face_count > 1:
+                results[i].message = "Multiple faces detected. Please upload an image with only one face."
+            else:
+                embeddings[i] = np.array(face_result.embedding)
+    
+    if embeddings:
+        # Match every probe against the stored embeddings in one matrix operation
+        await face_index.ensure_loaded_async(db)
+        probe_indexes = list(embeddings.keys())
+        matches = face_index.search_batch(
+            np.stack([embeddings[i] for i in probe_indexes]), k=1, batch_id=payload.batch_id
+        )
+        
+        matched = {}  # {item index: (user_id, distance)}
+        for i, item_matches in zip(probe_indexes, matches):
+            if item_matches and item_matches[0][2] <= FACE_MATCH_THRESHOLD:
+                matched[i] = (item_matches[0][1], item_matches[0][2])
+            else:
+                results[i].status = "unknown"
+                results[i].distance = item_matches[0][2] if item_matches else None
+                results[i].message = "Face not recognized"
+        
+        # Resolve matched users to students of the batch with a single query
+        user_ids = {user_id for user_id, _ in matched.values()}
+        student_by_user = {}
+        if user_ids:
+            result = await db.execute(
+                select(models.Student.id, models.Student.user_id).where(
+                    models.Student.user_id.in_(user_ids),
+                    models.Student.batch_id == payload.batch_id
+                )
+            )
+            student_by_user = {row.user_id: row.id for row in result}
+        
+        checkin_indexes = []
+        checkins = []
+        for i, (user_id, distance) in matched.items():
+            results[i].user_id = user_id
+            results[i].distance = distance
+            student_id = student_by_user.get(user_id)
+            if student_id is None:
+                results[i].status = "unknown"
+                results[i].message = "Matched user is not a student of this batch"
+                continue
+            results[i].student_id = student_id
+            checkin_indexes.append(i)
+            checkins.append(AttendanceCreate(student_id=student_id, date=checkin_date, status=payload.status))
+        
+        # Insert all attendance rows in one transaction
+        records = await attendance_service.bulk_check_in_async(db, checkins)
+        for i, record in zip(checkin_indexes, records):
+            if record is None:
+                results[i].status = "duplicate"
+                results[i].message = "Already checked in for this date"
+            else:
+                results[i].status = "recognized"
+                results[i].attendance_id = record.id
+    
+    return FaceBatchCheckinResponse(
+        date=str(checkin_date),
+        recognized=sum(r.status == "recognized" for r in results),
+        duplicate=sum(r.status == "duplicate" for r in results),
+        unknown=sum(r.status == "unknown" for r in results),
+        invalid=sum(r.status == "invalid" for r in results),
+        results=results
+    )
+
+# Maximum number of students marked by one batch attendance request
+MAX_BATCH_MARK_ITEMS = 1000
+
+class BatchAttendanceMark(BaseModel):
+    student_id: int
+    status: AttendanceStatus = "present"
+
+class BatchAttendanceRequest(BaseModel):
+    date: Optional[date_type] = None  # defaults to today
+    records: List[BatchAttendanceMark] = Field(..., min_length=1, max_length=MAX_BATCH_MARK_ITEMS)
 
-from typing import List
+class BatchAttendanceResult(BaseModel):
+    student_id: int
+    result: Literal["created", "updated", "unchanged", "not_in_batch"]
+    attendance_id: int | None = None
+
+class BatchAttendanceResponse(BaseModel):
+    batch_id: int
+    date: str
+    created: int
+    updated: int
+    unchanged: int
+    not_in_batch: int
+    results: List[BatchAttendanceResult]
+
+@router.post(
+    '/batch/{batch_id}',
+    tags=["Attendance"],
+    summary="Mark attendance for students of a batch",
+    description="Manual roll call: record the status of many students of a batch for one date in a single "
+                "transaction. Existing attendance on that date is overwritten. Students outside the batch are "
+                "reported as not_in_batch and left untouched.",
+    response_model=BatchAttendanceResponse,
+    responses={
+        200: {"description": "Per-student results."},
+        400: {"description": "A student appears more than once."},
+        403: {"description": "Not the instructor of this batch."},
+        404: {"description": "Batch not found."}
+    },
+    response_description="Per-student results of the roll call."
+)
+async def mark_batch_attendance(
+    payload: BatchAttendanceRequest,
+    batch_id: int = Path(..., description="The ID of the batch"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_role("instructor"))
+):
+    """Mark attendance for many students of a batch at once."""
+    await _require_own_batch(db, batch_id, current_user)
+    
+    student_ids = [record.student_id for record in payload.records]
+    if len(set(student_ids)) != len(student_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each student can only be marked once")
+    
+    attendance_date = payload.date or datetime.now().date()
+    results = await attendance_service.mark_batch_attendance_async(
+        db, batch_id, attendance_date, [(record.student_id, record.status) for record in payload.records]
+    )
+    
+    return BatchAttendanceResponse(
+        batch_id=batch_id,
+        date=str(attendance_date),
+        created=sum(r["result"] == "created" for r in results),
+        updated=sum(r["result"] == "updated" for r in results),
+        unchanged=sum(r["result"] == "unchanged" for r in results),
+        not_in_batch=sum(r["result"] == "not_in_batch" for r in results),
+        results=results
+    )
+
+class TodayCheckin(BaseModel):
+    student_id: int
+    status: str
+
+class TodayBatchAttendance(BaseModel):
+    batch_id: int
+    date: str
+    checked_in: int
+    students: List[TodayCheckin]
+
+@router.get(
+    '/today/batch/{batch_id}',
+    tags=["Attendance"],
+    summary="Get today's check-ins of a batch",
+    description="Returns the students of a batch who checked in today, served from memory while today's "
+                "attendance is loaded (ATTENDANCE_TODAY_CACHE).",
+    response_model=TodayBatchAttendance,
+    responses={
+        200: {"description": "Today's check-ins returned."},
+        403: {"description": "Only admins and instructors can view batch attendance."}
+    },
+    response_description="Today's check-ins of the batch."
+)
+async def today_batch_attendance(
+    batch_id: int = Path(..., description="The ID of the batch"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the students of a batch who checked in today."""
+    if current_user.role not in ["admin", "instructor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and instructors can view batch attendance"
+        )
+    roster = await attendance_service.get_today_roster_async(db, batch_id)
+    return TodayBatchAttendance(
+        batch_id=batch_id,
+        date=str(datetime.now().date()),
+        checked_in=len(roster),
+        students=[TodayCheckin(student_id=student_id, status=s) for student_id, s in sorted(roster.items())]
+    )
+
+# Attendance history page size (default and maximum)
+HISTORY_DEFAULT_LIMIT = 100
+HISTORY_MAX_LIMIT = 1000
 
 class AttendanceHistoryRecord(BaseModel):
     id: int
     date: str
     status: str
 
+def _encode_history_cursor(record: models.Attendance) -> str:
+    """Opaque keyset cursor pointing at the (date, id) of a history record."""
+    return base64.urlsafe_b64encode(f"{record.date.isoformat()}|{record.id}".encode()).decode()
+
+def _decode_history_cursor(cursor: str) -> Tuple[date_type, int]:
+    try:
+        date_part, id_part = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date_type.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
 @router.get(
     '/history/{student_id}',
     tags=["Attendance"],
     summary="Get attendance history for a student",
-    description="Returns a list of attendance records for the specified student.",
-    response_model=List[AttendanceHistoryRecord],
+    description=(
+        "Returns attendance records for the specified student, newest first. "
+        "Filter with `from`/`to` dates and page with `limit`; when more records exist the "
+        "`X-Next-Cursor` response header holds the cursor for the next page. "
+        "With `compact=true` each record is a `[date, status]` pair."
+    ),
+    response_model=Union[List[AttendanceHistoryRecord], List[Tuple[str, str]]],
     responses={
         200: {"description": "Attendance history returned."},
+        400: {"description": "Invalid cursor or date range."},
         403: {"description": "Students can only view their own attendance."}
     },
     response_description="List of attendance records."
 )
 async def attendance_history(
+    response: Response,
     student_id: int = Path(..., description="The ID of the student"),
+    from_date: Optional[date_type] = Query(None, alias="from", description="Only records on or after this date"),
+    to_date: Optional[date_type] = Query(None, alias="to", description="Only records on or before this date"),
+    limit: int = Query(HISTORY_DEFAULT_LIMIT, ge=1, le=HISTORY_MAX_LIMIT, description="Maximum number of records"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    compact: bool = Query(False, description="Return [date, status] pairs instead of objects"),
     db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -196,9 +500,246 @@ async def attendance_history(
             detail="You can only view your own attendance unless you are an admin or instructor"
         )
     
-    records = await attendance_service.attendance_history_async(db, student_id)
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'")
+    
+    before_date, before_id = _decode_history_cursor(cursor) if cursor else (None, None)
+    
+    # Fetch one extra record to know whether there is a next page
+    records = await attendance_service.attendance_history_async(
+        db, student_id,
+        from_date=from_date,
+        to_date=to_date,
+        before_date=before_date,
+        before_id=before_id,
+        limit=limit + 1
+    )
+    if len(records) > limit:
+        records = records[:limit]
+        response.headers["X-Next-Cursor"] = _encode_history_cursor(records[-1])
+    
+    if compact:
+        return [(str(r.date), r.status) for r in records]
     
     return [
         {"id": r.id, "date": str(r.date), "status": r.status} for r in records
     ]
 
+
+class AttendanceTotals(BaseModel):
+    counts: dict  # {status: count}
+    total: int
+    attendance_rate: Optional[float] = None  # percentage of present/late check-ins, None without check-ins
+
+class MonthAttendanceSummary(AttendanceTotals):
+    month: str  # YYYY-MM
+
+class StudentAttendanceTotals(AttendanceTotals):
+    student_id: int
+    name: Optional[str] = None
+
+class BatchAttendanceSummary(AttendanceTotals):
+    batch_id: int
+    months: List[MonthAttendanceSummary]
+    students: List[StudentAttendanceTotals]
+
+class StudentAttendanceSummary(AttendanceTotals):
+    student_id: int
+    months: List[MonthAttendanceSummary]
+
+def _check_summary_range(from_date: Optional[date_type], to_date: Optional[date_type]) -> None:
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'")
+
+@router.get(
+    '/summary/batch/{batch_id}',
+    tags=["Attendance"],
+    summary="Get attendance summary for a batch",
+    description=(
+        "Returns attendance counts and rates of a batch per month and per student, read from the "
+        "precomputed attendance rollup. `from`/`to` select whole months."
+    ),
+    response_model=BatchAttendanceSummary,
+    responses={
+        200: {"description": "Batch attendance summary returned."},
+        400: {"description": "Invalid date range."},
+        403: {"description": "Only admins and instructors can view batch summaries."}
+    },
+    response_description="Batch attendance summary."
+)
+async def batch_attendance_summary(
+    batch_id: int = Path(..., description="The ID of the batch"),
+    from_date: Optional[date_type] = Query(None, alias="from", description="First month to include (any day of it)"),
+    to_date: Optional[date_type] = Query(None, alias="to", description="Last month to include (any day of it)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get monthly and per-student attendance totals for a batch."""
+    if current_user.role not in ["admin", "instructor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and instructors can view batch attendance summaries"
+        )
+    _check_summary_range(from_date, to_date)
+    return await attendance_service.get_batch_summary_async(db, batch_id, from_date=from_date, to_date=to_date)
+
+@router.get(
+    '/summary/student/{student_id}',
+    tags=["Attendance"],
+    summary="Get attendance summary for a student",
+    description=(
+        "Returns attendance counts and rates of a student per month, read from the precomputed "
+        "attendance rollup. `from`/`to` select whole months."
+    ),
+    response_model=StudentAttendanceSummary,
+    responses={
+        200: {"description": "Student attendance summary returned."},
+        400: {"description": "Invalid date range."},
+        403: {"description": "Students can only view their own attendance."}
+    },
+    response_description="Student attendance summary."
+)
+async def student_attendance_summary(
+    student_id: int = Path(..., description="The ID of the student"),
+    from_date: Optional[date_type] = Query(None, alias="from", description="First month to include (any day of it)"),
+    to_date: Optional[date_type] = Query(None, alias="to", description="Last month to include (any day of it)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get monthly attendance totals for a student."""
+    if current_user.role not in ["admin", "instructor"] and (
+        not current_user.student or current_user.student.id != student_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view your own attendance unless you are an admin or instructor"
+        )
+    _check_summary_range(from_date, to_date)
+    return await attendance_service.get_student_summary_async(db, student_id, from_date=from_date, to_date=to_date)
+
+@router.get(
+    '/export',
+    tags=["Attendance"],
+    summary="Export attendance as CSV or Parquet",
+    description=(
+        "Streams attendance records, optionally limited to a batch and a `from`/`to` date range, as a CSV "
+        "(default) or Parquet file. Rows are read with a server-side cursor and written as they arrive, so "
+        "memory use does not depend on the size of the export. Parquet requires pyarrow on the server."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Attendance file.", "content": {"text/csv": {}, "application/vnd.apache.parquet": {}}},
+        400: {"description": "Invalid date range."},
+        403: {"description": "Only admins and instructors can export attendance."},
+        501: {"description": "Parquet export is not available on this server."}
+    },
+    response_description="Attendance file download."
+)
+async def export_attendance(
+    batch_id: Optional[int] = Query(None, description="Only students of this batch"),
+    from_date: Optional[date_type] = Query(None, alias="from", description="First date to include"),
+    to_date: Optional[date_type] = Query(None, alias="to", description="Last date to include"),
+    format: Literal["csv", "parquet"] = Query("csv", description="File format"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream an attendance export."""
+    if current_user.role not in ["admin", "instructor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and instructors can export attendance"
+        )
+    _check_summary_range(from_date, to_date)
+    if format == "parquet" and not export_service.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export is not available (pyarrow is not installed)"
+        )
+    
+    async def content():
+        # The request's session is closed once the endpoint returns, so the stream uses its own
+        async with AsyncSessionLocal() as db:
+            chunks = attendance_service.stream_attendance_export_async(
+                db, batch_id=batch_id, from_date=from_date, to_date=to_date
+            )
+            if format == "parquet":
+                stream = export_service.parquet_stream(
+                    attendance_service.EXPORT_COLUMNS, attendance_service.EXPORT_COLUMN_TYPES, chunks
+                )
+            else:
+                stream = export_service.csv_stream(attendance_service.EXPORT_COLUMNS, chunks)
+            async for data in stream:
+                yield data
+    
+    filename = "attendance"
+    if batch_id is not None:
+        filename += f"_batch{batch_id}"
+    if from_date:
+        filename += f"_from{from_date}"
+    if to_date:
+        filename += f"_to{to_date}"
+    
+    return StreamingResponse(
+        content(),
+        media_type=export_service.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
+
+def _format_sse(event) -> str:
+    """Encode a hub event (None for a heartbeat) as a server-sent event."""
+    if event is None:
+        return ": keep-alive\n\n"
+    data = json.dumps({"batch_id": event.batch_id, **event.data})
+    return f"id: {event.id}\nevent: {event.type}\ndata: {data}\n\n"
+
+@router.get(
+    '/live/batch/{batch_id}',
+    tags=["Attendance"],
+    summary="Follow check-ins of a batch live",
+    description=(
+        "Server-sent events stream of the attendance changes of a batch: a `check_in` event for every new "
+        "attendance row and a `status_changed` event when a roll call overwrites a status. Reconnect with the "
+        "`Last-Event-ID` header (or `last_event_id` query parameter) to receive the events missed meanwhile; a "
+        "`reset` event means they are no longer available and the batch report should be reloaded."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Event stream.", "content": {"text/event-stream": {}}},
+        400: {"description": "Invalid last event ID."},
+        403: {"description": "Only admins and instructors can follow batch attendance."}
+    },
+    response_description="Server-sent events stream."
+)
+async def live_batch_attendance(
+    batch_id: int = Path(..., description="The ID of the batch"),
+    last_event_id: Optional[str] = Query(None, description="ID of the last event received"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stream attendance events of a batch."""
+    if current_user.role not in ["admin", "instructor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins and instructors can follow batch attendance"
+        )
+    resume_from = last_event_id_header or last_event_id
+    try:
+        resume_from = int(resume_from) if resume_from else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid last event ID")
+    
+    # The stream stays open for a long time; give the connection used for authentication back to the pool
+    await db.close()
+    
+    async def content():
+        yield "retry: 3000\n\n"
+        async for event in attendance_events.subscribe(
+            batch_id, last_event_id=resume_from, heartbeat=settings.ATTENDANCE_EVENTS_HEARTBEAT_SECONDS
+        ):
+            yield _format_sse(event)
+    
+    return StreamingResponse(
+        content(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
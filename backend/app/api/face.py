@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
@@ -22,7 +23,8 @@ router = APIRouter(tags=["Facial Recognition"])
         201: {"description": "Face image uploaded successfully."},
         400: {"description": "Invalid image or no face detected."},
         401: {"description": "Not authenticated."},
-        403: {"description": "Not authorized."}
+        403: {"description": "Not authorized."},
+        503: {"description": "Face recognition is busy; retry after the Retry-After delay."}
     },
     response_description="Face image record with embedding."
 )
@@ -53,7 +55,7 @@ async def upload_face_image(
     "/my-images",
     response_model=List[FaceImageResponse],
     summary="Get all face images for the current user",
-    description="Returns all face images uploaded by the current user.",
+    description="Returns all face images uploaded by the current user. Images are not inlined; each record has an image_url to download the stored file.",
     responses={
         200: {"description": "List of face images."},
         401: {"description": "Not authenticated."}
@@ -67,6 +69,48 @@ async def get_my_face_images(
     """Get all face images for the current user."""
     return await FaceService.get_user_face_images_async(db, user_id=current_user.id)
 
+@router.get(
+    "/{face_id}/image",
+    response_class=FileResponse,
+    summary="Download a stored face image",
+    description="Download the original image of a face record. Users can only download their own face images; "
+                "admins and instructors can download any.",
+    responses={
+        200: {"description": "The stored image."},
+        401: {"description": "Not authenticated."},
+        403: {"description": "Not authorized."},
+        404: {"description": "Face image not found."}
+    }
+)
+async def download_face_image(
+    face_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Download the stored image of a face record."""
+    face_image = await db.get(models.FaceImage, face_id)
+    if not face_image or not face_image.image_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Face image not found"
+        )
+    
+    if face_image.user_id != current_user.id and current_user.role not in ["admin", "instructor"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this face image"
+        )
+    
+    try:
+        path = FaceService.image_file_path(face_image.image_path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Face image not found"
+        )
+    # Content-addressed files never change, but they must not be kept by shared caches
+    return FileResponse(path, headers={"Cache-Control": "private, max-age=86400"})
+
 @router.post(
     "/verify",
     response_model=FaceVerificationResponse,
@@ -74,7 +118,8 @@ async def get_my_face_images(
     description="Verify a face against stored embeddings. If user_id is provided, it will verify against that user's faces only.",
     responses={
         200: {"description": "Face verification result."},
-        400: {"description": "Invalid image or no face detected."}
+        400: {"description": "Invalid image or no face detected."},
+        503: {"description": "Face recognition is busy; retry after the Retry-After delay."}
     },
     response_description="Face verification result."
 )
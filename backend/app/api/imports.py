@@ -0,0 +1,73 @@
+"""
+API endpoints for polling CSV/JSONL bulk import jobs in the MCQ Test & Attendance System.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+
+from app.core.dependencies import get_current_user
+from app.db import models
+from app.schemas.import_job import ImportJobResults, ImportJobStatus
+from app.services.import_jobs import ImportJob, import_jobs
+
+router = APIRouter(tags=["Imports"])
+
+# Import results page size (default and maximum)
+RESULTS_DEFAULT_LIMIT = 1000
+RESULTS_MAX_LIMIT = 10000
+
+
+def _get_job(job_id: str, current_user: models.User) -> ImportJob:
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    if current_user.role != "admin" and job.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only view your own imports")
+    return job
+
+
+@router.get(
+    "/{job_id}",
+    summary="Get the status of an import",
+    description="Returns the progress of a CSV/JSONL bulk import and its success and failure counts so far.",
+    response_model=ImportJobStatus,
+    responses={
+        200: {"description": "Import status returned."},
+        403: {"description": "Not the owner of the import."},
+        404: {"description": "Unknown or expired import job."}
+    },
+    response_description="Import status."
+)
+async def get_import_status(
+    job_id: str = Path(..., description="The ID of the import job"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the status of an import."""
+    return _get_job(job_id, current_user)
+
+
+@router.get(
+    "/{job_id}/results",
+    summary="Get the per-row results of an import",
+    description=(
+        "Returns per-row results of a CSV/JSONL bulk import in file order, with the same fields as the "
+        "JSON bulk upload endpoints. Results are available while the import runs; page with `offset` and `limit`."
+    ),
+    response_model=ImportJobResults,
+    responses={
+        200: {"description": "Import results returned."},
+        403: {"description": "Not the owner of the import."},
+        404: {"description": "Unknown or expired import job."}
+    },
+    response_description="Per-row import results."
+)
+async def get_import_results(
+    job_id: str = Path(..., description="The ID of the import job"),
+    offset: int = Query(0, ge=0, description="Index of the first result"),
+    limit: int = Query(RESULTS_DEFAULT_LIMIT, ge=1, le=RESULTS_MAX_LIMIT, description="Maximum number of results"),
+    failed_only: bool = Query(False, description="Only return rows that failed"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the per-row results of an import."""
+    job = _get_job(job_id, current_user)
+    total, results = import_jobs.results(job, offset=offset, limit=limit, failed_only=failed_only)
+    return ImportJobResults(job_id=job.id, status=job.status, offset=offset, total=total, results=results)
@@ -4,6 +4,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db, get_async_db
 from app.schemas.bulk_student import BulkStudentUploadRequest, BulkStudentUploadResponse
 from app.schemas.bulk_question import BulkQuestionUploadRequest, BulkQuestionUploadResponse
+from typing import Literal, Optional
+from fastapi import File, UploadFile
+from app.schemas.import_job import ImportJobStatus
+from app.services.import_jobs import import_jobs
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.settings import settings
 
 router = APIRouter()
 
@@ -84,10 +91,11 @@ async def get_instructor_tests(
     '/{instructor_id}/batches/students/bulk',
     tags=["Instructors"],
     summary="Bulk add students to instructor batches",
-    description="Bulk upload students to batches managed by this instructor.",
+    description="Bulk upload students to batches managed by this instructor. Requests with more than `IMPORT_SYNC_MAX_ROWS` rows are imported in the background: the response is then 202 with an import job to poll at `/imports/{job_id}`.",
     response_model=BulkStudentUploadResponse,
     responses={
         200: {"description": "Bulk student upload results."},
+        202: {"description": "Large upload queued as an import job.", "model": ImportJobStatus},
         403: {"description": "Instructors can only upload to their own batches."}
     },
     response_description="Bulk student upload results."
@@ -102,18 +110,21 @@ async def bulk_add_students_instructor(
     if not current_user.instructor or current_user.instructor.id != instructor_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Instructors can only upload to their own batches.")
     
-    results = await student_service.bulk_student_upload_async(db, req.students, instructor_id=instructor_id)
+    if len(req.students) > settings.IMPORT_SYNC_MAX_ROWS:
+        job = await import_jobs.submit_items("students", req.students, owner_id=current_user.id, instructor_id=instructor_id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(ImportJobStatus.model_validate(job)))
     
-    return {"results": results}
+    return await student_service.bulk_student_upload_async(db, req.students, instructor_id=instructor_id)
 
 @router.post(
     '/{instructor_id}/tests/questions/bulk',
     tags=["Instructors"],
     summary="Bulk add questions to instructor's tests",
-    description="Bulk upload questions to tests managed by this instructor.",
+    description="Bulk upload questions to tests managed by this instructor. Requests with more than `IMPORT_SYNC_MAX_ROWS` rows are imported in the background: the response is then 202 with an import job to poll at `/imports/{job_id}`.",
     response_model=BulkQuestionUploadResponse,
     responses={
         200: {"description": "Bulk question upload results."},
+        202: {"description": "Large upload queued as an import job.", "model": ImportJobStatus},
         403: {"description": "Instructors can only upload to their own tests."}
     },
     response_description="Bulk question upload results."
@@ -128,6 +139,77 @@ async def bulk_add_questions_instructor(
     if not current_user.instructor or current_user.instructor.id != instructor_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Instructors can only upload to their own tests.")
     
+    if len(req.questions) > settings.IMPORT_SYNC_MAX_ROWS:
+        job = await import_jobs.submit_items("questions", req.questions, owner_id=current_user.id, instructor_id=instructor_id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(ImportJobStatus.model_validate(job)))
+    
     results = await test_service.bulk_question_upload_async(db, req.questions, instructor_id=instructor_id)
     
     return {"results": results}
+
+
+@router.post(
+    '/{instructor_id}/batches/students/bulk/upload',
+    tags=["Instructors"],
+    summary="Bulk add students to instructor batches from a CSV or JSONL file",
+    description=(
+        "Upload a student roster as CSV (header row with the bulk student fields) or JSONL (one student "
+        "object per line). The file is imported in the background; poll `/imports/{job_id}` for progress "
+        "and `/imports/{job_id}/results` for per-row results."
+    ),
+    response_model=ImportJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {"description": "Import queued."},
+        400: {"description": "Unknown file format."},
+        403: {"description": "Instructors can only upload to their own batches."},
+        413: {"description": "File too large."}
+    },
+    response_description="Queued import job."
+)
+async def upload_students_instructor(
+    file: UploadFile = File(..., description="CSV or JSONL student roster"),
+    instructor_id: int = Path(..., description="The ID of the instructor"),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="File format (default: from the file name)"),
+    current_user: models.User = Depends(require_role("instructor"))
+):
+    """Import students into instructor batches from a CSV or JSONL file."""
+    if not current_user.instructor or current_user.instructor.id != instructor_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Instructors can only upload to their own batches.")
+    
+    return await import_jobs.submit(
+        "students", file, owner_id=current_user.id, instructor_id=instructor_id, format=format
+    )
+
+@router.post(
+    '/{instructor_id}/tests/questions/bulk/upload',
+    tags=["Instructors"],
+    summary="Bulk add questions to instructor's tests from a CSV or JSONL file",
+    description=(
+        "Upload a question bank as CSV (header row with the bulk question fields) or JSONL (one question "
+        "object per line). The file is imported in the background; poll `/imports/{job_id}` for progress "
+        "and `/imports/{job_id}/results` for per-row results."
+    ),
+    response_model=ImportJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {"description": "Import queued."},
+        400: {"description": "Unknown file format."},
+        403: {"description": "Instructors can only upload to their own tests."},
+        413: {"description": "File too large."}
+    },
+    response_description="Queued import job."
+)
+async def upload_questions_instructor(
+    file: UploadFile = File(..., description="CSV or JSONL question bank"),
+    instructor_id: int = Path(..., description="The ID of the instructor"),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="File format (default: from the file name)"),
+    current_user: models.User = Depends(require_role("instructor"))
+):
+    """Import questions into instructor's tests from a CSV or JSONL file."""
+    if not current_user.instructor or current_user.instructor.id != instructor_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Instructors can only upload to their own tests.")
+    
+    return await import_jobs.submit(
+        "questions", file, owner_id=current_user.id, instructor_id=instructor_id, format=format
+    )
@@ -97,15 +97,23 @@ async def list_tests(
     ]
 
 from app.schemas.bulk_question import BulkQuestionUploadRequest, BulkQuestionUploadResponse
+from typing import Literal, Optional
+from fastapi import File, UploadFile
+from app.schemas.import_job import ImportJobStatus
+from app.services.import_jobs import import_jobs
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.settings import settings
 
 @router.post(
     '/questions/bulk',
     tags=["Tests"],
     summary="Bulk add questions to the question pool (admin only)",
-    description="Bulk upload questions to the question pool. Admin only.",
+    description="Bulk upload questions to the question pool. Admin only. Requests with more than `IMPORT_SYNC_MAX_ROWS` rows are imported in the background: the response is then 202 with an import job to poll at `/imports/{job_id}`.",
     response_model=BulkQuestionUploadResponse,
     responses={
         200: {"description": "Bulk question upload results."},
+        202: {"description": "Large upload queued as an import job.", "model": ImportJobStatus},
         403: {"description": "Admins only."}
     },
     response_description="Bulk question upload results."
@@ -116,5 +124,35 @@ async def bulk_add_questions_admin(
     current_user: models.User = Depends(require_role("admin"))
 ):
     """Bulk add questions to the question pool (admin only)."""
+    if len(req.questions) > settings.IMPORT_SYNC_MAX_ROWS:
+        job = await import_jobs.submit_items("questions", req.questions, owner_id=current_user.id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(ImportJobStatus.model_validate(job)))
     results = await test_service.bulk_question_upload_async(db, req.questions, instructor_id=None)
     return {"results": results}
+
+@router.post(
+    '/questions/bulk/upload',
+    tags=["Tests"],
+    summary="Bulk add questions from a CSV or JSONL file (admin only)",
+    description=(
+        "Upload a question bank as CSV (header row with the bulk question fields) or JSONL (one question "
+        "object per line). The file is imported in the background; poll `/imports/{job_id}` for progress "
+        "and `/imports/{job_id}/results` for per-row results. Admin only."
+    ),
+    response_model=ImportJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {"description": "Import queued."},
+        400: {"description": "Unknown file format."},
+        403: {"description": "Admins only."},
+        413: {"description": "File too large."}
+    },
+    response_description="Queued import job."
+)
+async def upload_questions_admin(
+    file: UploadFile = File(..., description="CSV or JSONL question bank"),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="File format (default: from the file name)"),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Import questions from a CSV or JSONL file (admin only)."""
+    return await import_jobs.submit("questions", file, owner_id=current_user.id, format=format)
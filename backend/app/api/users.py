@@ -34,6 +34,12 @@ async def list_users(db: AsyncSession = Depends(get_async_db), current_user: mod
 
 from app.schemas.bulk_student import BulkStudentUploadRequest, BulkStudentUploadResponse
 from app.services import student_service
+from typing import Literal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.settings import settings
+from app.schemas.import_job import ImportJobStatus
+from app.services.import_jobs import import_jobs
 
 @router.get(
     '/me',
@@ -64,21 +70,52 @@ async def get_current_user_profile(db: AsyncSession = Depends(get_async_db), cur
     '/batches/students/bulk',
     tags=["Users"],
     summary="Bulk add students to any batch (admin only)",
-    description="Bulk upload students to any batch. Admin only.",
+    description="Bulk upload students to any batch. Admin only. Requests with more than `IMPORT_SYNC_MAX_ROWS` rows are imported in the background: the response is then 202 with an import job to poll at `/imports/{job_id}`.",
     response_model=BulkStudentUploadResponse,
     responses={
         200: {"description": "Bulk student upload results."},
+        202: {"description": "Large upload queued as an import job.", "model": ImportJobStatus},
         403: {"description": "Admins only."}
     },
     response_description="Bulk student upload results."
 )
-def bulk_add_students_admin(
+async def bulk_add_students_admin(
     req: BulkStudentUploadRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(require_role("admin"))
+):
+    """Bulk add students to any batch (admin only)."""
+    if len(req.students) > settings.IMPORT_SYNC_MAX_ROWS:
+        job = await import_jobs.submit_items("students", req.students, owner_id=current_user.id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(ImportJobStatus.model_validate(job)))
+    return await student_service.bulk_student_upload_async(db, req.students, instructor_id=None)
+
+@router.post(
+    '/batches/students/bulk/upload',
+    tags=["Users"],
+    summary="Bulk add students to any batch from a CSV or JSONL file (admin only)",
+    description=(
+        "Upload a student roster as CSV (header row with the bulk student fields) or JSONL (one student "
+        "object per line). The file is imported in the background; poll `/imports/{job_id}` for progress "
+        "and `/imports/{job_id}/results` for per-row results. Admin only."
+    ),
+    response_model=ImportJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {"description": "Import queued."},
+        400: {"description": "Unknown file format."},
+        403: {"description": "Admins only."},
+        413: {"description": "File too large."}
+    },
+    response_description="Queued import job."
+)
+async def upload_students_admin(
+    file: UploadFile = File(..., description="CSV or JSONL student roster"),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None, description="File format (default: from the file name)"),
     current_user: models.User = Depends(require_role("admin"))
 ):
-    results = student_service.bulk_student_upload(db, req.students, instructor_id=None)
-    return {"results": results}
+    """Import students into any batch from a CSV or JSONL file (admin only)."""
+    return await import_jobs.submit("students", file, owner_id=current_user.id, format=format)
 
 @router.get(
     '/{user_id}',
@@ -5,7 +5,7 @@ This module aggregates all v1 API endpoints.
 
 from fastapi import APIRouter
 
-from app.api import auth, users, instructors, students, tests, attendance, face, uploads, health, admin
+from app.api import auth, users, instructors, students, tests, attendance, face, uploads, health, admin, imports
 
 # Create API router for v1
 api_router = APIRouter()
@@ -21,3 +21,4 @@ api_router.include_router(attendance.router, prefix="/attendance", tags=["attend
 api_router.include_router(uploads.router, prefix="/uploads", tags=["uploads"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
+api_router.include_router(imports.router, prefix="/imports", tags=["imports"])
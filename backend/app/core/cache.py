@@ -6,10 +6,16 @@ This module provides caching functionality without requiring external services l
 import time
 import threading
 import logging
-from typing import Dict, Any, Optional, Callable, Tuple, Union
+import inspect
+from datetime import date, datetime
+from typing import Dict, Any, Optional, Callable, Tuple, Union, Iterable, List, Set
 from functools import wraps
 import json
 import hashlib
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,9 @@ class LocalCache:
             default_ttl: Default time-to-live in seconds for cache entries
         """
         self._cache: Dict[str, Tuple[Any, float]] = {}  # {key: (value, expiry_time)}
+        self._tagged_keys: Dict[str, Set[str]] = {}  # {tag: keys}
+        self._key_tags: Dict[str, Tuple[str, ...]] = {}  # {key: tags}
+        self._tag_versions: Dict[str, int] = {}  # {tag: number of invalidations}
         self._lock = threading.RLock()
         self.default_ttl = default_ttl
         
@@ -50,12 +59,19 @@ class LocalCache:
             
             # Check if expired
             if expiry_time < time.time():
-                del self._cache[key]
+                self._remove(key)
                 return None
             
             return value
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+        tag_versions: Optional[Dict[str, int]] = None
+    ) -> bool:
         """
         Set a value in the cache.
         
@@ -63,12 +79,68 @@ class LocalCache:
             key: Cache key
             value: Value to cache
             ttl: Time-to-live in seconds (if None, use default_ttl)
+            tags: Tags the entry is evicted with by invalidate_tags()
+            tag_versions: Result of tag_versions() taken before the value was computed; the value is
+                not stored if one of the tags was invalidated since, as it may be stale
+            
+        Returns:
+            True if the value was stored
         """
         ttl = ttl if ttl is not None else self.default_ttl
         expiry_time = time.time() + ttl
+        tags = tuple(tags)
         
         with self._lock:
+            if tag_versions is not None and tag_versions != self.tag_versions(tags):
+                return False
+            self._remove(key)
             self._cache[key] = (value, expiry_time)
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tagged_keys.setdefault(tag, set()).add(key)
+            return True
+    
+    def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """
+        Get the invalidation counters of tags, to pass to set().
+        
+        Args:
+            tags: Cache tags
+            
+        Returns:
+            {tag: number of times it was invalidated}
+        """
+        with self._lock:
+            return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Delete every entry stored with one of the tags.
+        
+        Args:
+            tags: Cache tags
+            
+        Returns:
+            Number of entries deleted
+        """
+        deleted = 0
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._tagged_keys.get(tag, ())):
+                    deleted += self._remove(key)
+        return deleted
+    
+    def _remove(self, key: str) -> bool:
+        """Delete an entry and its tag links (lock held)."""
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tagged_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged_keys[tag]
+        return self._cache.pop(key, None) is not None
     
     def delete(self, key: str) -> bool:
         """
@@ -81,15 +153,14 @@ class LocalCache:
             True if the key was deleted, False if it didn't exist
         """
         with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                return True
-            return False
+            return self._remove(key)
     
     def clear(self) -> None:
         """Clear all cache entries."""
         with self._lock:
             self._cache.clear()
+            self._tagged_keys.clear()
+            self._key_tags.clear()
     
     def _cleanup_loop(self) -> None:
         """Background thread to clean up expired cache entries."""
@@ -109,7 +180,7 @@ class LocalCache:
             
             # Delete expired keys
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key)
             
             if expired_keys:
                 logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
@@ -119,6 +190,59 @@ class LocalCache:
 cache = LocalCache()
 
 
+def _cache_key_value(value: Any) -> str:
+    """Render an argument value for a cache key."""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return "(" + ",".join(_cache_key_value(v) for v in value) + ")"
+    # For complex objects, use their string representation
+    return str(hash(str(value)))
+
+
+def _bound_arguments(func: Callable, args: tuple, kwargs: dict) -> List[Tuple[str, Any]]:
+    """(name, value) of every argument of a call, with defaults applied."""
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        return list(bound.arguments.items())
+    except TypeError:
+        return [(str(i), arg) for i, arg in enumerate(args)] + sorted(kwargs.items())
+
+
+def make_cache_key(key_prefix: str, func: Callable, args: tuple, kwargs: dict, shared: bool = False) -> str:
+    """
+    Build the cache key of a call.
+
+    Arguments are bound to the function signature (with defaults applied), so positional and keyword
+    calls share a key and every filter argument is part of it.
+
+    Args:
+        key_prefix: Prefix for the key
+        func: Cached function
+        args: Positional arguments of the call
+        kwargs: Keyword arguments of the call
+        shared: Leave database sessions out of the key so that results are shared between requests.
+            Only safe for results that every write invalidates (see async_cached tags); otherwise
+            each session gets its own entry
+
+    Returns:
+        Key of the form "prefix:function:name=value:..."
+    """
+    key_parts = [key_prefix, func.__name__]
+    for name, value in _bound_arguments(func, args, kwargs):
+        if isinstance(value, (AsyncSession, Session)):
+            if shared:
+                continue
+            # A token kept on the session, as its repr may be reused by a later session at the same address
+            value = value.info.setdefault("cache_key", uuid.uuid4().hex)
+        key_parts.append(f"{name}={_cache_key_value(value)}")
+
+    return ":".join(key_parts)
+
+
 def cached(ttl: Optional[int] = None, key_prefix: str = ""):
     """
     Decorator to cache function results.
@@ -133,28 +257,7 @@ def cached(ttl: Optional[int] = None, key_prefix: str = ""):
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            # Generate cache key
-            key_parts = [key_prefix, func.__name__]
-            
-            # Add args and kwargs to key
-            for arg in args:
-                if isinstance(arg, (str, int, float, bool, type(None))):
-                    key_parts.append(str(arg))
-                else:
-                    # For complex objects, use their string representation
-                    key_parts.append(str(hash(str(arg))))
-            
-            # Sort kwargs for consistent keys
-            for k in sorted(kwargs.keys()):
-                v = kwargs[k]
-                if isinstance(v, (str, int, float, bool, type(None))):
-                    key_parts.append(f"{k}:{v}")
-                else:
-                    # For complex objects, use their string representation
-                    key_parts.append(f"{k}:{hash(str(v))}")
-            
-            # Create final key
-            key = ":".join(key_parts)
+            key = make_cache_key(key_prefix, func, args, kwargs)
             
             # Try to get from cache
             cached_value = cache.get(key)
@@ -174,13 +277,20 @@ def cached(ttl: Optional[int] = None, key_prefix: str = ""):
     return decorator
 
 
-def async_cached(ttl: Optional[int] = None, key_prefix: str = ""):
+def async_cached(
+    ttl: Optional[int] = None,
+    key_prefix: str = "",
+    tags: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None
+):
     """
     Decorator to cache async function results.
     
     Args:
         ttl: Time-to-live in seconds (if None, use default_ttl)
         key_prefix: Prefix for cache keys
+        tags: Builds the tags of a call from its {argument name: value}; entries are evicted when
+            one of their tags is passed to invalidate_cache_tags(). Tagged results are shared between
+            database sessions, untagged ones are cached per session
         
     Returns:
         Decorated async function
@@ -188,28 +298,7 @@ def async_cached(ttl: Optional[int] = None, key_prefix: str = ""):
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs) -> Any:
-            # Generate cache key
-            key_parts = [key_prefix, func.__name__]
-            
-            # Add args and kwargs to key
-            for arg in args:
-                if isinstance(arg, (str, int, float, bool, type(None))):
-                    key_parts.append(str(arg))
-                else:
-                    # For complex objects, use their string representation
-                    key_parts.append(str(hash(str(arg))))
-            
-            # Sort kwargs for consistent keys
-            for k in sorted(kwargs.keys()):
-                v = kwargs[k]
-                if isinstance(v, (str, int, float, bool, type(None))):
-                    key_parts.append(f"{k}:{v}")
-                else:
-                    # For complex objects, use their string representation
-                    key_parts.append(f"{k}:{hash(str(v))}")
-            
-            # Create final key
-            key = ":".join(key_parts)
+            key = make_cache_key(key_prefix, func, args, kwargs, shared=tags is not None)
             
             # Try to get from cache
             cached_value = cache.get(key)
@@ -217,9 +306,12 @@ def async_cached(ttl: Optional[int] = None, key_prefix: str = ""):
                 logger.debug(f"Cache hit for {key}")
                 return cached_value
             
-            # Call function and cache result
+            call_tags = tuple(tags(dict(_bound_arguments(func, args, kwargs)))) if tags else ()
+            tag_versions = cache.tag_versions(call_tags)
+            
+            # Call function and cache result, unless a write invalidated its tags meanwhile
             result = await func(*args, **kwargs)
-            cache.set(key, result, ttl)
+            cache.set(key, result, ttl, tags=call_tags, tag_versions=tag_versions)
             logger.debug(f"Cache miss for {key}, cached result")
             
             return result
@@ -253,12 +345,24 @@ def invalidate_cache_prefix(prefix: str) -> None:
         ]
         
         for key in keys_to_delete:
-            del cache._cache[key]
+            cache._remove(key)
         
         if keys_to_delete:
             logger.debug(f"Invalidated {len(keys_to_delete)} cache keys with prefix '{prefix}'")
 
 
+def invalidate_cache_tags(tags: Iterable[str]) -> None:
+    """
+    Invalidate all cache keys stored with one of the given tags.
+    
+    Args:
+        tags: Tags to match
+    """
+    deleted = cache.invalidate_tags(tags)
+    if deleted:
+        logger.debug(f"Invalidated {deleted} cache keys by tag")
+
+
 def clear_cache() -> None:
     """Clear the entire cache."""
     cache.clear()
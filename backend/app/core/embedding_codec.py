@@ -0,0 +1,100 @@
+"""
+Face embedding codec for the MCQ Test & Attendance System.
+Embeddings are stored as 128 little-endian float32 values packed into raw bytes. This module is
+the single place that converts between that storage format, numpy arrays and the text formats
+accepted from API clients.
+"""
+
+import json
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+# Length of the embeddings produced by face_recognition (dlib ResNet model)
+EMBEDDING_DIM = 128
+
+# Storage dtype: explicit little-endian so the bytes are portable across platforms
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+# Size of an encoded embedding in bytes
+EMBEDDING_BYTES = EMBEDDING_DIM * EMBEDDING_DTYPE.itemsize
+
+
+def encode_embedding(embedding: Union[Sequence[float], np.ndarray]) -> bytes:
+    """
+    Pack an embedding into raw bytes for storage.
+
+    Args:
+        embedding: Sequence of EMBEDDING_DIM floats
+
+    Returns:
+        EMBEDDING_BYTES bytes of little-endian float32 values
+    """
+    vector = np.asarray(embedding, dtype=EMBEDDING_DTYPE).reshape(-1)
+    if vector.shape[0] != EMBEDDING_DIM:
+        raise ValueError(f"Embedding must have {EMBEDDING_DIM} values, got {vector.shape[0]}")
+    return vector.tobytes()
+
+
+def decode_embedding(data: Optional[bytes]) -> Optional[np.ndarray]:
+    """
+    Unpack a stored embedding without copying.
+
+    Args:
+        data: Bytes produced by encode_embedding
+
+    Returns:
+        Read-only float32 vector, or None if the data is missing or has the wrong size
+    """
+    if data is None or len(data) != EMBEDDING_BYTES:
+        return None
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+def parse_embedding(value: Union[str, bytes, Sequence[float], np.ndarray, None]) -> Optional[np.ndarray]:
+    """
+    Parse an embedding in any supported format.
+
+    Args:
+        value: Packed bytes, JSON array string, comma-separated string, sequence of floats or array
+
+    Returns:
+        Float32 vector of length EMBEDDING_DIM, or None if the value is not a valid embedding
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return decode_embedding(bytes(value))
+
+    try:
+        if isinstance(value, str):
+            value = value.strip()
+            if value.startswith("["):
+                value = json.loads(value)
+            else:
+                value = [float(x) for x in value.split(",")]
+        vector = np.asarray(value, dtype=EMBEDDING_DTYPE).reshape(-1)
+    except (ValueError, TypeError):
+        return None
+
+    if vector.shape[0] != EMBEDDING_DIM:
+        return None
+
+    return vector
+
+
+def format_embedding(data: Optional[bytes]) -> Optional[str]:
+    """
+    Format a stored embedding as a comma-separated string for API responses.
+
+    Args:
+        data: Bytes produced by encode_embedding
+
+    Returns:
+        Comma-separated floats, or None if there is no valid embedding
+    """
+    vector = decode_embedding(data)
+    if vector is None:
+        return None
+    return ",".join(str(x) for x in vector)
@@ -1,19 +1,47 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from app.core.settings import settings
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Threads hashing passwords in bulk; bcrypt releases the GIL, so hashes run in parallel
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Generate a password hash."""
-    return pwd_context.hash(password)
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Generate a password hash (with `rounds` bcrypt rounds instead of the default, if given)."""
+    if rounds is None:
+        return pwd_context.hash(password)
+    return pwd_context.handler("bcrypt").using(rounds=rounds).hash(password)
+
+async def get_password_hashes_async(passwords: Sequence[str], rounds: Optional[int] = None) -> Tuple[List[str], float]:
+    """
+    Hash many passwords in the password hashing thread pool, keeping the event loop free.
+
+    Args:
+        passwords: Passwords to hash
+        rounds: bcrypt rounds (default: the context default)
+
+    Returns:
+        (hashes in the order of `passwords`, seconds spent hashing)
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    hashes = await asyncio.gather(*(
+        loop.run_in_executor(password_hash_executor, get_password_hash, password, rounds) for password in passwords
+    ))
+    return list(hashes), time.perf_counter() - started
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
@@ -39,6 +39,54 @@ class Settings(BaseSettings):
     RATE_LIMIT: int = 100  # requests per window
     RATE_WINDOW: int = 60  # time window in seconds
     
+    # Face recognition compute pool
+    FACE_COMPUTE_WORKERS: int = 2  # worker processes for face detection/encoding
+    FACE_COMPUTE_QUEUE_SIZE: int = 8  # jobs allowed to wait for a worker before returning 503
+    FACE_COMPUTE_RETRY_AFTER: int = 2  # Retry-After seconds sent with 503 responses
+    FACE_DETECT_MAX_DIMENSION: int = 800  # longest image side used for face detection (0 = full size)
+    FACE_DECODE_MAX_DIMENSION: int = 1600  # longest image side decoded for encoding (0 = full size)
+    
+    # Approximate nearest-neighbour (IVF) search for unscoped face identification
+    FACE_ANN_ENABLED: bool = False
+    FACE_ANN_MIN_SIZE: int = 20000  # below this many embeddings, exact search is used
+    FACE_ANN_LISTS: int = 0  # number of k-means clusters (0 = sqrt of the number of embeddings)
+    FACE_ANN_PROBES: int = 8  # clusters scanned per search; raise for recall, lower for speed
+    FACE_ANN_RERANK: int = 32  # candidates re-ranked with exact distances
+    FACE_ANN_INDEX_PATH: str = "data/face_ann.npz"  # persisted centroids and assignments
+    
+    # Face enrolment and matching
+    FACE_CENTROID_CANDIDATES: int = 0  # users compared in full after matching per-user centroids (0 = off, exact)
+    FACE_DUPLICATE_DISTANCE: float = 0.1  # uploads this close to one of the user's faces are not stored
+    FACE_IMAGE_DIR: str = "data/face_images"  # kept out of the public uploads mount, served by /face/{id}/image
+    
+    # Attendance write-behind buffer (acknowledge check-ins at once, write them in batches)
+    ATTENDANCE_WRITE_BEHIND: bool = False
+    ATTENDANCE_FLUSH_INTERVAL_MS: int = 20  # longest delay before a check-in is written
+    ATTENDANCE_FLUSH_BATCH_SIZE: int = 500  # check-ins written per transaction
+    ATTENDANCE_JOURNAL_PATH: str = "data/attendance_journal.jsonl"  # pending check-ins, replayed on startup
+    ATTENDANCE_JOURNAL_FSYNC: bool = False  # sync each journal append to disk (slower, survives power loss)
+    
+    # Today's attendance kept in memory per process (only enable when running a single worker process)
+    ATTENDANCE_TODAY_CACHE: bool = False
+    
+    # Live attendance feed (server-sent events per batch)
+    ATTENDANCE_EVENTS_HISTORY: int = 1000  # recent events per batch kept for clients resuming with Last-Event-ID
+    ATTENDANCE_EVENTS_QUEUE_SIZE: int = 1000  # events a client may fall behind before it is disconnected
+    ATTENDANCE_EVENTS_HEARTBEAT_SECONDS: int = 15  # keep-alive comment interval on idle feeds
+    
+    # CSV/JSONL bulk imports
+    IMPORT_UPLOAD_DIR: str = "data/imports"  # uploads are kept here until their import finishes
+    IMPORT_CHUNK_SIZE: int = 500  # rows validated and written per chunk
+    IMPORT_MAX_UPLOAD_MB: int = 100
+    IMPORT_JOB_RETENTION_HOURS: int = 24  # how long finished import jobs can be polled
+    IMPORT_MAX_CONCURRENT_JOBS: int = 2  # imports run at the same time; others wait in the queue
+    IMPORT_JOB_STORE: str = ""  # SQLite file keeping import jobs across restarts (empty: in memory only)
+    IMPORT_SYNC_MAX_ROWS: int = 1000  # larger JSON bulk requests are queued as import jobs
+    
+    # Password hashing for bulk student creation
+    PASSWORD_HASH_WORKERS: int = 4  # passwords hashed in parallel
+    BULK_PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost of the initial passwords of bulk-created students
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
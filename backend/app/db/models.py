@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Text, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Text, Table, LargeBinary, Index
 from sqlalchemy.orm import relationship, declarative_base
 
+from app.core.embedding_codec import format_embedding
+
 Base = declarative_base()
 
 class User(Base):
@@ -25,11 +27,16 @@ class FaceImage(Base):
     __tablename__ = 'face_images'
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    image_data = Column(String, nullable=False)  # Store as base64-encoded string (alternatively, use LargeBinary for BLOB)
-    embedding = Column(String, nullable=True)    # Store as JSON string or comma-separated floats
+    image_path = Column(String, nullable=True)  # Content-addressed file path relative to FACE_IMAGE_DIR
+    embedding_vector = Column(LargeBinary, nullable=True)  # 128 float32 values packed as raw bytes (see app.core.embedding_codec)
     created_at = Column(Date, nullable=False)
     user = relationship('User', back_populates='face_images')
 
+    @property
+    def embedding(self):
+        """Embedding as a comma-separated string, as exposed by the API."""
+        return format_embedding(self.embedding_vector)
+
 
 class Instructor(Base):
     __tablename__ = 'instructors'
@@ -80,8 +87,30 @@ class Question(Base):
 
 class Attendance(Base):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # One check-in per student per day; also the conflict target of the check-in upsert
+        Index('uq_attendance_student_date', 'student_id', 'date', unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey('students.id'))
-    date = Column(Date, nullable=False)
+    date = Column(Date, nullable=False, index=True)
     status = Column(String, nullable=False)
     student = relationship('Student', back_populates='attendance')
+
+class AttendanceSummary(Base):
+    """Attendance counts per student, batch, month and status, maintained on check-in.
+
+    Rebuild from the attendance table with `python -m app.rebuild_attendance_summary`.
+    """
+    __tablename__ = 'attendance_summary'
+    __table_args__ = (
+        # Conflict target of the check-in increment
+        Index('uq_attendance_summary_key', 'student_id', 'batch_id', 'month', 'status', unique=True),
+        Index('ix_attendance_summary_batch_month', 'batch_id', 'month'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey('students.id'), nullable=False)
+    batch_id = Column(Integer, nullable=False)  # Student's batch at check-in time, 0 if none
+    month = Column(Date, nullable=False)  # First day of the month
+    status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -75,7 +75,7 @@ from app.core.alembic_runner import run_alembic_upgrade
 
 @app.on_event("startup")
 async def startup_event():
-    """Run Alembic migrations on startup in a thread pool."""
+    """Run Alembic migrations on startup in a thread pool, load today's attendance, start the attendance write buffer and resume bulk imports."""
     import asyncio
     logger.info("Running startup tasks...")
     loop = asyncio.get_event_loop()
@@ -86,6 +86,27 @@ async def startup_event():
         logger.error(f"Error running Alembic migrations: {str(e)}")
         # Don't raise the exception to allow the app to start even if migrations fail
         # This is useful in development environments
+    
+    from app.services.attendance_buffer import attendance_buffer
+    from app.services.attendance_today import today_attendance
+    from app.services.import_jobs import import_jobs
+    await today_attendance.start()
+    await attendance_buffer.start()
+    await import_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the bulk import workers, write buffered check-ins, stop the face compute worker processes and persist the face ANN index."""
+    from app.services.attendance_buffer import attendance_buffer
+    from app.services.face_compute import face_compute
+    from app.services.face_index import face_index
+    from app.services.attendance_today import today_attendance
+    from app.services.import_jobs import import_jobs
+    await import_jobs.stop()
+    await attendance_buffer.stop()
+    await today_attendance.stop()
+    face_compute.shutdown()
+    face_index.save_ann()
 
 # Root endpoint
 @app.get("/", tags=["Info"])
@@ -136,6 +157,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Register API routers with versioning
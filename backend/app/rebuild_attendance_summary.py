@@ -0,0 +1,19 @@
+"""
+Rebuild the attendance_summary rollup table from the attendance table.
+
+Run after restoring or bulk-editing attendance data:
+    python -m app.rebuild_attendance_summary
+"""
+from app.db.session import SessionLocal
+from app.services.attendance_service import rebuild_attendance_summary
+
+def rebuild():
+    db = SessionLocal()
+    try:
+        rows = rebuild_attendance_summary(db)
+        print(f"Rebuilt attendance summary: {rows} rows.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
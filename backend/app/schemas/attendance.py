@@ -1,10 +1,13 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 from datetime import date
 
 from pydantic import ConfigDict
 
+# Statuses a roll call may record
+AttendanceStatus = Literal["present", "late", "absent"]
+
 class AttendanceBase(BaseModel):
     student_id: int
     date: date  # Python date object
@@ -21,3 +21,4 @@ class BulkStudentUploadRequest(BaseModel):
 
 class BulkStudentUploadResponse(BaseModel):
     results: List[BulkStudentUploadResponseItem]
+    hashing_seconds: Optional[float] = None  # time spent hashing the initial passwords
@@ -1,16 +1,15 @@
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, computed_field
 from datetime import date
 from typing import Optional, List, Dict, Any
 
+from app.core.settings import settings
+
 
 class FaceImageBase(BaseModel):
     """Base schema for face image data."""
-    image_data: str = Field(
-        description="Base64-encoded image data. Can include data URL prefix (e.g., 'data:image/jpeg;base64,')"
-    )
     embedding: Optional[str] = Field(
         default=None,
-        description="JSON string of face embedding vector. This is auto-generated by the service."
+        description="Comma-separated face embedding vector (128 floats). This is auto-generated by the service."
     )
     created_at: Optional[date] = Field(
         default=None,
@@ -20,15 +19,32 @@ class FaceImageBase(BaseModel):
 
 class FaceImageCreate(FaceImageBase):
     """Schema for creating a new face image."""
-    pass
+    image_data: str = Field(
+        description="Base64-encoded image data. Can include data URL prefix (e.g., 'data:image/jpeg;base64,')"
+    )
 
 
 class FaceImageResponse(FaceImageBase):
     """Schema for face image response."""
     id: int
     user_id: int
+    image_path: Optional[str] = Field(
+        default=None,
+        description="Path of the stored image, relative to FACE_IMAGE_DIR"
+    )
+    duplicate: bool = Field(
+        default=False,
+        description="True if the upload was a near-duplicate of one of the user's existing faces; "
+                    "it was not stored and the existing record is returned instead."
+    )
     
     model_config = ConfigDict(from_attributes=True)
+    
+    @computed_field
+    @property
+    def image_url(self) -> Optional[str]:
+        """URL to download the stored image (requires authentication)."""
+        return f"{settings.API_PREFIX}/face/{self.id}/image" if self.image_path else None
 
 
 class FaceVerification(BaseModel):
@@ -40,6 +56,10 @@ class FaceVerification(BaseModel):
         default=None,
         description="Optional user ID to verify against. If not provided, will attempt to identify from all users."
     )
+    batch_id: Optional[int] = Field(
+        default=None,
+        description="Optional batch ID to only match against the students of that batch."
+    )
 
 
 class FaceVerificationResponse(BaseModel):
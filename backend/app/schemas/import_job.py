@@ -0,0 +1,26 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class ImportJobStatus(BaseModel):
+    id: str
+    kind: str  # questions or students
+    format: str  # csv or jsonl
+    status: str  # queued, running, completed or failed
+    progress: float  # percent of the file processed
+    processed: int
+    succeeded: int
+    failed: int
+    error: Optional[str] = None
+    hashing_seconds: Optional[float] = None  # time spent hashing passwords (student imports)
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ImportJobResults(BaseModel):
+    job_id: str
+    status: str
+    offset: int
+    total: int  # results available so far
+    results: List[Dict[str, Any]]  # same items as the JSON bulk upload responses, in file order
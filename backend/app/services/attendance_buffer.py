@@ -0,0 +1,263 @@
+"""
+Write-behind buffer for attendance check-ins in the MCQ Test & Attendance System.
+At peak times thousands of check-ins arrive within minutes, and committing each one separately
+serialises them on the database write lock. With the buffer enabled, check-ins are validated
+against in-memory (student_id, date) keys, appended to a local journal and acknowledged at once;
+a background task writes them to the database in grouped multi-row transactions.
+
+The journal is replayed on startup, so acknowledged check-ins survive a crash. Replaying is safe
+because the flush skips rows that already exist. The in-memory keys are per process: with several
+worker processes, duplicates across processes are still rejected by the database, but only when
+the buffer flushes, after they were acknowledged.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import date
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal
+from app.schemas.attendance import AttendanceCreate
+from app.services import attendance_service
+from app.services.attendance_today import today_attendance
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceWriteBuffer:
+    """Acknowledge check-ins immediately and write them to the database in batches."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        flush_interval_ms: int = 20,
+        max_batch_size: int = 500,
+        journal_path: Optional[str] = None,
+        fsync: bool = False
+    ):
+        """
+        Initialize the buffer. Nothing is written until start() is called.
+
+        Args:
+            enabled: Whether check-ins go through the buffer (otherwise they are committed directly)
+            flush_interval_ms: Longest time a check-in waits before it is written to the database
+            max_batch_size: Largest number of check-ins written in one transaction
+            journal_path: Append-only file that pending check-ins are recorded in (None disables it)
+            fsync: Whether every journal append is synced to disk (survives power loss, not just crashes)
+        """
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self._keys: Dict[date, Set[int]] = {}  # {date: student IDs with a check-in}
+        self._pending: List[AttendanceCreate] = []
+        self._journal = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of acknowledged check-ins not yet written to the database."""
+        return len(self._pending)
+
+    async def _ensure_date_loaded(self, db: AsyncSession, value: date) -> Set[int]:
+        """Load the check-ins of a date from the database the first time it is seen."""
+        keys = self._keys.get(value)
+        if keys is None:
+            result = await db.execute(
+                select(models.Attendance.student_id).where(models.Attendance.date == value)
+            )
+            # Another request may have loaded the date meanwhile; keep its keys as well
+            keys = self._keys.setdefault(value, set())
+            keys.update(result.scalars().all())
+        return keys
+
+    def _append_journal(self, attendance: AttendanceCreate) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps({
+            "student_id": attendance.student_id,
+            "date": attendance.date.isoformat(),
+            "status": attendance.status
+        }) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    async def check_in_async(self, db: AsyncSession, attendance: AttendanceCreate) -> Optional[models.Attendance]:
+        """
+        Record a check-in, through the buffer when it is enabled and running.
+
+        Args:
+            db: Database session of the request
+            attendance: Check-in to record
+
+        Returns:
+            The attendance record (without an ID when buffered), or None if the student already
+            checked in on that date
+        """
+        if not self.enabled or self._task is None:
+            return await attendance_service.check_in_async(db, attendance)
+
+        if today_attendance.is_checked_in(attendance.student_id, attendance.date):
+            return None
+        keys = await self._ensure_date_loaded(db, attendance.date)
+        if attendance.student_id in keys:
+            return None
+        keys.add(attendance.student_id)
+
+        self._append_journal(attendance)
+        self._pending.append(attendance)
+        today_attendance.record(attendance.student_id, attendance.date, attendance.status)
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+        return models.Attendance(student_id=attendance.student_id, date=attendance.date, status=attendance.status)
+
+    async def flush(self) -> int:
+        """
+        Write all pending check-ins to the database.
+
+        Check-ins stay pending if the database cannot be reached; only rows the database rejects
+        (integrity errors) are dropped.
+
+        Returns:
+            Number of check-ins written
+        """
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch_size]
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await attendance_service.write_check_ins_async(db, batch)
+                except IntegrityError as e:
+                    logger.error(f"Error writing {len(batch)} buffered check-ins, retrying one by one: {str(e)}")
+                    await self._write_individually(batch)
+                del self._pending[:len(batch)]
+                written += len(batch)
+
+            # Everything in the journal is in the database now
+            if self._journal is not None and written:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+            self._evict_old_dates()
+        return written
+
+    async def _write_individually(self, batch: List[AttendanceCreate]) -> None:
+        """Write check-ins one per transaction, dropping (and un-registering) those the database rejects."""
+        for attendance in batch:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await attendance_service.write_check_ins_async(db, [attendance])
+            except IntegrityError as e:
+                logger.error(
+                    f"Dropping buffered check-in of student {attendance.student_id} on {attendance.date}: {str(e)}"
+                )
+                self._keys.get(attendance.date, set()).discard(attendance.student_id)
+                today_attendance.discard(attendance.student_id, attendance.date)
+
+    def _evict_old_dates(self) -> None:
+        """Forget the keys of past dates without pending check-ins; they are reloaded if needed."""
+        today = date.today()
+        pending_dates = {a.date for a in self._pending}
+        for value in [d for d in self._keys if d < today and d not in pending_dates]:
+            del self._keys[value]
+
+    async def _replay_journal(self) -> None:
+        """Queue check-ins left in the journal by a previous run."""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self._pending.append(AttendanceCreate(
+                        student_id=entry["student_id"],
+                        date=date.fromisoformat(entry["date"]),
+                        status=entry["status"]
+                    ))
+                except (ValueError, KeyError) as e:
+                    # A torn last line from a crash mid-write
+                    logger.warning(f"Skipping unreadable attendance journal line {line_number}: {str(e)}")
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} check-ins from the attendance journal")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Error flushing attendance buffer: {str(e)}")
+
+    async def start(self) -> None:
+        """Replay the journal and start the background flush task (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        await self._replay_journal()
+        if self.journal_path:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+        if self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                # Keep the replayed check-ins pending (and in the journal); the flush task retries them
+                logger.error(f"Error writing replayed check-ins: {str(e)}")
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Attendance write-behind buffer started (flush every {self.flush_interval * 1000:.0f} ms, "
+            f"journal {self.journal_path or 'disabled'})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the background task, write everything pending and close the journal."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            await self.flush()
+        finally:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        logger.info("Attendance write-behind buffer stopped")
+
+
+# Create global attendance write buffer
+attendance_buffer = AttendanceWriteBuffer(
+    enabled=settings.ATTENDANCE_WRITE_BEHIND,
+    flush_interval_ms=settings.ATTENDANCE_FLUSH_INTERVAL_MS,
+    max_batch_size=settings.ATTENDANCE_FLUSH_BATCH_SIZE,
+    journal_path=settings.ATTENDANCE_JOURNAL_PATH or None,
+    fsync=settings.ATTENDANCE_JOURNAL_FSYNC
+)
@@ -0,0 +1,189 @@
+"""
+Live attendance events for the MCQ Test & Attendance System.
+An in-process publish/subscribe hub: the check-in paths publish an event per written attendance
+row, and the live feed endpoint streams the events of one batch to its subscribers, replacing
+polling of the batch attendance report.
+
+Each batch keeps its most recent events, so a client that reconnects with the ID of the last
+event it received gets the events it missed. Event IDs start at the hub's start time in
+milliseconds, so they keep increasing across restarts. Events are per process: a subscriber only
+sees check-ins written by the process it is connected to.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Event types
+CHECK_IN = "check_in"  # a new attendance row
+STATUS_CHANGED = "status_changed"  # the status of an existing row was overwritten (roll call)
+RESET = "reset"  # missed events are no longer available; reload the batch report
+
+
+@dataclass
+class AttendanceEvent:
+    """One attendance change of a batch."""
+    id: int
+    type: str
+    batch_id: int
+    data: Dict[str, Any]
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    overflowed: bool = False
+
+
+@dataclass
+class _BatchChannel:
+    history: Deque[AttendanceEvent]
+    subscribers: Set[_Subscriber] = field(default_factory=set)
+    evicted_id: int = 0  # ID of the newest event dropped from the history
+
+
+class AttendanceEventHub:
+    """Fan attendance events out to the subscribers of each batch."""
+
+    def __init__(self, history_size: int = 1000, queue_size: int = 1000):
+        """
+        Initialize the hub.
+
+        Args:
+            history_size: Events kept per batch for clients resuming with a last event ID
+            queue_size: Events a subscriber may fall behind before it is disconnected
+        """
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels: Dict[int, _BatchChannel] = {}
+        self._first_id = int(time.time() * 1000)
+        self._last_id = self._first_id - 1
+
+    def _channel(self, batch_id: int) -> _BatchChannel:
+        channel = self._channels.get(batch_id)
+        if channel is None:
+            channel = self._channels[batch_id] = _BatchChannel(history=deque(maxlen=self.history_size))
+        return channel
+
+    def publish(self, batch_id: int, event_type: str, data: Dict[str, Any]) -> AttendanceEvent:
+        """
+        Publish an event to the subscribers of a batch. Safe to call from any thread.
+
+        Args:
+            batch_id: Batch of the student the event is about
+            event_type: CHECK_IN or STATUS_CHANGED
+            data: JSON-serializable event payload
+
+        Returns:
+            The published event
+        """
+        with self._lock:
+            self._last_id += 1
+            event = AttendanceEvent(id=self._last_id, type=event_type, batch_id=batch_id, data=data)
+            channel = self._channel(batch_id)
+            if len(channel.history) == channel.history.maxlen:
+                channel.evicted_id = channel.history[0].id
+            channel.history.append(event)
+            subscribers = list(channel.subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, batch_id, subscriber, event)
+            except RuntimeError:
+                # The subscriber's event loop is closed
+                self._unsubscribe(batch_id, subscriber)
+        return event
+
+    def _deliver(self, batch_id: int, subscriber: _Subscriber, event: AttendanceEvent) -> None:
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Disconnect slow clients; they resume from the history when they reconnect
+            logger.warning(f"Dropping slow attendance event subscriber of batch {batch_id}")
+            subscriber.overflowed = True
+            self._unsubscribe(batch_id, subscriber)
+
+    def _unsubscribe(self, batch_id: int, subscriber: _Subscriber) -> None:
+        with self._lock:
+            channel = self._channels.get(batch_id)
+            if channel is not None:
+                channel.subscribers.discard(subscriber)
+
+    def _missed(self, channel: _BatchChannel, last_event_id: int) -> Optional[List[AttendanceEvent]]:
+        """Events after last_event_id, or None when some of them are no longer available (lock held)."""
+        if last_event_id < self._first_id - 1:
+            # Issued before this hub started: whatever happened in between is unknown
+            return None
+        if last_event_id < channel.evicted_id:
+            return None
+        return [event for event in channel.history if event.id > last_event_id]
+
+    async def subscribe(
+        self,
+        batch_id: int,
+        last_event_id: Optional[int] = None,
+        heartbeat: Optional[float] = None
+    ) -> AsyncIterator[Optional[AttendanceEvent]]:
+        """
+        Follow the events of a batch.
+
+        Args:
+            batch_id: Batch to follow
+            last_event_id: ID of the last event the client received; missed events are replayed first
+            heartbeat: Seconds without events after which None is yielded (None disables heartbeats)
+
+        Yields:
+            Events as they are published (a RESET event when missed events cannot be replayed),
+            and None as a heartbeat. Ends when the subscriber falls too far behind.
+        """
+        subscriber = _Subscriber(loop=asyncio.get_running_loop(), queue=asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            channel = self._channel(batch_id)
+            missed = self._missed(channel, last_event_id) if last_event_id is not None else []
+            channel.subscribers.add(subscriber)
+
+        try:
+            if missed is None:
+                yield AttendanceEvent(id=self._last_id, type=RESET, batch_id=batch_id, data={})
+            else:
+                for event in missed:
+                    yield event
+
+            while not (subscriber.overflowed and subscriber.queue.empty()):
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield event
+        finally:
+            self._unsubscribe(batch_id, subscriber)
+
+    def subscriber_count(self, batch_id: int) -> int:
+        """Number of clients following a batch."""
+        with self._lock:
+            channel = self._channels.get(batch_id)
+            return len(channel.subscribers) if channel is not None else 0
+
+
+def check_in_event_data(student_id: int, value: date, status: str) -> Dict[str, Any]:
+    """Payload of a check-in or status change event."""
+    return {"student_id": student_id, "date": value.isoformat(), "status": status}
+
+
+# Create global attendance event hub
+attendance_events = AttendanceEventHub(
+    history_size=settings.ATTENDANCE_EVENTS_HISTORY,
+    queue_size=settings.ATTENDANCE_EVENTS_QUEUE_SIZE
+)
@@ -1,159 +1,916 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, and_, or_, func, extract, event, inspect
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from app.db import models
 from app.schemas.attendance import AttendanceCreate
-from app.core.cache import async_cached
-from typing import List, Optional, Dict, Any
+from app.core.cache import async_cached, invalidate_cache_tags, invalidate_cache_prefix
+from app.services.attendance_today import today_attendance
+from app.services.attendance_events import attendance_events, check_in_event_data, CHECK_IN, STATUS_CHANGED
+from typing import List, Optional, Dict, Any, Iterable, Tuple, AsyncIterator, Sequence, NamedTuple
 from datetime import date
 
+# Batch ID recorded in attendance_summary for students without a batch
+NO_BATCH = 0
+# Statuses counted as attended in summary attendance rates
+ATTENDED_STATUSES = ("present", "late")
+# Columns of attendance exports and their pyarrow types
+EXPORT_COLUMNS = ("date", "student_id", "roll_number", "name", "batch_id", "status")
+EXPORT_COLUMN_TYPES = {
+    "date": "date32",
+    "student_id": "int64",
+    "roll_number": "string",
+    "name": "string",
+    "batch_id": "int64",
+    "status": "string",
+}
+# Rows fetched from the database cursor at a time while exporting
+EXPORT_CHUNK_SIZE = 5000
+
+def attendance_student_tag(student_id: int) -> str:
+    """Cache tag of cached reads covering a student's attendance."""
+    return f"attendance:student:{student_id}"
+
+def attendance_batch_tag(batch_id: int) -> str:
+    """Cache tag of cached reads covering a batch's attendance."""
+    return f"attendance:batch:{batch_id}"
+
+class _TodayAttendanceRow(NamedTuple):
+    """Attendance row of a batch report built from today's in-memory check-ins."""
+    student_id: int
+    date: date
+    status: str
+
+def _check_in_statement(dialect_name: str, attendance: AttendanceCreate):
+    """Build an INSERT ... ON CONFLICT (student_id, date) DO NOTHING RETURNING statement.
+    
+    Returns None for databases without ON CONFLICT support.
+    """
+    if dialect_name == "postgresql":
+        insert = postgresql_insert
+    elif dialect_name == "sqlite":
+        insert = sqlite_insert
+    else:
+        return None
+    
+    return (
+        insert(models.Attendance)
+        .values(student_id=attendance.student_id, date=attendance.date, status=attendance.status)
+        .on_conflict_do_nothing(index_elements=["student_id", "date"])
+        .returning(models.Attendance)
+    )
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+def _apply_summary_increments(
+    db: Session,
+    checkins: Iterable[Tuple[int, date, str]],
+    amount: int = 1
+) -> Dict[int, int]:
+    """Add new check-ins to the attendance_summary rollup within the caller's transaction.
+    
+    Args:
+        db: Session holding the transaction that inserted the check-ins
+        checkins: (student_id, date, status) of each new attendance row
+        amount: Added to the counter of each check-in (-1 removes check-ins whose status was replaced)
+    
+    Removals are applied to the counter the check-in was originally added to, which is keyed by
+    the student's batch at check-in time and may differ from the current one.
+    
+    Returns:
+        Batch ID of each student of the check-ins (NO_BATCH for students without one)
+    """
+    checkins = list(checkins)
+    if not checkins:
+        return {}
+    
+    # Current batch of every student, with a single query
+    student_ids = {student_id for student_id, _, _ in checkins}
+    batch_by_student = {
+        student_id: batch_id or NO_BATCH
+        for student_id, batch_id in db.execute(
+            select(models.Student.id, models.Student.batch_id).where(models.Student.id.in_(student_ids))
+        ).all()
+    }
+    
+    recorded = _recorded_summary_batches(db, checkins, batch_by_student) if amount < 0 else {}
+    
+    increments: Dict[Tuple[int, int, date, str], int] = {}
+    for student_id, day, status in checkins:
+        month = _month_start(day)
+        batch_id = recorded.get((student_id, month, status), batch_by_student.get(student_id, NO_BATCH))
+        key = (student_id, batch_id, month, status)
+        increments[key] = increments.get(key, 0) + amount
+    
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+        statement = insert(models.AttendanceSummary)
+        statement = statement.on_conflict_do_update(
+            index_elements=["student_id", "batch_id", "month", "status"],
+            set_={"count": models.AttendanceSummary.count + statement.excluded.count}
+        )
+        # One parameter set per counter: the statement compiles once and is cached across calls
+        db.execute(statement, [
+            {"student_id": student_id, "batch_id": batch_id, "month": month, "status": status, "count": count}
+            for (student_id, batch_id, month, status), count in increments.items()
+        ])
+    else:
+        _apply_summary_increments_fallback(db, increments)
+    
+    if amount < 0:
+        # Drop emptied counters so the table matches a rebuild
+        db.execute(delete(models.AttendanceSummary).where(
+            models.AttendanceSummary.student_id.in_(student_ids),
+            models.AttendanceSummary.count <= 0
+        ))
+    
+    return batch_by_student
+
+def _recorded_summary_batches(
+    db: Session,
+    checkins: Sequence[Tuple[int, date, str]],
+    batch_by_student: Dict[int, int]
+) -> Dict[Tuple[int, date, str], int]:
+    """Find the batch holding the counter of each (student_id, month, status) being removed.
+    
+    The current batch is preferred when it holds a counter; otherwise the most recently created
+    counter wins, as students that moved were last counted there.
+    """
+    student_ids = {student_id for student_id, _, _ in checkins}
+    months = {_month_start(day) for _, day, _ in checkins}
+    statuses = {status for _, _, status in checkins}
+    rows = db.execute(
+        select(
+            models.AttendanceSummary.student_id,
+            models.AttendanceSummary.month,
+            models.AttendanceSummary.status,
+            models.AttendanceSummary.batch_id
+        ).where(
+            models.AttendanceSummary.student_id.in_(student_ids),
+            models.AttendanceSummary.month.in_(months),
+            models.AttendanceSummary.status.in_(statuses),
+            models.AttendanceSummary.count > 0
+        ).order_by(models.AttendanceSummary.id)
+    ).all()
+    
+    recorded: Dict[Tuple[int, date, str], int] = {}
+    for student_id, month, status, batch_id in rows:
+        key = (student_id, month, status)
+        if recorded.get(key) != batch_by_student.get(student_id, NO_BATCH):
+            recorded[key] = batch_id
+    return recorded
+
+def _after_attendance_commit(
+    batch_by_student: Dict[int, int],
+    checkins: Sequence[Tuple[int, date, str]],
+    event_types: Optional[Sequence[str]] = None
+) -> None:
+    """Propagate committed attendance writes to today's view, the live feeds and the cache.
+    
+    Args:
+        batch_by_student: Batch of each student, as returned by _apply_summary_increments
+        checkins: (student_id, date, status) of each written attendance row
+        event_types: Live feed event type of each row (CHECK_IN for all when omitted)
+    """
+    tags = set()
+    for i, (student_id, day, status) in enumerate(checkins):
+        today_attendance.record(student_id, day, status)
+        tags.add(attendance_student_tag(student_id))
+        batch_id = batch_by_student.get(student_id, NO_BATCH)
+        if batch_id != NO_BATCH:
+            tags.add(attendance_batch_tag(batch_id))
+            event_type = event_types[i] if event_types else CHECK_IN
+            attendance_events.publish(batch_id, event_type, check_in_event_data(student_id, day, status))
+    invalidate_cache_tags(tags)
+
+@event.listens_for(Session, "after_flush")
+def _collect_student_batch_moves(session: Session, flush_context) -> None:
+    """Remember the cache tags of students moved between batches, evicted once the transaction commits."""
+    tags = session.info.setdefault("attendance_cache_tags", set())
+    for obj in session.dirty:
+        if isinstance(obj, models.Student):
+            history = inspect(obj).attrs.batch_id.history
+            if not history.has_changes():
+                continue
+            tags.add(attendance_student_tag(obj.id))
+            # Both the batch the student left and the one they joined
+            for batch_id in (*history.deleted, *history.added):
+                if batch_id:
+                    tags.add(attendance_batch_tag(batch_id))
+            if not history.deleted:
+                # The previous batch was never loaded, so every batch summary may count the student
+                session.info["attendance_cache_evict_summaries"] = True
+    for obj in session.deleted:
+        if isinstance(obj, models.Student):
+            tags.add(attendance_student_tag(obj.id))
+            if obj.batch_id:
+                tags.add(attendance_batch_tag(obj.batch_id))
+
+@event.listens_for(Session, "after_commit")
+def _evict_student_batch_moves(session: Session) -> None:
+    tags = session.info.pop("attendance_cache_tags", None)
+    if tags:
+        invalidate_cache_tags(tags)
+    if session.info.pop("attendance_cache_evict_summaries", False):
+        invalidate_cache_prefix("attendance_summary")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_student_batch_moves(session: Session) -> None:
+    session.info.pop("attendance_cache_tags", None)
+    session.info.pop("attendance_cache_evict_summaries", None)
+
+def _apply_summary_increments_fallback(db: Session, increments: Dict[Tuple[int, int, date, str], int]) -> None:
+    """Update the summary counters on databases without ON CONFLICT, inserting missing ones."""
+    for (student_id, batch_id, month, status), count in increments.items():
+        key = (
+            (models.AttendanceSummary.student_id == student_id) &
+            (models.AttendanceSummary.batch_id == batch_id) &
+            (models.AttendanceSummary.month == month) &
+            (models.AttendanceSummary.status == status)
+        )
+        result = db.execute(
+            update(models.AttendanceSummary).where(key).values(count=models.AttendanceSummary.count + count)
+        )
+        if result.rowcount == 0:
+            db.add(models.AttendanceSummary(
+                student_id=student_id, batch_id=batch_id, month=month, status=status, count=count
+            ))
+    db.flush()
+
 # Async methods (modern approach)
 async def check_in_async(db: AsyncSession, attendance: AttendanceCreate) -> Optional[models.Attendance]:
-    """Record attendance for a student using async SQLAlchemy."""
-    # Prevent duplicate check-in for the same date
-    result = await db.execute(
-        select(models.Attendance).where(
-            (models.Attendance.student_id == attendance.student_id) &
-            (models.Attendance.date == attendance.date)
+    """Record attendance for a student using async SQLAlchemy.
+    
+    Returns None if the student already checked in on that date. Duplicates are detected by the
+    unique (student_id, date) index in the same statement as the insert, so concurrent check-ins
+    cannot both succeed. Repeated check-ins for today are rejected from memory without a query.
+    """
+    if today_attendance.is_checked_in(attendance.student_id, attendance.date):
+        return None
+    
+    statement = _check_in_statement(db.get_bind().dialect.name, attendance)
+    
+    if statement is None:
+        db_attendance = models.Attendance(
+            student_id=attendance.student_id,
+            date=attendance.date,
+            status=attendance.status
         )
+        db.add(db_attendance)
+        try:
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+            return None
+    else:
+        result = await db.execute(statement)
+        db_attendance = result.scalars().first()
+        if db_attendance is None:
+            await db.commit()
+            return None
+    
+    # Count the check-in in the rollup in the same transaction
+    checkins = [(attendance.student_id, attendance.date, attendance.status)]
+    batch_by_student = await db.run_sync(_apply_summary_increments, checkins)
+    # Detach so the returned values stay readable after commit
+    db.expunge(db_attendance)
+    await db.commit()
+    _after_attendance_commit(batch_by_student, checkins)
+    
+    return db_attendance
+
+async def bulk_check_in_async(db: AsyncSession, attendances: List[AttendanceCreate]) -> List[Optional[models.Attendance]]:
+    """Record attendance for many students in one transaction using async SQLAlchemy.
+    
+    Returns one entry per input record: the new attendance row, or None if the student
+    already has attendance for that date (in the database or earlier in the same batch).
+    Duplicates are detected by the unique (student_id, date) index in the insert itself, so a
+    concurrent check-in only turns its own row into a duplicate. Check-ins already recorded
+    today are skipped from memory.
+    """
+    if not attendances:
+        return []
+    
+    # First occurrence of each (student, date) pair not known to be checked in already
+    pending: Dict[Tuple[int, date], int] = {}
+    for i, attendance in enumerate(attendances):
+        key = (attendance.student_id, attendance.date)
+        if key not in pending and not today_attendance.is_checked_in(*key):
+            pending[key] = i
+    
+    records: List[Optional[models.Attendance]] = [None] * len(attendances)
+    if not pending:
+        return records
+    
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+        statement = (
+            insert(models.Attendance)
+            .on_conflict_do_nothing(index_elements=["student_id", "date"])
+            .returning(models.Attendance)
+        )
+        # Sent as multi-row INSERTs; rows that already exist are skipped and not returned
+        result = await db.execute(statement, [
+            {"student_id": a.student_id, "date": a.date, "status": a.status}
+            for a in (attendances[i] for i in pending.values())
+        ])
+        for record in result.scalars().all():
+            records[pending[(record.student_id, record.date)]] = record
+    else:
+        # Find existing check-ins for all (student, date) pairs with a single query
+        result = await db.execute(
+            select(models.Attendance.student_id, models.Attendance.date).where(
+                models.Attendance.student_id.in_({student_id for student_id, _ in pending}) &
+                models.Attendance.date.in_({day for _, day in pending})
+            )
+        )
+        for key in {(row.student_id, row.date) for row in result}:
+            pending.pop(key, None)
+        for i in pending.values():
+            records[i] = models.Attendance(
+                student_id=attendances[i].student_id,
+                date=attendances[i].date,
+                status=attendances[i].status
+            )
+        db.add_all([records[i] for i in pending.values()])
+        await db.flush()
+    
+    new_records = [r for r in records if r is not None]
+    checkins = [(r.student_id, r.date, r.status) for r in new_records]
+    batch_by_student = await db.run_sync(_apply_summary_increments, checkins)
+    # Detach the rows so their generated IDs stay readable after commit without a refresh per row
+    for record in new_records:
+        db.expunge(record)
+    await db.commit()
+    _after_attendance_commit(batch_by_student, checkins)
+    
+    return records
+
+async def write_check_ins_async(db: AsyncSession, attendances: List[AttendanceCreate]) -> int:
+    """Insert many check-ins in one transaction, skipping ones that already exist, using async SQLAlchemy.
+    
+    Used by the write-behind buffer, which has already acknowledged the check-ins, so nothing is
+    returned per row.
+    
+    Returns:
+        Number of attendance rows inserted
+    """
+    if not attendances:
+        return 0
+    
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name not in ("postgresql", "sqlite"):
+        records = await bulk_check_in_async(db, attendances)
+        return sum(record is not None for record in records)
+    
+    insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    statement = (
+        insert(models.Attendance)
+        .on_conflict_do_nothing(index_elements=["student_id", "date"])
+        .returning(models.Attendance.student_id, models.Attendance.date, models.Attendance.status)
     )
-    existing = result.scalars().first()
+    # Sent as multi-row INSERTs by SQLAlchemy's insertmanyvalues; the statement itself is compiled once
+    inserted = (await db.execute(statement, [
+        {"student_id": a.student_id, "date": a.date, "status": a.status} for a in attendances
+    ])).all()
+    checkins = [tuple(row) for row in inserted]
+    batch_by_student = await db.run_sync(_apply_summary_increments, checkins)
+    await db.commit()
+    _after_attendance_commit(batch_by_student, checkins)
+    return len(inserted)
+
+def _insert_missing_attendance_statement(dialect_name: str):
+    """Build an INSERT ... ON CONFLICT (student_id, date) DO NOTHING RETURNING statement.
     
-    if existing:
+    Executed with one parameter set per row, which SQLAlchemy sends as multi-row INSERTs. Only the
+    rows actually inserted are returned. Returns None for databases without ON CONFLICT support.
+    """
+    if dialect_name == "postgresql":
+        insert = postgresql_insert
+    elif dialect_name == "sqlite":
+        insert = sqlite_insert
+    else:
         return None
-        
-    # Create new attendance record
-    db_attendance = models.Attendance(
-        student_id=attendance.student_id,
-        date=attendance.date,
-        status=attendance.status
+    
+    return (
+        insert(models.Attendance)
+        .on_conflict_do_nothing(index_elements=["student_id", "date"])
+        .returning(models.Attendance.id, models.Attendance.student_id)
+    )
+
+async def mark_batch_attendance_async(
+    db: AsyncSession,
+    batch_id: int,
+    date_value: date,
+    marks: List[Tuple[int, str]]
+) -> List[Dict[str, Any]]:
+    """Record attendance of many students of a batch in one transaction using async SQLAlchemy.
+    
+    Existing attendance of a student on that date is overwritten with the new status. Students
+    that are not in the batch are reported and left untouched.
+    
+    Missing rows are inserted first and the remaining ones are then read under the write lock
+    (FOR UPDATE on PostgreSQL), so a concurrent check-in is reported and counted as the update
+    it turns into rather than as a created row.
+    
+    Args:
+        db: Database session
+        batch_id: Batch the students must belong to
+        date_value: Attendance date
+        marks: (student_id, status) pairs, one per student; status is one of AttendanceStatus
+    
+    Returns:
+        One {"student_id", "result", "attendance_id"} dict per mark, in order; result is one of
+        "created", "updated", "unchanged" or "not_in_batch"
+    """
+    if not marks:
+        return []
+    
+    student_ids = [student_id for student_id, _ in marks]
+    status_by_student = dict(marks)
+    
+    result = await db.execute(
+        select(models.Student.id).where(
+            models.Student.batch_id == batch_id,
+            models.Student.id.in_(student_ids)
+        )
+    )
+    members = set(result.scalars().all())
+    
+    # Insert the rows that do not exist yet; conflicting rows are left for the update below
+    created: Dict[int, int] = {}  # {student_id: attendance_id}
+    dialect_name = db.get_bind().dialect.name
+    statement = _insert_missing_attendance_statement(dialect_name)
+    if statement is not None and members:
+        result = await db.execute(statement, [
+            {"student_id": student_id, "date": date_value, "status": status_by_student[student_id]}
+            for student_id in student_ids if student_id in members
+        ])
+        created = {row.student_id: row.id for row in result}
+    
+    # Current status of every other member, locked until commit
+    query = select(models.Attendance.id, models.Attendance.student_id, models.Attendance.status).where(
+        models.Attendance.student_id.in_(members - created.keys()),
+        models.Attendance.date == date_value
     )
+    if dialect_name == "postgresql":
+        query = query.with_for_update()
+    existing = {row.student_id: row for row in await db.execute(query)}
+    
+    if statement is None:
+        records = [
+            models.Attendance(student_id=student_id, date=date_value, status=status_by_student[student_id])
+            for student_id in student_ids if student_id in members and student_id not in existing
+        ]
+        db.add_all(records)
+        await db.flush()
+        created = {record.student_id: record.id for record in records}
+    
+    results = []
+    updates = []  # {"id", "status"} of rows whose status changes
+    for student_id, status in marks:
+        if student_id not in members:
+            results.append({"student_id": student_id, "result": "not_in_batch", "attendance_id": None})
+        elif student_id in created:
+            results.append({"student_id": student_id, "result": "created", "attendance_id": created[student_id]})
+        elif existing[student_id].status == status:
+            results.append({"student_id": student_id, "result": "unchanged", "attendance_id": existing[student_id].id})
+        else:
+            results.append({"student_id": student_id, "result": "updated", "attendance_id": existing[student_id].id})
+            updates.append({"id": existing[student_id].id, "status": status})
+    
+    if updates:
+        # Bulk UPDATE by primary key, one executemany
+        await db.execute(update(models.Attendance), updates)
+    
+    writes = [r for r in results if r["result"] in ("created", "updated")]
+    if not writes:
+        await db.commit()
+        return results
     
-    db.add(db_attendance)
+    # Move replaced statuses to the new ones in the rollup
+    checkins = [(w["student_id"], date_value, status_by_student[w["student_id"]]) for w in writes]
+    replaced = [
+        (w["student_id"], date_value, existing[w["student_id"]].status)
+        for w in writes if w["result"] == "updated"
+    ]
+    batch_by_student = await db.run_sync(_apply_summary_increments, checkins)
+    if replaced:
+        await db.run_sync(_apply_summary_increments, replaced, -1)
     await db.commit()
-    await db.refresh(db_attendance)
+    _after_attendance_commit(
+        batch_by_student, checkins,
+        [STATUS_CHANGED if w["result"] == "updated" else CHECK_IN for w in writes]
+    )
+    return results
+
+def _attendance_history_query(
+    student_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    before_date: Optional[date] = None,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """Build the attendance history query, newest first, with keyset pagination on (date, id)."""
+    query = (
+        select(models.Attendance)
+        .where(models.Attendance.student_id == student_id)
+        .order_by(models.Attendance.date.desc(), models.Attendance.id.desc())
+    )
     
-    return db_attendance
+    if from_date:
+        query = query.where(models.Attendance.date >= from_date)
+    if to_date:
+        query = query.where(models.Attendance.date <= to_date)
+    if before_date is not None and before_id is not None:
+        # Rows that sort after the cursor row: (date, id) < (before_date, before_id)
+        query = query.where(or_(
+            models.Attendance.date < before_date,
+            and_(models.Attendance.date == before_date, models.Attendance.id < before_id)
+        ))
+    if limit:
+        query = query.limit(limit)
+    
+    return query
 
-@async_cached(ttl=60, key_prefix="attendance_history")
-async def attendance_history_async(db: AsyncSession, student_id: int) -> List[models.Attendance]:
-    """Get attendance history for a student using async SQLAlchemy."""
+@async_cached(
+    ttl=600, key_prefix="attendance_history", tags=lambda args: [attendance_student_tag(args["student_id"])]
+)
+async def attendance_history_async(
+    db: AsyncSession,
+    student_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    before_date: Optional[date] = None,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[models.Attendance]:
+    """Get attendance history for a student using async SQLAlchemy.
+    
+    Records are returned newest first. Pass the (date, id) of the last record of a page as
+    before_date/before_id to get the next page.
+    """
     result = await db.execute(
-        select(models.Attendance).where(
-            models.Attendance.student_id == student_id
-        )
+        _attendance_history_query(student_id, from_date, to_date, before_date, before_id, limit)
     )
     return result.scalars().all()
 
-async def get_batch_attendance_async(db: AsyncSession, batch_id: int, date_value: Optional[date] = None) -> Dict[str, Any]:
-    """Get attendance for all students in a batch for a specific date using async SQLAlchemy."""
-    # Get all students in the batch
-    result = await db.execute(
-        select(models.Student).where(models.Student.batch_id == batch_id)
+def _batch_attendance_queries(batch_id: int, date_value: Optional[date] = None):
+    """Build the two set-based queries behind a batch attendance report: students with their user, and attendance."""
+    students_query = (
+        select(
+            models.Student.id.label("student_id"),
+            models.Student.roll_number,
+            models.User.id.label("user_id"),
+            models.User.full_name
+        )
+        .join(models.User, models.User.id == models.Student.user_id)
+        .where(models.Student.batch_id == batch_id)
+        .order_by(models.Student.id)
     )
-    students = result.scalars().all()
     
-    attendance_data = []
-    for student in students:
-        # Get user data for each student
-        user_result = await db.execute(
-            select(models.User).where(models.User.id == student.user_id)
-        )
-        user = user_result.scalars().first()
-        
-        # Get attendance for the specified date if provided
-        attendance_query = select(models.Attendance).where(
-            models.Attendance.student_id == student.id
-        )
-        
-        if date_value:
-            attendance_query = attendance_query.where(models.Attendance.date == date_value)
-        
-        attendance_result = await db.execute(attendance_query)
-        attendances = attendance_result.scalars().all()
-        
-        # Add to result
-        student_data = {
-            "student_id": student.id,
-            "user_id": user.id,
-            "name": user.full_name,
-            "roll_number": student.roll_number,
-            "attendance": [
-                {
-                    "date": str(a.date),
-                    "status": a.status
-                } for a in attendances
-            ]
-        }
-        attendance_data.append(student_data)
+    batch_student_ids = select(models.Student.id).where(models.Student.batch_id == batch_id)
+    attendance_query = (
+        select(models.Attendance.student_id, models.Attendance.date, models.Attendance.status)
+        .where(models.Attendance.student_id.in_(batch_student_ids))
+        .order_by(models.Attendance.student_id, models.Attendance.date)
+    )
+    if date_value:
+        attendance_query = attendance_query.where(models.Attendance.date == date_value)
+    
+    return students_query, attendance_query
+
+def _build_batch_attendance(batch_id: int, date_value: Optional[date], students, attendances) -> Dict[str, Any]:
+    """Group attendance rows under their students."""
+    by_student: Dict[int, List[Dict[str, str]]] = {}
+    for a in attendances:
+        by_student.setdefault(a.student_id, []).append({
+            "date": str(a.date),
+            "status": a.status
+        })
     
     return {
         "batch_id": batch_id,
         "date": str(date_value) if date_value else None,
-        "students": attendance_data
+        "students": [
+            {
+                "student_id": student.student_id,
+                "user_id": student.user_id,
+                "name": student.full_name,
+                "roll_number": student.roll_number,
+                "attendance": by_student.get(student.student_id, [])
+            } for student in students
+        ]
+    }
+
+async def get_batch_attendance_async(db: AsyncSession, batch_id: int, date_value: Optional[date] = None) -> Dict[str, Any]:
+    """Get attendance for all students in a batch for a specific date using async SQLAlchemy.
+    
+    Uses two queries regardless of the batch size; today's attendance is read from memory.
+    """
+    students_query, attendance_query = _batch_attendance_queries(batch_id, date_value)
+    students = (await db.execute(students_query)).all()
+    roster = today_attendance.batch_roster(batch_id, date_value) if date_value else None
+    if roster is not None:
+        attendances = [
+            _TodayAttendanceRow(student_id, date_value, status) for student_id, status in sorted(roster.items())
+        ]
+    else:
+        attendances = (await db.execute(attendance_query)).all()
+    return _build_batch_attendance(batch_id, date_value, students, attendances)
+
+async def get_today_roster_async(db: AsyncSession, batch_id: int) -> Dict[int, str]:
+    """Get today's check-ins of a batch as {student_id: status} using async SQLAlchemy.
+    
+    Served from memory without a query while the view of today's attendance is loaded.
+    """
+    today = date.today()
+    roster = today_attendance.batch_roster(batch_id, today)
+    if roster is not None:
+        return roster
+    result = await db.execute(
+        select(models.Attendance.student_id, models.Attendance.status)
+        .join(models.Student, models.Student.id == models.Attendance.student_id)
+        .where(models.Student.batch_id == batch_id, models.Attendance.date == today)
+    )
+    return {row.student_id: row.status for row in result}
+
+def _summary_query(
+    batch_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+):
+    """Build the attendance_summary query for a batch (with student names) or a single student."""
+    query = (
+        select(
+            models.AttendanceSummary.student_id,
+            models.AttendanceSummary.month,
+            models.AttendanceSummary.status,
+            models.AttendanceSummary.count,
+            models.User.full_name
+        )
+        .outerjoin(models.Student, models.Student.id == models.AttendanceSummary.student_id)
+        .outerjoin(models.User, models.User.id == models.Student.user_id)
+        .order_by(models.AttendanceSummary.month, models.AttendanceSummary.student_id)
+    )
+    if batch_id is not None:
+        query = query.where(models.AttendanceSummary.batch_id == batch_id)
+    if student_id is not None:
+        query = query.where(models.AttendanceSummary.student_id == student_id)
+    # Summaries are monthly, so partial months at either end are included whole
+    if from_date:
+        query = query.where(models.AttendanceSummary.month >= _month_start(from_date))
+    if to_date:
+        query = query.where(models.AttendanceSummary.month <= _month_start(to_date))
+    return query
+
+def _summary_totals(counts: Dict[str, int]) -> Dict[str, Any]:
+    total = sum(counts.values())
+    attended = sum(counts.get(status, 0) for status in ATTENDED_STATUSES)
+    return {
+        "counts": counts,
+        "total": total,
+        "attendance_rate": round(100.0 * attended / total, 1) if total else None
     }
 
+def _build_summary(rows, by_student: bool) -> Dict[str, Any]:
+    """Fold summary rows into overall, per-month and (optionally) per-student totals."""
+    overall: Dict[str, int] = {}
+    months: Dict[date, Dict[str, int]] = {}
+    students: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        overall[row.status] = overall.get(row.status, 0) + row.count
+        month_counts = months.setdefault(row.month, {})
+        month_counts[row.status] = month_counts.get(row.status, 0) + row.count
+        if by_student:
+            student = students.setdefault(row.student_id, {"name": row.full_name, "counts": {}})
+            student["counts"][row.status] = student["counts"].get(row.status, 0) + row.count
+    
+    summary = _summary_totals(overall)
+    summary["months"] = [
+        {"month": month.strftime("%Y-%m"), **_summary_totals(counts)}
+        for month, counts in sorted(months.items())
+    ]
+    if by_student:
+        summary["students"] = [
+            {"student_id": student_id, "name": student["name"], **_summary_totals(student["counts"])}
+            for student_id, student in sorted(students.items())
+        ]
+    return summary
+
+@async_cached(
+    ttl=300, key_prefix="attendance_summary", tags=lambda args: [attendance_batch_tag(args["batch_id"])]
+)
+async def get_batch_summary_async(
+    db: AsyncSession,
+    batch_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """Get attendance totals of a batch per month and per student from the rollup table.
+    
+    Args:
+        db: Database session
+        batch_id: Batch ID
+        from_date: First month to include (any day of the month)
+        to_date: Last month to include (any day of the month)
+    
+    Returns:
+        Dict with overall counts, total and attendance_rate, plus "months" and "students" lists
+    """
+    rows = (await db.execute(_summary_query(batch_id=batch_id, from_date=from_date, to_date=to_date))).all()
+    return {"batch_id": batch_id, **_build_summary(rows, by_student=True)}
+
+@async_cached(
+    ttl=600, key_prefix="attendance_summary", tags=lambda args: [attendance_student_tag(args["student_id"])]
+)
+async def get_student_summary_async(
+    db: AsyncSession,
+    student_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """Get attendance totals of a student per month from the rollup table.
+    
+    Args:
+        db: Database session
+        student_id: Student ID
+        from_date: First month to include (any day of the month)
+        to_date: Last month to include (any day of the month)
+    
+    Returns:
+        Dict with overall counts, total and attendance_rate, plus a "months" list
+    """
+    rows = (await db.execute(_summary_query(student_id=student_id, from_date=from_date, to_date=to_date))).all()
+    return {"student_id": student_id, **_build_summary(rows, by_student=False)}
+
+def _attendance_export_query(
+    batch_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+):
+    """Build the attendance export query, one row per check-in with EXPORT_COLUMNS."""
+    query = (
+        select(
+            models.Attendance.date,
+            models.Attendance.student_id,
+            models.Student.roll_number,
+            models.User.full_name,
+            models.Student.batch_id,
+            models.Attendance.status
+        )
+        .outerjoin(models.Student, models.Student.id == models.Attendance.student_id)
+        .outerjoin(models.User, models.User.id == models.Student.user_id)
+        .order_by(models.Attendance.date, models.Attendance.student_id)
+    )
+    if batch_id is not None:
+        query = query.where(models.Student.batch_id == batch_id)
+    if from_date:
+        query = query.where(models.Attendance.date >= from_date)
+    if to_date:
+        query = query.where(models.Attendance.date <= to_date)
+    return query
+
+async def stream_attendance_export_async(
+    db: AsyncSession,
+    batch_id: Optional[int] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> AsyncIterator[Sequence[Any]]:
+    """Stream attendance rows for export using a server-side cursor.
+    
+    Args:
+        db: Database session (must stay open until the iteration ends)
+        batch_id: Only students currently in this batch
+        from_date: First date to include
+        to_date: Last date to include
+        chunk_size: Rows fetched per round trip
+    
+    Yields:
+        Lists of at most chunk_size rows with EXPORT_COLUMNS
+    """
+    result = await db.stream(
+        _attendance_export_query(batch_id, from_date, to_date).execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield rows
+
 # Sync methods (for backward compatibility)
 def check_in(db: Session, attendance: AttendanceCreate) -> Optional[models.Attendance]:
     """Record attendance for a student (sync version for backward compatibility)."""
-    # Prevent duplicate check-in for the same date
-    existing = db.query(models.Attendance).filter(
-        models.Attendance.student_id == attendance.student_id,
-        models.Attendance.date == attendance.date
-    ).first()
-    if existing:
+    if today_attendance.is_checked_in(attendance.student_id, attendance.date):
         return None
-    db_attendance = models.Attendance(
-        student_id=attendance.student_id,
-        date=attendance.date,
-        status=attendance.status
-    )
-    db.add(db_attendance)
+    
+    statement = _check_in_statement(db.get_bind().dialect.name, attendance)
+    
+    if statement is None:
+        db_attendance = models.Attendance(
+            student_id=attendance.student_id,
+            date=attendance.date,
+            status=attendance.status
+        )
+        db.add(db_attendance)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return None
+    else:
+        db_attendance = db.execute(statement).scalars().first()
+        if db_attendance is None:
+            db.commit()
+            return None
+    
+    checkins = [(attendance.student_id, attendance.date, attendance.status)]
+    batch_by_student = _apply_summary_increments(db, checkins)
+    db.expunge(db_attendance)
     db.commit()
-    db.refresh(db_attendance)
+    _after_attendance_commit(batch_by_student, checkins)
     return db_attendance
 
-def attendance_history(db: Session, student_id: int) -> List[models.Attendance]:
+def attendance_history(
+    db: Session,
+    student_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    before_date: Optional[date] = None,
+    before_id: Optional[int] = None,
+    limit: Optional[int] = None
+) -> List[models.Attendance]:
     """Get attendance history for a student (sync version for backward compatibility)."""
-    return db.query(models.Attendance).filter(models.Attendance.student_id == student_id).all()
+    return db.execute(
+        _attendance_history_query(student_id, from_date, to_date, before_date, before_id, limit)
+    ).scalars().all()
 
 def get_batch_attendance(db: Session, batch_id: int, date_value: Optional[date] = None) -> Dict[str, Any]:
     """Get attendance for all students in a batch for a specific date (sync version for backward compatibility)."""
-    # Get all students in the batch
-    students = db.query(models.Student).filter(models.Student.batch_id == batch_id).all()
-    
-    attendance_data = []
-    for student in students:
-        # Get user data for each student
-        user = db.query(models.User).filter(models.User.id == student.user_id).first()
-        
-        # Get attendance for the specified date if provided
-        attendance_query = db.query(models.Attendance).filter(
-            models.Attendance.student_id == student.id
-        )
-        
-        if date_value:
-            attendance_query = attendance_query.filter(models.Attendance.date == date_value)
-        
-        attendances = attendance_query.all()
-        
-        # Add to result
-        student_data = {
-            "student_id": student.id,
-            "user_id": user.id,
-            "name": user.full_name,
-            "roll_number": student.roll_number,
-            "attendance": [
-                {
-                    "date": str(a.date),
-                    "status": a.status
-                } for a in attendances
-            ]
-        }
-        attendance_data.append(student_data)
+    students_query, attendance_query = _batch_attendance_queries(batch_id, date_value)
+    students = db.execute(students_query).all()
+    roster = today_attendance.batch_roster(batch_id, date_value) if date_value else None
+    if roster is not None:
+        attendances = [
+            _TodayAttendanceRow(student_id, date_value, status) for student_id, status in sorted(roster.items())
+        ]
+    else:
+        attendances = db.execute(attendance_query).all()
+    return _build_batch_attendance(batch_id, date_value, students, attendances)
+
+def get_batch_summary(
+    db: Session,
+    batch_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """Get attendance totals of a batch from the rollup table (sync version for backward compatibility)."""
+    rows = db.execute(_summary_query(batch_id=batch_id, from_date=from_date, to_date=to_date)).all()
+    return {"batch_id": batch_id, **_build_summary(rows, by_student=True)}
+
+def get_student_summary(
+    db: Session,
+    student_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+) -> Dict[str, Any]:
+    """Get attendance totals of a student from the rollup table (sync version for backward compatibility)."""
+    rows = db.execute(_summary_query(student_id=student_id, from_date=from_date, to_date=to_date)).all()
+    return {"student_id": student_id, **_build_summary(rows, by_student=False)}
+
+def rebuild_attendance_summary(db: Session) -> int:
+    """Recompute the attendance_summary rollup from the attendance table.
     
-    return {
-        "batch_id": batch_id,
-        "date": str(date_value) if date_value else None,
-        "students": attendance_data
-    }
+    Check-ins are attributed to each student's current batch.
+    
+    Returns:
+        Number of summary rows written
+    """
+    year = extract("year", models.Attendance.date)
+    month = extract("month", models.Attendance.date)
+    batch_id = func.coalesce(models.Student.batch_id, NO_BATCH)
+    rows = db.execute(
+        select(models.Attendance.student_id, batch_id, year, month, models.Attendance.status, func.count())
+        .outerjoin(models.Student, models.Student.id == models.Attendance.student_id)
+        .group_by(models.Attendance.student_id, batch_id, year, month, models.Attendance.status)
+    ).all()
+    
+    db.execute(delete(models.AttendanceSummary))
+    if rows:
+        db.execute(models.AttendanceSummary.__table__.insert(), [
+            {
+                "student_id": student_id,
+                "batch_id": batch,
+                "month": date(int(row_year), int(row_month), 1),
+                "status": status,
+                "count": count
+            } for student_id, batch, row_year, row_month, status, count in rows
+        ])
+    db.commit()
+    invalidate_cache_prefix("attendance_summary")
+    return len(rows)
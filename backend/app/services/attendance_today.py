@@ -0,0 +1,233 @@
+"""
+In-memory view of today's attendance for the MCQ Test & Attendance System.
+Most attendance traffic concerns the current day: duplicate check-ins and "who is here" lookups
+for a batch. This module keeps today's check-ins per batch in memory so those are answered
+without a database query. It is warmed from the attendance table at startup, updated by the
+check-in paths and rolled over at midnight.
+
+The view is per process. Check-ins recorded by other processes only become visible when the
+view is reloaded (at the next midnight roll-over), so the view is off by default and should only
+be enabled with ATTENDANCE_TODAY_CACHE=true when running a single worker process.
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import models
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Batch key of students without a batch
+NO_BATCH = 0
+
+
+class TodayAttendance:
+    """Today's check-ins: status per student and the set of checked-in students per batch."""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize an empty view. Nothing is answered from memory until load() has run.
+
+        Args:
+            enabled: Whether the view is used at all
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._status: Dict[int, str] = {}  # {student_id: status} of today's check-ins
+        self._by_batch: Dict[int, Set[int]] = {}  # {batch_id: student IDs checked in today}
+        self._batch_of: Dict[int, int] = {}  # {student_id: batch_id}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the view has been loaded and can answer queries."""
+        return self.enabled and self._day is not None
+
+    @property
+    def day(self) -> Optional[date]:
+        """Date the view currently holds."""
+        return self._day
+
+    def _roll_over(self) -> None:
+        """Start an empty day when the date has changed since the last access (lock held)."""
+        today = date.today()
+        if self._day is not None and self._day != today:
+            logger.info(f"Rolling today's attendance over from {self._day} to {today}")
+            self._day = today
+            self._status = {}
+            self._by_batch = {}
+
+    def _current(self, day: date) -> bool:
+        """Whether `day` is the day held in memory (lock held)."""
+        if not self.loaded:
+            return False
+        self._roll_over()
+        return day == self._day
+
+    def load(self, day: date, students: Iterable[Tuple[int, Optional[int]]], checkins: Iterable[Tuple[int, str]]) -> None:
+        """
+        Replace the view.
+
+        Args:
+            day: Date of the check-ins
+            students: (student_id, batch_id) of all students
+            checkins: (student_id, status) of every check-in on `day`
+        """
+        batch_of = {student_id: batch_id or NO_BATCH for student_id, batch_id in students}
+        status = {}
+        by_batch: Dict[int, Set[int]] = {}
+        for student_id, student_status in checkins:
+            status[student_id] = student_status
+            by_batch.setdefault(batch_of.get(student_id, NO_BATCH), set()).add(student_id)
+
+        with self._lock:
+            self._batch_of = batch_of
+            self._status = status
+            self._by_batch = by_batch
+            self._day = day
+        logger.info(f"Loaded {len(status)} check-ins of {day} for {len(batch_of)} students")
+
+    def _queries(self, day: date):
+        return (
+            select(models.Student.id, models.Student.batch_id),
+            select(models.Attendance.student_id, models.Attendance.status).where(models.Attendance.date == day)
+        )
+
+    async def load_async(self, db: AsyncSession) -> None:
+        """Load today's check-ins and the batch of every student from the database."""
+        day = date.today()
+        students_query, checkins_query = self._queries(day)
+        students = (await db.execute(students_query)).all()
+        checkins = (await db.execute(checkins_query)).all()
+        self.load(day, students, checkins)
+
+    def load_sync(self, db: Session) -> None:
+        """Load today's check-ins and the batch of every student from the database (sync version)."""
+        day = date.today()
+        students_query, checkins_query = self._queries(day)
+        self.load(day, db.execute(students_query).all(), db.execute(checkins_query).all())
+
+    def is_checked_in(self, student_id: int, day: date) -> Optional[bool]:
+        """
+        Whether a student has a check-in on a date.
+
+        Returns:
+            True or False for today, None when the answer is not in memory (other dates, or not loaded)
+        """
+        with self._lock:
+            if not self._current(day):
+                return None
+            return student_id in self._status
+
+    def record(self, student_id: int, day: date, status: str) -> None:
+        """Record a check-in (or a status change); ignored unless it is for today."""
+        with self._lock:
+            if not self._current(day):
+                return
+            self._status[student_id] = status
+            self._by_batch.setdefault(self._batch_of.get(student_id, NO_BATCH), set()).add(student_id)
+
+    def discard(self, student_id: int, day: date) -> None:
+        """Forget a check-in that was acknowledged but never written."""
+        with self._lock:
+            if not self._current(day) or self._status.pop(student_id, None) is None:
+                return
+            self._by_batch.get(self._batch_of.get(student_id, NO_BATCH), set()).discard(student_id)
+
+    def batch_roster(self, batch_id: int, day: date) -> Optional[Dict[int, str]]:
+        """
+        Today's check-ins of a batch.
+
+        Returns:
+            {student_id: status}, or None when the answer is not in memory
+        """
+        with self._lock:
+            if not self._current(day):
+                return None
+            return {student_id: self._status[student_id] for student_id in self._by_batch.get(batch_id, ())}
+
+    def set_student_batch(self, student_id: int, batch_id: Optional[int]) -> None:
+        """Follow a student moving to another batch (None when the student was deleted)."""
+        with self._lock:
+            previous = self._batch_of.pop(student_id, NO_BATCH)
+            self._by_batch.get(previous, set()).discard(student_id)
+            if batch_id is None:
+                self._status.pop(student_id, None)
+                return
+            self._batch_of[student_id] = batch_id or NO_BATCH
+            if student_id in self._status:
+                self._by_batch.setdefault(batch_id or NO_BATCH, set()).add(student_id)
+
+    async def _reload_at_midnight(self) -> None:
+        while True:
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep((midnight - now).total_seconds() + 1)
+            try:
+                # Reloading also picks up check-ins other processes made since the last load
+                async with AsyncSessionLocal() as db:
+                    await self.load_async(db)
+            except Exception as e:
+                logger.error(f"Error reloading today's attendance: {str(e)}")
+
+    async def start(self) -> None:
+        """Warm the view from the database and schedule the midnight reload (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.load_async(db)
+        except Exception as e:
+            # Queries fall back to the database until the next reload
+            logger.error(f"Error loading today's attendance: {str(e)}")
+        self._task = asyncio.create_task(self._reload_at_midnight())
+
+    async def stop(self) -> None:
+        """Cancel the midnight reload."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Create global view of today's attendance
+today_attendance = TodayAttendance(enabled=settings.ATTENDANCE_TODAY_CACHE)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_student_batch_changes(session: Session, flush_context) -> None:
+    """Remember students whose batch changed so the view can follow once the transaction commits."""
+    if not today_attendance.loaded:
+        return
+    changes = session.info.setdefault("today_attendance_batch_changes", {})
+    for obj in session.new:
+        if isinstance(obj, models.Student) and obj.id is not None:
+            changes[obj.id] = obj.batch_id
+    for obj in session.dirty:
+        if isinstance(obj, models.Student) and inspect(obj).attrs.batch_id.history.has_changes():
+            changes[obj.id] = obj.batch_id
+    for obj in session.deleted:
+        if isinstance(obj, models.Student):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_student_batch_changes(session: Session) -> None:
+    changes = session.info.pop("today_attendance_batch_changes", None)
+    if changes:
+        for student_id, batch_id in changes.items():
+            today_attendance.set_student_batch(student_id, batch_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_student_batch_changes(session: Session) -> None:
+    session.info.pop("today_attendance_batch_changes", None)
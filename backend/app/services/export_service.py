@@ -0,0 +1,121 @@
+"""
+Export service for the MCQ Test & Attendance System.
+Encodes query results as CSV or Parquet one chunk at a time, so exports can be streamed to the
+client without holding the whole result in memory. Parquet support needs the optional pyarrow
+package.
+"""
+
+import csv
+import io
+import logging
+from typing import Any, AsyncIterator, Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Media types of the export formats
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Whether the optional pyarrow dependency needed for Parquet export is installed."""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def csv_stream(columns: Sequence[str], chunks: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[str]:
+    """
+    Encode rows as CSV.
+
+    Args:
+        columns: Header row
+        chunks: Lists of rows, as produced by AsyncResult.partitions()
+
+    Yields:
+        The header, then one CSV text block per chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object that hands out what was written since the last drain().
+
+    tell() keeps counting across drains, since the Parquet writer records file offsets in the footer.
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        written = self._buffer.write(data)
+        self._position += written
+        return written
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+async def parquet_stream(
+    columns: Sequence[str],
+    types: Dict[str, str],
+    chunks: AsyncIterator[Sequence[Sequence[Any]]]
+) -> AsyncIterator[bytes]:
+    """
+    Encode rows as a Parquet file, one row group per chunk.
+
+    Args:
+        columns: Column names
+        types: pyarrow type name of each column ("int64", "string", "date32", ...)
+        chunks: Lists of rows, as produced by AsyncResult.partitions()
+
+    Yields:
+        Parquet file bytes, written as each row group is completed
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.type_for_alias(types[name])) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        async for rows in chunks:
+            if not rows:
+                continue
+            arrays = [
+                pa.array([row[i] for row in rows], type=schema.field(i).type)
+                for i in range(len(columns))
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,224 @@
+"""
+Approximate nearest-neighbour (IVF) index for face embeddings in the MCQ Test & Attendance System.
+Embeddings are partitioned into clusters with k-means; a search only scans the clusters closest
+to the probe, so identification cost grows with the size of a few clusters instead of the whole
+enrolment. The vectors and their cluster labels stay in FaceEmbeddingIndex; this module only
+trains, applies and persists the cluster centroids.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Number of rows assigned per matrix product (bounds temporary memory)
+ASSIGN_CHUNK_SIZE = 4096
+# Training sample size per cluster for k-means
+TRAIN_SAMPLES_PER_LIST = 64
+# Label of rows that have not been assigned to a cluster
+UNASSIGNED = -1
+
+
+class IVFIndex:
+    """Inverted-file index: k-means centroids that partition the embedding space into lists."""
+
+    def __init__(
+        self,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        rerank: int = 32,
+        min_size: int = 20000,
+        train_iterations: int = 10,
+        path: Optional[str] = None
+    ):
+        """
+        Initialize the index. It is untrained until train() or load() is called.
+
+        Args:
+            n_lists: Number of clusters (0 picks sqrt(n) when training)
+            n_probe: Number of closest clusters scanned per search (higher is slower but more accurate)
+            rerank: Number of candidates re-ranked with exact distances per search
+            min_size: Smallest number of embeddings for which approximate search is used
+            train_iterations: Number of k-means iterations
+            path: File the trained index is persisted to (None disables persistence)
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.rerank = rerank
+        self.min_size = min_size
+        self.train_iterations = train_iterations
+        self.path = path
+        self._lock = threading.Lock()
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_sq_norms: Optional[np.ndarray] = None
+        self._trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        """Whether centroids are available."""
+        return self._centroids is not None
+
+    @property
+    def trained_size(self) -> int:
+        """Number of embeddings the centroids were trained on."""
+        return self._trained_size
+
+    def _set_centroids(self, centroids: np.ndarray, trained_size: int) -> None:
+        with self._lock:
+            self._centroids = centroids
+            self._centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+            self._trained_size = trained_size
+
+    def _nearest(self, vectors: np.ndarray, centroids: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for offset in range(0, vectors.shape[0], ASSIGN_CHUNK_SIZE):
+            chunk = vectors[offset:offset + ASSIGN_CHUNK_SIZE]
+            # |c|^2 - 2 v.c ranks centroids the same way as |v - c|^2
+            scores = sq_norms[None, :] - 2.0 * (chunk @ centroids.T)
+            labels[offset:offset + chunk.shape[0]] = np.argmin(scores, axis=1)
+        return labels
+
+    def train(self, vectors: np.ndarray, seed: int = 0) -> None:
+        """
+        Train the centroids with k-means on a sample of the embeddings.
+
+        Args:
+            vectors: Embedding matrix
+            seed: Random seed for sampling and initialization
+        """
+        n = vectors.shape[0]
+        if n == 0:
+            return
+
+        n_lists = max(1, min(self.n_lists or int(np.sqrt(n)), n))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, n_lists * TRAIN_SAMPLES_PER_LIST)
+        sample = vectors[rng.choice(n, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            labels = self._nearest(sample, centroids, np.einsum('ij,ij->i', centroids, centroids))
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            filled = counts > 0
+            # Empty clusters keep their previous centroid
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        self._set_centroids(centroids, n)
+        logger.info(f"Trained face ANN index with {n_lists} lists over {n} embeddings")
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Cluster labels for a set of embeddings.
+
+        Args:
+            vectors: Embedding matrix
+
+        Returns:
+            One label per row (UNASSIGNED for every row while untrained)
+        """
+        if not self.trained:
+            return np.full(vectors.shape[0], UNASSIGNED, dtype=np.int64)
+        return self._nearest(vectors, self._centroids, self._centroid_sq_norms)
+
+    def probe_mask(self, vector: np.ndarray) -> np.ndarray:
+        """
+        Which lists to scan for a probe.
+
+        The mask has one extra trailing False entry so that indexing it with UNASSIGNED (-1)
+        labels never selects a row.
+
+        Args:
+            vector: Probe embedding
+
+        Returns:
+            Boolean array of length n_lists + 1
+        """
+        n_lists = self._centroids.shape[0]
+        scores = self._centroid_sq_norms - 2.0 * (self._centroids @ vector)
+        n_probe = max(1, min(self.n_probe, n_lists))
+        mask = np.zeros(n_lists + 1, dtype=bool)
+        if n_probe < n_lists:
+            mask[np.argpartition(scores, n_probe - 1)[:n_probe]] = True
+        else:
+            mask[:n_lists] = True
+        return mask
+
+    def save(self, face_ids: np.ndarray, labels: np.ndarray, path: Optional[str] = None) -> bool:
+        """
+        Persist the centroids and assignments so startup does not have to retrain.
+
+        Args:
+            face_ids: FaceImage IDs
+            labels: Cluster label of each face
+            path: Target file (defaults to the configured path)
+
+        Returns:
+            True if the index was written
+        """
+        path = path or self.path
+        if not path or not self.trained:
+            return False
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    centroids=self._centroids,
+                    face_ids=face_ids,
+                    labels=labels,
+                    trained_size=self._trained_size
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        logger.info(f"Saved face ANN index to {path}")
+        return True
+
+    def load(self, dim: int, path: Optional[str] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Load a persisted index.
+
+        Args:
+            dim: Expected embedding dimension
+            path: Source file (defaults to the configured path)
+
+        Returns:
+            (face_ids, labels) of the persisted assignments, or None if no compatible index was found
+        """
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                centroids = data["centroids"].astype(np.float32)
+                face_ids, labels = data["face_ids"], data["labels"]
+                trained_size = int(data["trained_size"])
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable face ANN index {path}: {str(e)}")
+            return None
+
+        if centroids.ndim != 2 or centroids.shape[1] != dim:
+            logger.warning(f"Ignoring face ANN index {path} with incompatible shape {centroids.shape}")
+            return None
+        if self.n_lists and centroids.shape[0] != self.n_lists:
+            logger.info(f"Ignoring face ANN index {path}: configured for {self.n_lists} lists")
+            return None
+
+        self._set_centroids(centroids, trained_size)
+        logger.info(f"Loaded face ANN index with {centroids.shape[0]} lists from {path}")
+        return face_ids, labels
@@ -0,0 +1,353 @@
+"""
+Face compute service for the MCQ Test & Attendance System.
+Face detection and encoding (dlib HOG + ResNet) are CPU-bound and take hundreds of milliseconds
+per image, so they run in a bounded process pool instead of on the event loop. Images are
+downscaled before detection, and the embedding is computed from a face crop of the larger image.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.settings import settings
+from app.core.performance import performance_monitor
+
+logger = logging.getLogger(__name__)
+
+# Margin added around a detected face before cropping, as a fraction of the face size
+FACE_CROP_MARGIN = 0.5
+
+# (top, right, bottom, left), as returned by face_recognition.face_locations
+FaceLocation = Tuple[int, int, int, int]
+
+
+@dataclass
+class FaceComputeResult:
+    """Result of running face detection and encoding on one image."""
+    embedding: Optional[List[float]]
+    face_count: int
+    timings: Dict[str, float] = field(default_factory=dict)  # {stage: seconds}
+    error: Optional[str] = None  # set by extract_embeddings for images that could not be processed
+
+
+def prepare_face_image(image_bytes: bytes, detect_max_dimension: int = 0, decode_max_dimension: int = 0):
+    """
+    Decode an image and make a smaller copy for face detection.
+
+    JPEGs are decoded in PIL draft mode, which lets libjpeg decode directly at 1/2, 1/4 or 1/8
+    scale when the full resolution is not needed.
+
+    Args:
+        image_bytes: Raw image content (JPEG, PNG, ...)
+        detect_max_dimension: Longest side of the detection image (0 keeps the decoded size)
+        decode_max_dimension: Longest side the image is decoded at (0 decodes at full resolution)
+
+    Returns:
+        (image, detect_image, scale) where image is the decoded RGB array, detect_image the
+        downscaled copy and scale the ratio between their sizes
+
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    import numpy as np
+    from PIL import Image
+
+    try:
+        image = Image.open(BytesIO(image_bytes))
+        if decode_max_dimension and image.format == 'JPEG':
+            image.draft('RGB', (decode_max_dimension, decode_max_dimension))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.load()
+    except Exception as e:
+        raise ValueError(f"Invalid image format: {str(e)}")
+
+    if decode_max_dimension and max(image.size) > decode_max_dimension:
+        image.thumbnail((decode_max_dimension, decode_max_dimension), Image.BILINEAR)
+
+    detect_image = image
+    scale = 1.0
+    if detect_max_dimension and max(image.size) > detect_max_dimension:
+        scale = max(image.size) / detect_max_dimension
+        detect_size = (max(1, round(image.width / scale)), max(1, round(image.height / scale)))
+        detect_image = image.resize(detect_size, Image.BILINEAR)
+
+    return np.asarray(image), np.asarray(detect_image), scale
+
+
+def map_face_location(location: FaceLocation, scale: float, shape: Tuple[int, ...]) -> FaceLocation:
+    """Map a face location found on the detection image back onto the decoded image."""
+    top, right, bottom, left = location
+    height, width = shape[:2]
+    return (
+        max(0, int(top * scale)),
+        min(width, int(round(right * scale))),
+        min(height, int(round(bottom * scale))),
+        max(0, int(left * scale))
+    )
+
+
+def crop_face(image, location: FaceLocation, margin: float = FACE_CROP_MARGIN):
+    """
+    Crop a face with some margin so the landmark model still sees the whole face.
+
+    Returns:
+        (crop, location) with the face location relative to the crop
+    """
+    top, right, bottom, left = location
+    pad_y = int((bottom - top) * margin)
+    pad_x = int((right - left) * margin)
+    height, width = image.shape[:2]
+    y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+    x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+    return image[y0:y1, x0:x1], (top - y0, right - x0, bottom - y0, left - x0)
+
+
+def compute_face_embedding(
+    image_bytes: bytes,
+    detect_max_dimension: int = 0,
+    decode_max_dimension: int = 0
+) -> FaceComputeResult:
+    """
+    Decode an image, detect faces on a downscaled copy and encode the first one.
+
+    Runs inside a worker process, so it must only use picklable arguments and return values.
+    Also called in-process by the sync FaceService methods.
+
+    Args:
+        image_bytes: Raw image content (JPEG, PNG, ...)
+        detect_max_dimension: Longest side of the image used for detection (0 disables downscaling)
+        decode_max_dimension: Longest side the image is decoded at for encoding (0 keeps full resolution)
+
+    Returns:
+        FaceComputeResult with the embedding of the first detected face (None if no face was found)
+    """
+    import numpy as np
+    import face_recognition
+
+    timings = {"started_at": time.time()}
+
+    start = time.perf_counter()
+    image_array, detect_array, scale = prepare_face_image(image_bytes, detect_max_dimension, decode_max_dimension)
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    face_locations = face_recognition.face_locations(detect_array)
+    timings["detect"] = time.perf_counter() - start
+    if scale > 1.0:
+        # HOG detection cost is linear in the pixel count, so estimate what full-size detection would have cost
+        pixel_ratio = (image_array.shape[0] * image_array.shape[1]) / (detect_array.shape[0] * detect_array.shape[1])
+        timings["detect_saved"] = timings["detect"] * (pixel_ratio - 1.0)
+
+    if not face_locations:
+        return FaceComputeResult(embedding=None, face_count=0, timings=timings)
+
+    start = time.perf_counter()
+    location = map_face_location(face_locations[0], scale, image_array.shape)
+    crop, crop_location = crop_face(image_array, location)
+    face_encodings = face_recognition.face_encodings(np.ascontiguousarray(crop), [crop_location])
+    timings["encode"] = time.perf_counter() - start
+
+    embedding = face_encodings[0].tolist() if face_encodings else None
+    return FaceComputeResult(embedding=embedding, face_count=len(face_locations), timings=timings)
+
+
+class FaceComputeService:
+    """Bounded process pool for face detection and encoding."""
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        retry_after: int = 1,
+        detect_max_dimension: int = 0,
+        decode_max_dimension: int = 0
+    ):
+        """
+        Initialize the service. The process pool is created on first use.
+
+        Args:
+            max_workers: Number of worker processes
+            max_queue: Number of jobs allowed to wait for a free worker before rejecting new ones
+            retry_after: Seconds clients are told to wait (Retry-After) when the pool is saturated
+            detect_max_dimension: Longest side of the image used for face detection (0 = full size)
+            decode_max_dimension: Longest side images are decoded at for encoding (0 = full size)
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.detect_max_dimension = detect_max_dimension
+        self.decode_max_dimension = decode_max_dimension
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs currently running or queued."""
+        return self._in_flight
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"Started face compute pool with {self.max_workers} workers")
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a pool whose worker died (OOM, crash in dlib) so the next job starts a new one."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # already replaced by another request
+            self._executor = None
+        logger.error("Face compute worker died; the pool will be restarted")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _worker_died(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Face recognition worker stopped unexpectedly. Please retry shortly.",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Face recognition is busy. Please retry shortly.",
+                    headers={"Retry-After": str(self.retry_after)}
+                )
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def extract_embedding(self, image_bytes: bytes) -> FaceComputeResult:
+        """
+        Run face detection and encoding in the process pool.
+
+        Args:
+            image_bytes: Raw image content
+
+        Returns:
+            FaceComputeResult with per-stage timings
+
+        Raises:
+            HTTPException: 503 with Retry-After when the pool is saturated or a worker died, 400 for invalid images
+        """
+        self._acquire()
+        submitted_at = time.time()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            result = await loop.run_in_executor(
+                executor,
+                compute_face_embedding,
+                image_bytes,
+                self.detect_max_dimension,
+                self.decode_max_dimension
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise self._worker_died()
+        finally:
+            self._release()
+
+        result.timings["queue"] = max(0.0, result.timings.pop("started_at") - submitted_at)
+        result.timings["total"] = time.perf_counter() - start
+        self._record_timings(result.timings)
+
+        return result
+
+    async def extract_embeddings(self, images: List[bytes]) -> List[FaceComputeResult]:
+        """
+        Run face detection and encoding for several images.
+
+        The whole batch takes a single admission slot and uses at most max_workers processes, so one
+        large batch cannot starve single-image requests of queue space.
+
+        Args:
+            images: Raw image contents
+
+        Returns:
+            One FaceComputeResult per image, in order; invalid images have `error` set instead of raising
+
+        Raises:
+            HTTPException: 503 with Retry-After when the pool is saturated
+        """
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            semaphore = asyncio.Semaphore(self.max_workers)
+
+            async def run(image_bytes: bytes) -> FaceComputeResult:
+                async with semaphore:
+                    submitted_at = time.time()
+                    start = time.perf_counter()
+                    try:
+                        result = await loop.run_in_executor(
+                            executor,
+                            compute_face_embedding,
+                            image_bytes,
+                            self.detect_max_dimension,
+                            self.decode_max_dimension
+                        )
+                    except ValueError as e:
+                        return FaceComputeResult(embedding=None, face_count=0, error=str(e))
+                    except BrokenProcessPool:
+                        self._discard_executor(executor)
+                        return FaceComputeResult(embedding=None, face_count=0, error=self._worker_died().detail)
+                    except Exception as e:
+                        # One image must not fail the whole batch (decoder/dlib errors, crashed workers)
+                        logger.error(f"Face compute failed for a batch image: {e!r}")
+                        return FaceComputeResult(
+                            embedding=None, face_count=0, error=f"Face processing failed: {str(e) or type(e).__name__}"
+                        )
+                result.timings["queue"] = max(0.0, result.timings.pop("started_at") - submitted_at)
+                result.timings["total"] = time.perf_counter() - start
+                self._record_timings(result.timings)
+                return result
+
+            return list(await asyncio.gather(*(run(image_bytes) for image_bytes in images)))
+        finally:
+            self._release()
+
+    @staticmethod
+    def _record_timings(timings: Dict[str, float]) -> None:
+        """Record per-stage timings so they show up in the admin performance statistics."""
+        for stage, seconds in timings.items():
+            performance_monitor.record_request(f"face_compute:{stage}", seconds)
+        logger.debug(
+            "Face compute timings: " + ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items())
+        )
+
+    def shutdown(self) -> None:
+        """Shut down the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Create global face compute service
+face_compute = FaceComputeService(
+    max_workers=settings.FACE_COMPUTE_WORKERS,
+    max_queue=settings.FACE_COMPUTE_QUEUE_SIZE,
+    retry_after=settings.FACE_COMPUTE_RETRY_AFTER,
+    detect_max_dimension=settings.FACE_DETECT_MAX_DIMENSION,
+    decode_max_dimension=settings.FACE_DECODE_MAX_DIMENSION
+)
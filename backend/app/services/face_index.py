@@ -0,0 +1,555 @@
+"""
+In-memory face embedding index for the MCQ Test & Attendance System.
+This module keeps every stored face embedding in one contiguous float32 matrix so that
+identification is a single vectorized distance computation instead of a per-row loop.
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.embedding_codec import EMBEDDING_DIM, parse_embedding
+from app.core.settings import settings
+from app.db import models
+from app.services.face_ann import UNASSIGNED, IVFIndex
+
+logger = logging.getLogger(__name__)
+
+# Number of probes compared per matrix product in search_batch (bounds temporary memory)
+SEARCH_CHUNK_SIZE = 64
+# Retrain the ANN centroids on load once the index has grown this much since they were trained
+ANN_RETRAIN_GROWTH = 2.0
+
+
+class FaceEmbeddingIndex:
+    """
+    Thread-safe in-memory index of face embeddings.
+
+    Besides the global matrix, the index keeps one sub-index per student batch so that
+    batch-scoped matching only compares against the faces of that batch's students.
+    Unscoped searches can first narrow the candidates down to the users with the closest
+    embedding centroids, and over large enrolments can optionally go through an IVF index.
+    """
+
+    def __init__(
+        self,
+        dim: int = EMBEDDING_DIM,
+        initial_capacity: int = 1024,
+        ann: Optional[IVFIndex] = None,
+        centroid_candidates: int = 0
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            dim: Dimension of the embeddings
+            initial_capacity: Number of rows to preallocate
+            ann: Optional approximate nearest-neighbour index used for unscoped searches
+            centroid_candidates: Number of users whose embeddings are compared after a first pass
+                against per-user centroids (0 disables the centroid pass)
+        """
+        self._dim = dim
+        self._lock = threading.RLock()
+        self._matrix = np.empty((initial_capacity, dim), dtype=np.float32)
+        self._user_ids = np.empty(initial_capacity, dtype=np.int64)
+        self._face_ids = np.empty(initial_capacity, dtype=np.int64)
+        self._sq_norms = np.empty(initial_capacity, dtype=np.float32)  # cached |row|^2 for batched search
+        self._ann_labels = np.empty(initial_capacity, dtype=np.int64)  # IVF list of each row
+        self._positions: dict = {}  # {face_id: row}
+        self._size = 0
+        self._loaded = False
+        self._user_batches: Dict[int, int] = {}  # {user_id: batch_id} for students
+        self._batch_indexes: Dict[int, "FaceEmbeddingIndex"] = {}  # {batch_id: sub-index}
+        self._ann = ann
+        self._centroid_candidates = centroid_candidates
+        self._centroids = FaceEmbeddingIndex(dim=dim, initial_capacity=64) if centroid_candidates > 0 else None
+        self._user_sums: Dict[int, np.ndarray] = {}  # {user_id: sum of the user's embeddings}
+        self._user_counts: Dict[int, int] = {}  # {user_id: number of embeddings}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the index has been populated from the database."""
+        return self._loaded
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow the backing arrays so they can hold at least `capacity` rows."""
+        if capacity <= self._matrix.shape[0]:
+            return
+
+        new_capacity = max(capacity, self._matrix.shape[0] * 2)
+        matrix = np.empty((new_capacity, self._dim), dtype=np.float32)
+        user_ids = np.empty(new_capacity, dtype=np.int64)
+        face_ids = np.empty(new_capacity, dtype=np.int64)
+        sq_norms = np.empty(new_capacity, dtype=np.float32)
+        ann_labels = np.empty(new_capacity, dtype=np.int64)
+
+        matrix[:self._size] = self._matrix[:self._size]
+        user_ids[:self._size] = self._user_ids[:self._size]
+        face_ids[:self._size] = self._face_ids[:self._size]
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        ann_labels[:self._size] = self._ann_labels[:self._size]
+
+        self._matrix, self._user_ids, self._face_ids, self._sq_norms = matrix, user_ids, face_ids, sq_norms
+        self._ann_labels = ann_labels
+
+    def load(
+        self,
+        rows: Iterable[Tuple[int, int, object]],
+        user_batches: Optional[Iterable[Tuple[int, Optional[int]]]] = None
+    ) -> None:
+        """
+        Replace the index contents.
+
+        Args:
+            rows: Iterable of (face_id, user_id, embedding) tuples
+            user_batches: Optional iterable of (user_id, batch_id) tuples for students
+        """
+        with self._lock:
+            self._size = 0
+            self._positions = {}
+            self._reset_centroids()
+            self._batch_indexes = {}
+            self._user_batches = {
+                user_id: batch_id for user_id, batch_id in (user_batches or []) if batch_id is not None
+            }
+            skipped = 0
+
+            for face_id, user_id, embedding in rows:
+                if not self._add(face_id, user_id, embedding):
+                    skipped += 1
+
+            self._loaded = True
+
+            if skipped:
+                logger.warning(f"Skipped {skipped} face images with missing or invalid embeddings")
+            logger.info(f"Loaded {self._size} face embeddings into the index")
+
+            if self._ann is not None:
+                self._prepare_ann()
+
+    def _prepare_ann(self) -> None:
+        """Load the persisted ANN index, or (re)train it when missing or stale."""
+        if self._size < self._ann.min_size:
+            return
+
+        face_ids, labels = self._face_ids[:self._size], self._ann_labels[:self._size]
+        persisted = self._ann.load(self._dim) if not self._ann.trained else None
+
+        if self._ann.trained and self._size <= self._ann.trained_size * ANN_RETRAIN_GROWTH:
+            if persisted is not None:
+                saved = dict(zip(*(a.tolist() for a in persisted)))
+                labels[:] = [saved.get(face_id, UNASSIGNED) for face_id in face_ids.tolist()]
+            # Assign rows added since the index was trained or saved
+            missing = np.flatnonzero(labels == UNASSIGNED)
+            if missing.size:
+                labels[missing] = self._ann.assign(self._matrix[missing])
+        else:
+            self._train_ann()
+
+    def _train_ann(self) -> None:
+        self._ann.train(self._matrix[:self._size])
+        self._ann_labels[:self._size] = self._ann.assign(self._matrix[:self._size])
+        self._ann.save(self._face_ids[:self._size], self._ann_labels[:self._size])
+
+    def rebuild_ann(self) -> bool:
+        """
+        Retrain the ANN index on the current embeddings and persist it.
+
+        Returns:
+            True if the index was rebuilt, False if ANN search is disabled or the index is empty
+        """
+        with self._lock:
+            if self._ann is None or not self._size:
+                return False
+            self._train_ann()
+            return True
+
+    def save_ann(self) -> bool:
+        """Persist the ANN index (e.g. on shutdown) so startup does not have to retrain it."""
+        with self._lock:
+            if self._ann is None:
+                return False
+            return self._ann.save(self._face_ids[:self._size], self._ann_labels[:self._size])
+
+    async def load_async(self, db: AsyncSession) -> None:
+        """Load all stored embeddings from the database using async SQLAlchemy."""
+        result = await db.execute(
+            select(models.FaceImage.id, models.FaceImage.user_id, models.FaceImage.embedding_vector)
+        )
+        students = await db.execute(select(models.Student.user_id, models.Student.batch_id))
+        self.load(result.all(), students.all())
+
+    def load_sync(self, db: Session) -> None:
+        """Load all stored embeddings from the database (sync version)."""
+        result = db.execute(
+            select(models.FaceImage.id, models.FaceImage.user_id, models.FaceImage.embedding_vector)
+        )
+        students = db.execute(select(models.Student.user_id, models.Student.batch_id))
+        self.load(result.all(), students.all())
+
+    async def ensure_loaded_async(self, db: AsyncSession) -> None:
+        """Load the index from the database on first use."""
+        if not self._loaded:
+            await self.load_async(db)
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load the index from the database on first use (sync version)."""
+        if not self._loaded:
+            self.load_sync(db)
+
+    def _add(self, face_id: int, user_id: int, embedding: object) -> bool:
+        vector = parse_embedding(embedding)
+        if vector is None:
+            return False
+
+        row = self._positions.get(face_id)
+        if row is None:
+            self._reserve(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._positions[face_id] = row
+        else:
+            self._remove_from_batch(face_id, int(self._user_ids[row]))
+            self._update_centroid(int(self._user_ids[row]), self._matrix[row], -1)
+
+        self._matrix[row] = vector
+        self._user_ids[row] = user_id
+        self._face_ids[row] = face_id
+        self._sq_norms[row] = np.dot(vector, vector)
+        self._update_centroid(user_id, vector, 1)
+
+        batch_id = self._user_batches.get(user_id)
+        if batch_id is not None:
+            self._batch_index(batch_id)._add(face_id, user_id, vector)
+        self._ann_labels[row] = self._ann.assign(vector[None, :])[0] if self._ann is not None else UNASSIGNED
+        return True
+
+    def _update_centroid(self, user_id: int, vector: np.ndarray, delta: int) -> None:
+        """Add (delta=1) or remove (delta=-1) one embedding from the running centroid of its user."""
+        if self._centroids is None:
+            return
+
+        count = self._user_counts.get(user_id, 0) + delta
+        if count <= 0:
+            self._user_counts.pop(user_id, None)
+            self._user_sums.pop(user_id, None)
+            self._centroids.remove(user_id)
+            return
+
+        total = self._user_sums.get(user_id, 0.0) + delta * vector.astype(np.float64)
+        self._user_counts[user_id] = count
+        self._user_sums[user_id] = total
+        self._centroids._add(user_id, user_id, (total / count).astype(np.float32))
+
+    def _reset_centroids(self) -> None:
+        self._user_sums = {}
+        self._user_counts = {}
+        if self._centroids is not None:
+            self._centroids.clear()
+
+    def centroid(self, user_id: int) -> Optional[np.ndarray]:
+        """Mean embedding of a user (None if the user has no embeddings or centroids are disabled)."""
+        with self._lock:
+            total = self._user_sums.get(user_id)
+            return (total / self._user_counts[user_id]).astype(np.float32) if total is not None else None
+
+    def _batch_index(self, batch_id: int) -> "FaceEmbeddingIndex":
+        """Get or create the sub-index of a batch."""
+        index = self._batch_indexes.get(batch_id)
+        if index is None:
+            index = FaceEmbeddingIndex(dim=self._dim, initial_capacity=64)
+            index._loaded = True
+            self._batch_indexes[batch_id] = index
+        return index
+
+    def _remove_from_batch(self, face_id: int, user_id: int) -> None:
+        batch_id = self._user_batches.get(user_id)
+        if batch_id is not None and batch_id in self._batch_indexes:
+            self._batch_indexes[batch_id].remove(face_id)
+
+    def add(self, face_id: int, user_id: int, embedding: object) -> bool:
+        """
+        Add or replace a single embedding.
+
+        Args:
+            face_id: FaceImage ID
+            user_id: ID of the user the face belongs to
+            embedding: Embedding in any format accepted by parse_embedding
+
+        Returns:
+            True if the embedding was added, False if it was invalid
+        """
+        with self._lock:
+            return self._add(face_id, user_id, embedding)
+
+    def remove(self, face_id: int) -> bool:
+        """
+        Remove an embedding by face image ID.
+
+        Args:
+            face_id: FaceImage ID
+
+        Returns:
+            True if the embedding was removed, False if it was not in the index
+        """
+        with self._lock:
+            row = self._positions.pop(face_id, None)
+            if row is None:
+                return False
+
+            self._remove_from_batch(face_id, int(self._user_ids[row]))
+            self._update_centroid(int(self._user_ids[row]), self._matrix[row], -1)
+
+            # Move the last row into the freed slot to keep the matrix contiguous
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._user_ids[row] = self._user_ids[last]
+                self._face_ids[row] = self._face_ids[last]
+                self._sq_norms[row] = self._sq_norms[last]
+                self._ann_labels[row] = self._ann_labels[last]
+                self._positions[int(self._face_ids[row])] = row
+
+            self._size = last
+            return True
+
+    def set_user_batch(self, user_id: int, batch_id: Optional[int]) -> None:
+        """
+        Move a student's embeddings to the sub-index of another batch.
+
+        Args:
+            user_id: ID of the student's user
+            batch_id: New batch ID (None to remove the user from all batches)
+        """
+        with self._lock:
+            old_batch_id = self._user_batches.get(user_id)
+            if old_batch_id == batch_id:
+                return
+
+            rows = np.flatnonzero(self._user_ids[:self._size] == user_id)
+            for row in rows:
+                self._remove_from_batch(int(self._face_ids[row]), user_id)
+
+            if batch_id is None:
+                self._user_batches.pop(user_id, None)
+                return
+
+            self._user_batches[user_id] = batch_id
+            for row in rows:
+                self._batch_index(batch_id)._add(int(self._face_ids[row]), user_id, self._matrix[row])
+
+    def clear(self) -> None:
+        """Remove all embeddings and mark the index as not loaded."""
+        with self._lock:
+            self._size = 0
+            self._positions = {}
+            self._reset_centroids()
+            self._user_batches = {}
+            self._batch_indexes = {}
+            self._loaded = False
+
+    def count(self, user_id: Optional[int] = None, batch_id: Optional[int] = None) -> int:
+        """Number of embeddings in the index, optionally for a single user and/or batch."""
+        with self._lock:
+            if batch_id is not None:
+                index = self._batch_indexes.get(batch_id)
+                return index.count(user_id) if index is not None else 0
+            if user_id is None:
+                return self._size
+            return int(np.count_nonzero(self._user_ids[:self._size] == user_id))
+
+    def search(
+        self,
+        embedding: Union[Sequence[float], np.ndarray],
+        k: int = 1,
+        user_id: Optional[int] = None,
+        batch_id: Optional[int] = None
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Find the k nearest stored embeddings.
+
+        Args:
+            embedding: Probe embedding
+            k: Number of results to return
+            user_id: Optional user ID to restrict the search to
+            batch_id: Optional batch ID to restrict the search to that batch's students
+
+        Returns:
+            List of (face_id, user_id, distance) tuples ordered by increasing distance
+        """
+        return self.search_batch([embedding], k=k, user_id=user_id, batch_id=batch_id)[0]
+
+    def search_batch(
+        self,
+        embeddings: Union[Sequence[Sequence[float]], np.ndarray],
+        k: int = 1,
+        user_id: Optional[int] = None,
+        batch_id: Optional[int] = None
+    ) -> List[List[Tuple[int, int, float]]]:
+        """
+        Find the k nearest stored embeddings for several probes at once.
+
+        Args:
+            embeddings: Probe embeddings, one per row
+            k: Number of results to return per probe
+            user_id: Optional user ID to restrict the search to
+            batch_id: Optional batch ID to restrict the search to that batch's students
+
+        Returns:
+            One list of (face_id, user_id, distance) tuples per probe, ordered by increasing distance
+        """
+        probes = np.asarray(embeddings, dtype=np.float32).reshape(-1, self._dim)
+
+        if batch_id is not None:
+            with self._lock:
+                index = self._batch_indexes.get(batch_id)
+            if index is None:
+                return [[] for _ in range(probes.shape[0])]
+            return index.search_batch(probes, k=k, user_id=user_id)
+
+        with self._lock:
+            if user_id is None and self._ann is not None and self._ann.trained and self._size >= self._ann.min_size:
+                return [self._search_ann(probe, k) for probe in probes]
+
+            if user_id is None and self._centroids is not None and (
+                self._centroid_candidates < len(self._centroids) < self._size
+            ):
+                # First pass against one centroid per user, then compare with the closest users' embeddings
+                candidates = self._centroids.search_batch(probes, k=self._centroid_candidates)
+                return [
+                    self._search_users(probe, [user for _, user, _ in users], k)
+                    for probe, users in zip(probes, candidates)
+                ]
+
+            matrix = self._matrix[:self._size]
+            sq_norms = self._sq_norms[:self._size]
+            user_ids = self._user_ids[:self._size]
+            face_ids = self._face_ids[:self._size]
+
+            if user_id is not None:
+                mask = user_ids == user_id
+                matrix, sq_norms = matrix[mask], sq_norms[mask]
+                user_ids, face_ids = user_ids[mask], face_ids[mask]
+
+            rows = matrix.shape[0]
+            if rows == 0 or k <= 0:
+                return [[] for _ in range(probes.shape[0])]
+
+            k = min(k, rows)
+            results = []
+
+            for offset in range(0, probes.shape[0], SEARCH_CHUNK_SIZE):
+                chunk = probes[offset:offset + SEARCH_CHUNK_SIZE]
+
+                # Squared Euclidean distances for the whole chunk in one matrix product:
+                # |p - m|^2 = |p|^2 + |m|^2 - 2 p.m
+                sq_distances = (
+                    np.einsum('ij,ij->i', chunk, chunk)[:, None]
+                    + sq_norms[None, :]
+                    - 2.0 * (chunk @ matrix.T)
+                )
+
+                if k < rows:
+                    candidates = np.argpartition(sq_distances, k - 1, axis=1)[:, :k]
+                else:
+                    candidates = np.broadcast_to(np.arange(rows), (chunk.shape[0], rows))
+
+                for probe, candidate_rows in zip(chunk, candidates):
+                    # Exact distances for the few candidates (same metric as face_recognition.face_distance),
+                    # which also avoids the cancellation error of the expanded form
+                    distances = np.linalg.norm(matrix[candidate_rows] - probe, axis=1)
+                    order = np.argsort(distances)
+                    results.append([
+                        (int(face_ids[candidate_rows[i]]), int(user_ids[candidate_rows[i]]), float(distances[i]))
+                        for i in order
+                    ])
+
+            return results
+
+    def _search_ann(self, probe: np.ndarray, k: int) -> List[Tuple[int, int, float]]:
+        """
+        Approximate search: scan only the closest IVF clusters, then re-rank the best candidates
+        with exact distances so results are on the same scale as the exact search.
+        """
+        if k <= 0:
+            return []
+
+        rows = np.flatnonzero(self._ann.probe_mask(probe)[self._ann_labels[:self._size]])
+        if rows.size == 0:
+            return []
+
+        sq_distances = self._sq_norms[rows] - 2.0 * (self._matrix[rows] @ probe)
+        keep = min(rows.size, max(k, self._ann.rerank))
+        if keep < rows.size:
+            rows = rows[np.argpartition(sq_distances, keep - 1)[:keep]]
+
+        return self._rank_rows(probe, rows, k)
+
+    def _search_users(self, probe: np.ndarray, user_ids: List[int], k: int) -> List[Tuple[int, int, float]]:
+        """Exact search restricted to the embeddings of a few users."""
+        if k <= 0:
+            return []
+        rows = np.flatnonzero(np.isin(self._user_ids[:self._size], user_ids))
+        return self._rank_rows(probe, rows, k)
+
+    def _rank_rows(self, probe: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[int, int, float]]:
+        """The k rows closest to the probe by exact Euclidean distance."""
+        distances = np.linalg.norm(self._matrix[rows] - probe, axis=1)
+        order = np.argsort(distances)[:k]
+        return [
+            (int(self._face_ids[rows[i]]), int(self._user_ids[rows[i]]), float(distances[i]))
+            for i in order
+        ]
+
+
+def _create_ann_index() -> Optional[IVFIndex]:
+    if not settings.FACE_ANN_ENABLED:
+        return None
+    return IVFIndex(
+        n_lists=settings.FACE_ANN_LISTS,
+        n_probe=settings.FACE_ANN_PROBES,
+        rerank=settings.FACE_ANN_RERANK,
+        min_size=settings.FACE_ANN_MIN_SIZE,
+        path=settings.FACE_ANN_INDEX_PATH
+    )
+
+
+# Create global face index instance
+face_index = FaceEmbeddingIndex(ann=_create_ann_index(), centroid_candidates=settings.FACE_CENTROID_CANDIDATES)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_student_batch_changes(session: Session, flush_context) -> None:
+    """Remember students whose batch changed so the index can follow once the transaction commits."""
+    changes = session.info.setdefault("face_index_batch_changes", {})
+    for obj in session.new:
+        if isinstance(obj, models.Student) and obj.user_id is not None:
+            changes[obj.user_id] = obj.batch_id
+    for obj in session.dirty:
+        if isinstance(obj, models.Student) and obj.user_id is not None:
+            if inspect(obj).attrs.batch_id.history.has_changes():
+                changes[obj.user_id] = obj.batch_id
+    for obj in session.deleted:
+        if isinstance(obj, models.Student) and obj.user_id is not None:
+            changes[obj.user_id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_student_batch_changes(session: Session) -> None:
+    changes = session.info.pop("face_index_batch_changes", None)
+    if changes and face_index.loaded:
+        for user_id, batch_id in changes.items():
+            face_index.set_user_batch(user_id, batch_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_student_batch_changes(session: Session) -> None:
+    session.info.pop("face_index_batch_changes", None)
@@ -1,19 +1,19 @@
 import base64
-import json
 import numpy as np
-import face_recognition
-from io import BytesIO
-from PIL import Image
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import date, datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, func
 from fastapi import HTTPException, status
 
 from app.db import models
-from app.schemas.face import FaceImageCreate, FaceVerification
+from app.schemas.face import FaceImageCreate, FaceImageResponse, FaceVerification
 from app.core.settings import settings
+from app.core.embedding_codec import encode_embedding
+from app.services.face_index import face_index
+from app.services.face_compute import face_compute, compute_face_embedding
+from app.services.file_storage_service import FileStorageService
 
 
 class FaceService:
@@ -21,25 +21,14 @@ class FaceService:
     SIMILARITY_THRESHOLD = 0.6
     
     @staticmethod
-    def _decode_base64_image(base64_string: str) -> np.ndarray:
-        """Decode a base64 image string to a numpy array for face_recognition."""
+    def _decode_base64_payload(base64_string: str) -> bytes:
+        """Decode a base64 image string (optionally a data URL) to raw bytes."""
         try:
             # Remove potential data URL prefix
             if ',' in base64_string:
                 base64_string = base64_string.split(',', 1)[1]
                 
-            # Decode base64 to bytes
-            image_bytes = base64.b64decode(base64_string)
-            
-            # Open as PIL Image
-            image = Image.open(BytesIO(image_bytes))
-            
-            # Convert to RGB if needed (face_recognition requires RGB)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-                
-            # Convert to numpy array
-            return np.array(image)
+            return base64.b64decode(base64_string)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -47,31 +36,54 @@ class FaceService:
             )
     
     @staticmethod
-    def _extract_face_embedding(image_array: np.ndarray) -> Optional[List[float]]:
-        """Extract face embedding from image array."""
-        # Detect faces in the image
-        face_locations = face_recognition.face_locations(image_array)
-        
-        if not face_locations:
-            return None
-            
-        # Get face encodings (embeddings)
-        face_encodings = face_recognition.face_encodings(image_array, face_locations)
-        
-        if not face_encodings:
-            return None
-            
-        # Return the first face encoding as a list
-        return face_encodings[0].tolist()
+    def _store_image(image_bytes: bytes) -> str:
+        """Write the original image to content-addressed storage and return its relative path.
+        
+        Face images are kept in FACE_IMAGE_DIR rather than the public upload directory, so they
+        can only be downloaded through the authenticated image endpoint.
+        """
+        return FileStorageService.save_content_addressed(
+            image_bytes,
+            ext=FileStorageService.image_extension(image_bytes),
+            base_dir=settings.FACE_IMAGE_DIR
+        )
+    
+    @staticmethod
+    def image_file_path(image_path: str) -> str:
+        """Absolute path of a stored face image; raises FileNotFoundError if it is missing."""
+        return FileStorageService.get_file_path(image_path, base_dir=settings.FACE_IMAGE_DIR)
     
     @staticmethod
-    async def create_face_image_async(db: AsyncSession, user_id: int, face_data: FaceImageCreate) -> models.FaceImage:
-        """Create a new face image record with embedding using async SQLAlchemy."""
+    def _delete_image_if_unreferenced(image_path: Optional[str], remaining_references: int) -> None:
+        """Delete a stored image once no face image row refers to it any more."""
+        if image_path and remaining_references == 0:
+            FileStorageService.delete_file(image_path, base_dir=settings.FACE_IMAGE_DIR)
+    
+    @staticmethod
+    def _extract_face_embedding(image_bytes: bytes) -> Optional[List[float]]:
+        """Extract the face embedding from raw image bytes in-process, using the same preprocessing as the compute pool."""
+        try:
+            result = compute_face_embedding(
+                image_bytes,
+                face_compute.detect_max_dimension,
+                face_compute.decode_max_dimension
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        return result.embedding
+    
+    @staticmethod
+    async def create_face_image_async(db: AsyncSession, user_id: int, face_data: FaceImageCreate) -> FaceImageResponse:
+        """Create a new face image record with embedding using async SQLAlchemy.
+        
+        Near-duplicates of one of the user's faces are not stored; the existing record is returned
+        with duplicate=True instead.
+        """
         # Decode the base64 image
-        image_array = FaceService._decode_base64_image(face_data.image_data)
+        image_bytes = FaceService._decode_base64_payload(face_data.image_data)
         
-        # Extract face embedding
-        embedding = FaceService._extract_face_embedding(image_array)
+        # Extract face embedding in the face compute pool
+        embedding = (await face_compute.extract_embedding(image_bytes)).embedding
         
         if not embedding:
             raise HTTPException(
@@ -79,14 +91,23 @@ class FaceService:
                 detail="No face detected in the image"
             )
         
-        # Store embedding as JSON string
-        embedding_json = json.dumps(embedding)
+        # Near-duplicates of an existing face add nothing to matching, so return that face instead
+        await face_index.ensure_loaded_async(db)
+        duplicate_id = FaceService._find_duplicate(embedding, user_id)
+        if duplicate_id is not None:
+            result = await db.execute(select(models.FaceImage).where(models.FaceImage.id == duplicate_id))
+            existing = result.scalars().first()
+            if existing:
+                return FaceImageResponse.model_validate(existing).model_copy(update={"duplicate": True})
+        
+        # Store the original image outside the database
+        image_path = FaceService._store_image(image_bytes)
         
-        # Create database record
+        # Create database record (embedding packed as raw float32 bytes)
         db_face = models.FaceImage(
             user_id=user_id,
-            image_data=face_data.image_data,  # Store original base64 image
-            embedding=embedding_json,
+            image_path=image_path,
+            embedding_vector=encode_embedding(embedding),
             created_at=face_data.created_at or datetime.now().date()
         )
         
@@ -94,7 +115,10 @@ class FaceService:
         await db.commit()
         await db.refresh(db_face)
         
-        return db_face
+        # Keep the in-memory index in sync
+        face_index.add(db_face.id, db_face.user_id, embedding)
+        
+        return FaceImageResponse.model_validate(db_face)
     
     @staticmethod
     async def get_user_face_images_async(db: AsyncSession, user_id: int) -> List[models.FaceImage]:
@@ -113,9 +137,9 @@ class FaceService:
     @staticmethod
     async def verify_face_async(db: AsyncSession, verification_data: FaceVerification) -> Dict[str, Any]:
         """Verify a face against stored embeddings using async SQLAlchemy."""
-        # Decode the image and extract embedding
-        image_array = FaceService._decode_base64_image(verification_data.image_data)
-        new_embedding = FaceService._extract_face_embedding(image_array)
+        # Decode the image and extract embedding in the face compute pool
+        image_bytes = FaceService._decode_base64_payload(verification_data.image_data)
+        new_embedding = (await face_compute.extract_embedding(image_bytes)).embedding
         
         if not new_embedding:
             raise HTTPException(
@@ -126,26 +150,34 @@ class FaceService:
         # Convert to numpy array for comparison
         new_embedding_array = np.array(new_embedding)
         
+        # Make sure the in-memory index has been populated
+        await face_index.ensure_loaded_async(db)
+        
         # Get user to verify against (if specified)
         if verification_data.user_id:
-            # Get face images for specific user
-            face_images = await FaceService.get_user_face_images_async(db, verification_data.user_id)
-            if not face_images:
+            if not face_index.count(verification_data.user_id, batch_id=verification_data.batch_id):
                 return {
                     "verified": False,
                     "message": "No reference faces found for this user"
                 }
-        else:
-            # Get all face images (for identification)
-            face_images = await FaceService.get_all_face_images_async(db)
-            if not face_images:
+        elif verification_data.batch_id:
+            if not face_index.count(batch_id=verification_data.batch_id):
                 return {
                     "verified": False,
-                    "message": "No reference faces found in the system"
+                    "message": "No reference faces found for this batch"
                 }
+        elif not face_index.count():
+            return {
+                "verified": False,
+                "message": "No reference faces found in the system"
+            }
         
         # Find best match
-        best_match = FaceService._find_best_match(new_embedding_array, face_images)
+        best_match = FaceService._find_best_match(
+            new_embedding_array,
+            user_id=verification_data.user_id,
+            batch_id=verification_data.batch_id
+        )
         
         if best_match:
             user_id, similarity = best_match
@@ -168,29 +200,32 @@ class FaceService:
         }
     
     @staticmethod
-    def _find_best_match(embedding: np.ndarray, face_images: List[models.FaceImage]) -> Optional[Tuple[int, float]]:
-        """Find the best matching face from a list of face images."""
-        best_similarity = 0
-        best_user_id = None
-        
-        for face_image in face_images:
-            # Parse stored embedding from JSON
-            stored_embedding = json.loads(face_image.embedding)
-            stored_embedding_array = np.array(stored_embedding)
-            
-            # Calculate face distance (lower is more similar)
-            face_distance = face_recognition.face_distance([stored_embedding_array], embedding)[0]
-            
-            # Convert distance to similarity (1 - distance)
-            similarity = 1 - face_distance
-            
-            # Update best match if this is better
-            if similarity > best_similarity and similarity > FaceService.SIMILARITY_THRESHOLD:
-                best_similarity = similarity
-                best_user_id = face_image.user_id
+    def _find_duplicate(embedding: List[float], user_id: int) -> Optional[int]:
+        """ID of one of the user's faces within FACE_DUPLICATE_DISTANCE of the embedding, if any."""
+        matches = face_index.search(np.asarray(embedding, dtype=np.float32), k=1, user_id=user_id)
+        if matches and matches[0][2] <= settings.FACE_DUPLICATE_DISTANCE:
+            return matches[0][0]
+        return None
+    
+    @staticmethod
+    def _find_best_match(
+        embedding: np.ndarray,
+        user_id: Optional[int] = None,
+        batch_id: Optional[int] = None
+    ) -> Optional[Tuple[int, float]]:
+        """Find the best matching face in the embedding index, optionally restricted to one user or batch."""
+        matches = face_index.search(embedding, k=1, user_id=user_id, batch_id=batch_id)
+        
+        if not matches:
+            return None
+        
+        _, best_user_id, face_distance = matches[0]
+        
+        # Convert distance to similarity (1 - distance)
+        similarity = 1 - face_distance
         
-        if best_user_id:
-            return (best_user_id, float(best_similarity))
+        if similarity > FaceService.SIMILARITY_THRESHOLD:
+            return (best_user_id, float(similarity))
         
         return None
     
@@ -205,20 +240,30 @@ class FaceService:
         if not face_image:
             return False
             
+        image_path = face_image.image_path
         await db.delete(face_image)
         await db.commit()
         
+        face_index.remove(face_id)
+        
+        # Images are content-addressed and may be shared by several rows
+        if image_path:
+            result = await db.execute(
+                select(func.count(models.FaceImage.id)).where(models.FaceImage.image_path == image_path)
+            )
+            FaceService._delete_image_if_unreferenced(image_path, result.scalar())
+        
         return True
     
     # Sync methods (for backward compatibility)
     @staticmethod
-    def create_face_image(db: Session, user_id: int, face_data: FaceImageCreate) -> models.FaceImage:
+    def create_face_image(db: Session, user_id: int, face_data: FaceImageCreate) -> FaceImageResponse:
         """Create a new face image record with embedding (sync version for backward compatibility)."""
         # Decode the base64 image
-        image_array = FaceService._decode_base64_image(face_data.image_data)
+        image_bytes = FaceService._decode_base64_payload(face_data.image_data)
         
         # Extract face embedding
-        embedding = FaceService._extract_face_embedding(image_array)
+        embedding = FaceService._extract_face_embedding(image_bytes)
         
         if not embedding:
             raise HTTPException(
@@ -226,14 +271,22 @@ class FaceService:
                 detail="No face detected in the image"
             )
         
-        # Store embedding as JSON string
-        embedding_json = json.dumps(embedding)
+        # Near-duplicates of an existing face add nothing to matching, so return that face instead
+        face_index.ensure_loaded(db)
+        duplicate_id = FaceService._find_duplicate(embedding, user_id)
+        if duplicate_id is not None:
+            existing = db.query(models.FaceImage).filter(models.FaceImage.id == duplicate_id).first()
+            if existing:
+                return FaceImageResponse.model_validate(existing).model_copy(update={"duplicate": True})
         
-        # Create database record
+        # Store the original image outside the database
+        image_path = FaceService._store_image(image_bytes)
+        
+        # Create database record (embedding packed as raw float32 bytes)
         db_face = models.FaceImage(
             user_id=user_id,
-            image_data=face_data.image_data,  # Store original base64 image
-            embedding=embedding_json,
+            image_path=image_path,
+            embedding_vector=encode_embedding(embedding),
             created_at=face_data.created_at or datetime.now().date()
         )
         
@@ -241,7 +294,10 @@ class FaceService:
         db.commit()
         db.refresh(db_face)
         
-        return db_face
+        # Keep the in-memory index in sync
+        face_index.add(db_face.id, db_face.user_id, embedding)
+        
+        return FaceImageResponse.model_validate(db_face)
     
     @staticmethod
     def get_user_face_images(db: Session, user_id: int) -> List[models.FaceImage]:
@@ -257,8 +313,8 @@ class FaceService:
     def verify_face(db: Session, verification_data: FaceVerification) -> Dict[str, Any]:
         """Verify a face against stored embeddings (sync version for backward compatibility)."""
         # Decode the image and extract embedding
-        image_array = FaceService._decode_base64_image(verification_data.image_data)
-        new_embedding = FaceService._extract_face_embedding(image_array)
+        image_bytes = FaceService._decode_base64_payload(verification_data.image_data)
+        new_embedding = FaceService._extract_face_embedding(image_bytes)
         
         if not new_embedding:
             raise HTTPException(
@@ -269,26 +325,34 @@ class FaceService:
         # Convert to numpy array for comparison
         new_embedding_array = np.array(new_embedding)
         
+        # Make sure the in-memory index has been populated
+        face_index.ensure_loaded(db)
+        
         # Get user to verify against (if specified)
         if verification_data.user_id:
-            # Get face images for specific user
-            face_images = FaceService.get_user_face_images(db, verification_data.user_id)
-            if not face_images:
+            if not face_index.count(verification_data.user_id, batch_id=verification_data.batch_id):
                 return {
                     "verified": False,
                     "message": "No reference faces found for this user"
                 }
-        else:
-            # Get all face images (for identification)
-            face_images = FaceService.get_all_face_images(db)
-            if not face_images:
+        elif verification_data.batch_id:
+            if not face_index.count(batch_id=verification_data.batch_id):
                 return {
                     "verified": False,
-                    "message": "No reference faces found in the system"
+                    "message": "No reference faces found for this batch"
                 }
+        elif not face_index.count():
+            return {
+                "verified": False,
+                "message": "No reference faces found in the system"
+            }
         
         # Find best match
-        best_match = FaceService._find_best_match(new_embedding_array, face_images)
+        best_match = FaceService._find_best_match(
+            new_embedding_array,
+            user_id=verification_data.user_id,
+            batch_id=verification_data.batch_id
+        )
         
         if best_match:
             user_id, similarity = best_match
@@ -317,7 +381,15 @@ class FaceService:
         if not face_image:
             return False
             
+        image_path = face_image.image_path
         db.delete(face_image)
         db.commit()
         
+        face_index.remove(face_id)
+        
+        # Images are content-addressed and may be shared by several rows
+        if image_path:
+            remaining = db.query(func.count(models.FaceImage.id)).filter(models.FaceImage.image_path == image_path).scalar()
+            FaceService._delete_image_if_unreferenced(image_path, remaining)
+        
         return True
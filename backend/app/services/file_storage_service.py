@@ -5,6 +5,7 @@ This module provides functions to store and retrieve files, with support for loc
 
 import os
 import uuid
+import hashlib
 import shutil
 import logging
 from typing import Optional, BinaryIO, Dict, Any, List
@@ -21,33 +22,39 @@ logger = logging.getLogger(__name__)
 # Base directory for file storage
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), settings.UPLOAD_DIR)
 
+# File extensions for image formats detected by PIL
+IMAGE_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp", "BMP": ".bmp"}
+
 
 class FileStorageService:
     """Service for handling file storage operations."""
     
     @staticmethod
-    def ensure_upload_dir(subdir: Optional[str] = None) -> str:
+    def ensure_upload_dir(subdir: Optional[str] = None, base_dir: Optional[str] = None) -> str:
         """
         Ensure the upload directory exists.
         
         Args:
             subdir: Optional subdirectory within the upload directory
+            base_dir: Directory to use instead of the public upload directory
             
         Returns:
             Path to the upload directory
         """
+        base_dir = base_dir or UPLOAD_DIR
+        
         # Create base upload directory if it doesn't exist
-        if not os.path.exists(UPLOAD_DIR):
-            os.makedirs(UPLOAD_DIR)
+        if not os.path.exists(base_dir):
+            os.makedirs(base_dir)
         
         # If subdirectory is specified, create it
         if subdir:
-            subdir_path = os.path.join(UPLOAD_DIR, subdir)
+            subdir_path = os.path.join(base_dir, subdir)
             if not os.path.exists(subdir_path):
                 os.makedirs(subdir_path)
             return subdir_path
         
-        return UPLOAD_DIR
+        return base_dir
     
     @staticmethod
     async def save_upload_file(
@@ -189,6 +196,106 @@ class FileStorageService:
             return os.path.join(subdir, filename)
         return filename
     
+    @staticmethod
+    def image_extension(content: bytes) -> str:
+        """
+        Detect the file extension of raw image content.
+        
+        Args:
+            content: Raw image content
+            
+        Returns:
+            File extension including the leading dot, or an empty string if the format is unknown
+        """
+        try:
+            image_format = Image.open(BytesIO(content)).format or ""
+        except Exception:
+            return ""
+        return IMAGE_EXTENSIONS.get(image_format.upper(), "")
+    
+    @staticmethod
+    def save_content_addressed(
+        content: bytes,
+        subdir: Optional[str] = None,
+        ext: str = "",
+        max_size_mb: Optional[float] = 5.0,
+        base_dir: Optional[str] = None
+    ) -> str:
+        """
+        Save content under a name derived from its SHA-256 hash.
+        
+        Identical content always maps to the same path, so it is stored only once.
+        Files are sharded into subdirectories by the first two hex digits of the hash.
+        
+        Args:
+            content: Raw file content
+            subdir: Optional subdirectory within the upload directory
+            ext: File extension including the leading dot (e.g. ".jpg")
+            max_size_mb: Maximum file size in MB (None for no limit)
+            base_dir: Directory to use instead of the public upload directory
+            
+        Returns:
+            Path to the saved file (relative to the upload directory)
+        """
+        # Validate file size
+        if max_size_mb is not None and len(content) > int(max_size_mb * 1024 * 1024):
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size exceeds the limit of {max_size_mb} MB"
+            )
+        
+        digest = hashlib.sha256(content).hexdigest()
+        shard = os.path.join(subdir, digest[:2]) if subdir else digest[:2]
+        relative_path = os.path.join(shard, f"{digest}{ext}")
+        
+        # Ensure upload directory exists
+        upload_dir = FileStorageService.ensure_upload_dir(shard, base_dir)
+        file_path = os.path.join(upload_dir, f"{digest}{ext}")
+        
+        # Content is immutable for a given hash, so an existing file can be reused as-is
+        if not os.path.exists(file_path):
+            # Write to a temporary file first so readers never see a partial file
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        
+        return relative_path
+    
+    @staticmethod
+    def get_file_path(file_path: str, base_dir: Optional[str] = None) -> str:
+        """
+        Get the absolute path of a stored file.
+        
+        Args:
+            file_path: Path to the file (relative to the upload directory)
+            base_dir: Directory the file was stored in instead of the public upload directory
+            
+        Returns:
+            Absolute path to the file
+        """
+        abs_path = os.path.join(base_dir or UPLOAD_DIR, file_path)
+        
+        if not os.path.exists(abs_path) or not os.path.isfile(abs_path):
+            raise FileNotFoundError(f"File {file_path} not found")
+        
+        return abs_path
+    
+    @staticmethod
+    def read_file(file_path: str, base_dir: Optional[str] = None) -> bytes:
+        """
+        Read a file from storage.
+        
+        Args:
+            file_path: Path to the file (relative to the upload directory)
+            base_dir: Directory the file was stored in instead of the public upload directory
+            
+        Returns:
+            File content
+        """
+        with open(FileStorageService.get_file_path(file_path, base_dir), "rb") as f:
+            return f.read()
+    
     @staticmethod
     def get_file_url(file_path: str) -> str:
         """
@@ -206,18 +313,19 @@ class FileStorageService:
         return f"{base_url}/{file_path}"
     
     @staticmethod
-    def delete_file(file_path: str) -> bool:
+    def delete_file(file_path: str, base_dir: Optional[str] = None) -> bool:
         """
         Delete a file from storage.
         
         Args:
             file_path: Path to the file (relative to the upload directory)
+            base_dir: Directory the file was stored in instead of the public upload directory
             
         Returns:
             True if the file was deleted, False otherwise
         """
         # Get absolute path
-        abs_path = os.path.join(UPLOAD_DIR, file_path)
+        abs_path = os.path.join(base_dir or UPLOAD_DIR, file_path)
         
         # Check if file exists
         if not os.path.exists(abs_path) or not os.path.isfile(abs_path):
@@ -0,0 +1,579 @@
+"""
+Import jobs for the MCQ Test & Attendance System.
+Question banks and student rosters can be uploaded as CSV or JSONL files instead of one JSON body.
+The upload is copied to disk in fixed-size blocks, then parsed row by row in the background:
+rows are validated and handed to the bulk import services in chunks, so memory use does not
+depend on the size of the file. Progress and per-row results are kept on a job that clients poll.
+Large JSON bulk requests are queued the same way instead of being imported inside the request.
+
+Jobs wait in a queue and a fixed number of workers run them. With IMPORT_JOB_STORE set, jobs,
+their progress and their results are kept in a SQLite file: progress is checkpointed after every
+chunk, and jobs interrupted by a restart resume after their last checkpoint. A chunk that was
+written but not yet checkpointed when the process stopped is imported again on resume.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, UploadFile, status
+from pydantic import BaseModel, ValidationError
+
+from app.core.settings import settings
+from app.db.session import AsyncSessionLocal
+from app.schemas.bulk_question import BulkQuestionUploadItem
+from app.schemas.bulk_student import BulkStudentUploadItem
+from app.services import student_service, test_service
+
+logger = logging.getLogger(__name__)
+
+# Accepted upload formats by file extension
+IMPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Size of the blocks uploads are copied to disk in
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ImportKind:
+    """How the rows of one kind of import are validated, written and reported."""
+    item_model: Type[BaseModel]
+    # (db, items, instructor_id) -> (one result model per item in order, seconds spent hashing passwords or None)
+    handler: Callable[[Any, List[BaseModel], Optional[int]], Awaitable[Tuple[List[BaseModel], Optional[float]]]]
+    # Fields copied from an invalid row into its result, next to success/error
+    result_fields: Tuple[str, ...]
+
+
+async def _import_questions(db, items, instructor_id):
+    return await test_service.bulk_question_upload_async(db, items, instructor_id=instructor_id), None
+
+
+async def _import_students(db, items, instructor_id):
+    response = await student_service.bulk_student_upload_async(db, items, instructor_id=instructor_id)
+    return response.results, response.hashing_seconds
+
+
+IMPORT_KINDS: Dict[str, ImportKind] = {
+    "questions": ImportKind(
+        item_model=BulkQuestionUploadItem,
+        handler=_import_questions,
+        result_fields=("question_text", "test_name"),
+    ),
+    "students": ImportKind(
+        item_model=BulkStudentUploadItem,
+        handler=_import_students,
+        result_fields=("full_name", "email", "batch_name"),
+    ),
+}
+
+
+@dataclass
+class ImportJob:
+    """State of one import."""
+    id: str
+    kind: str
+    format: str
+    owner_id: int
+    instructor_id: Optional[int] = None
+    status: str = "queued"  # queued, running, completed or failed
+    bytes_total: int = 0
+    bytes_processed: int = 0
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)  # kept in the store instead when there is one
+    error: Optional[str] = None
+    hashing_seconds: Optional[float] = None  # time spent hashing passwords (student imports)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def progress(self) -> float:
+        """Share of the file processed so far, in percent."""
+        if self.status == "completed":
+            return 100.0
+        return round(100.0 * self.bytes_processed / self.bytes_total, 1) if self.bytes_total else 0.0
+
+
+def import_format(filename: Optional[str], format: Optional[str] = None) -> str:
+    """
+    Determine the format of an upload.
+
+    Args:
+        filename: Name of the uploaded file
+        format: Format given explicitly by the client ("csv" or "jsonl"), if any
+
+    Returns:
+        "csv" or "jsonl"
+
+    Raises:
+        HTTPException: 400 if the format cannot be determined
+    """
+    if format:
+        return format
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format. Upload a .csv or .jsonl file or pass format=csv|jsonl."
+        )
+    return IMPORT_FORMATS[extension]
+
+
+def iter_rows(text: io.TextIOBase, format: str) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Parse an upload one row at a time.
+
+    Args:
+        text: Upload opened as text
+        format: "csv" (header row required) or "jsonl" (one JSON object per line)
+
+    Yields:
+        (row, None) for each parsed row, or (None, error) for rows that could not be parsed
+    """
+    if format == "csv":
+        for row in csv.DictReader(text):
+            # Empty cells are missing values, so optional columns can be left blank
+            yield {key: value if value != "" else None for key, value in row.items() if key}, None
+        return
+
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(row, dict):
+            yield None, "Invalid JSON: expected an object"
+            continue
+        yield row, None
+
+
+def _validation_error_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    )
+
+
+class ImportJobStore:
+    """SQLite file keeping import jobs, their checkpoints and their results across restarts."""
+
+    # Job fields stored as columns (results are stored as rows of their own)
+    COLUMNS = tuple(f.name for f in fields(ImportJob) if f.name != "results")
+
+    def __init__(self, path: str):
+        """
+        Open (and create if needed) the store.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS import_jobs ({', '.join(self.COLUMNS)}, PRIMARY KEY (id))"
+        )
+        # Add the columns of fields introduced since the file was created
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(import_jobs)")}
+        for name in self.COLUMNS:
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE import_jobs ADD COLUMN {name}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS import_results "
+            "(job_id TEXT, row INTEGER, success INTEGER, result TEXT, PRIMARY KEY (job_id, row))"
+        )
+
+    def _values(self, job: ImportJob) -> List[Any]:
+        values = [getattr(job, name) for name in self.COLUMNS]
+        return [value.isoformat() if isinstance(value, datetime) else value for value in values]
+
+    def save(self, job: ImportJob) -> None:
+        """Insert or update a job."""
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO import_jobs ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            self._values(job)
+        )
+
+    def checkpoint(self, job: ImportJob, first_row: int, results: Sequence[Dict[str, Any]]) -> None:
+        """Store the results of a chunk together with the job's progress, in one transaction."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO import_results (job_id, row, success, result) VALUES (?, ?, ?, ?)",
+                [(job.id, first_row + i, bool(result["success"]), json.dumps(result)) for i, result in enumerate(results)]
+            )
+            self.save(job)
+
+    def jobs(self) -> List[ImportJob]:
+        """All stored jobs."""
+        jobs = []
+        for row in self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM import_jobs ORDER BY created_at"):
+            values = dict(zip(self.COLUMNS, row))
+            for name in ("created_at", "finished_at"):
+                if values[name] is not None:
+                    values[name] = datetime.fromisoformat(values[name])
+            jobs.append(ImportJob(**values))
+        return jobs
+
+    def results(self, job_id: str, offset: int, limit: int, failed_only: bool) -> Tuple[int, List[Dict[str, Any]]]:
+        """Page through the results of a job; returns the number of matching results and the page."""
+        where = "job_id = ?" + (" AND success = 0" if failed_only else "")
+        total = self._conn.execute(f"SELECT COUNT(*) FROM import_results WHERE {where}", (job_id,)).fetchone()[0]
+        page = self._conn.execute(
+            f"SELECT result FROM import_results WHERE {where} ORDER BY row LIMIT ? OFFSET ?",
+            (job_id, limit, offset)
+        )
+        return total, [json.loads(result) for (result,) in page]
+
+    def delete(self, job_id: str) -> None:
+        """Forget a job and its results."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM import_results WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM import_jobs WHERE id = ?", (job_id,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ImportJobService:
+    """Queue uploaded imports, run them in the background and keep their progress and results."""
+
+    def __init__(
+        self,
+        upload_dir: str,
+        chunk_size: int = 500,
+        max_upload_mb: float = 100,
+        retention_hours: float = 24,
+        max_concurrent_jobs: int = 2,
+        store_path: Optional[str] = None
+    ):
+        """
+        Initialize the service. Jobs are kept in memory only unless a store path is given.
+
+        Args:
+            upload_dir: Directory uploads are stored in until their import finishes
+            chunk_size: Rows validated and written per chunk
+            max_upload_mb: Largest accepted upload
+            retention_hours: How long finished jobs can still be polled
+            max_concurrent_jobs: Imports run at the same time; further jobs wait in the queue
+            store_path: SQLite file keeping jobs across restarts
+        """
+        self.upload_dir = upload_dir
+        self.chunk_size = chunk_size
+        self.max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+        self.retention = timedelta(hours=retention_hours)
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.store_path = store_path
+        self._store: Optional[ImportJobStore] = None
+        self._jobs: Dict[str, ImportJob] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+    def _upload_path(self, job: ImportJob) -> str:
+        return os.path.join(self.upload_dir, f"{job.id}.{job.format}")
+
+    def _open_store(self) -> Optional[ImportJobStore]:
+        if self.store_path and self._store is None:
+            self._store = ImportJobStore(self.store_path)
+        return self._store
+
+    def _save(self, job: ImportJob) -> None:
+        if self._store is not None:
+            self._store.save(job)
+
+    async def start(self) -> None:
+        """Load stored jobs, queue the ones a restart interrupted and start the workers."""
+        store = self._open_store()
+        resumed = []
+        if store is not None:
+            for job in store.jobs():
+                self._jobs[job.id] = job
+                if job.status not in ("queued", "running"):
+                    continue
+                if not os.path.exists(self._upload_path(job)):
+                    job.status = "failed"
+                    job.error = "The uploaded file is no longer available"
+                    job.finished_at = datetime.utcnow()
+                    store.save(job)
+                    continue
+                job.status = "queued"
+                resumed.append(job)
+            if resumed:
+                logger.info(f"Resuming {len(resumed)} interrupted imports")
+            self._prune()
+        if not self._start_workers():
+            for job in resumed:
+                self._queue.put_nowait(job.id)
+
+    async def stop(self) -> None:
+        """Stop the workers. Running jobs resume from their last checkpoint at the next start (with a store)."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def _start_workers(self) -> bool:
+        """Start the workers unless they run on this event loop already; returns whether they were started."""
+        loop = asyncio.get_running_loop()
+        if self._workers and self._workers[0].get_loop() is loop:
+            return False
+        # First use, or the loop the workers ran on is gone: queue every waiting job on this loop
+        self._queue = asyncio.Queue()
+        for job in self._jobs.values():
+            if job.status == "queued":
+                self._queue.put_nowait(job.id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_jobs)]
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                if job is not None and job.status == "queued":
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished."""
+        await self._queue.join()
+
+    def _enqueue(self, job: ImportJob) -> ImportJob:
+        self._open_store()
+        self._jobs[job.id] = job
+        self._save(job)
+        if not self._start_workers():
+            self._queue.put_nowait(job.id)
+        logger.info(f"Queued {job.kind} import {job.id} ({job.bytes_total} bytes of {job.format})")
+        return job
+
+    async def _save_upload(self, upload: UploadFile, path: str) -> int:
+        """Copy an upload to disk in fixed-size blocks; returns its size."""
+        os.makedirs(self.upload_dir, exist_ok=True)
+        size = 0
+        with open(path, "wb") as f:
+            while True:
+                block = await upload.read(UPLOAD_BLOCK_SIZE)
+                if not block:
+                    break
+                size += len(block)
+                if size > self.max_upload_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size is {self.max_upload_bytes // (1024 * 1024)} MB."
+                    )
+                f.write(block)
+        return size
+
+    async def submit(
+        self,
+        kind: str,
+        upload: UploadFile,
+        owner_id: int,
+        instructor_id: Optional[int] = None,
+        format: Optional[str] = None
+    ) -> ImportJob:
+        """
+        Store an upload and queue its import.
+
+        Args:
+            kind: "questions" or "students"
+            upload: Uploaded CSV or JSONL file
+            owner_id: ID of the user submitting the import (only they and admins can see the job)
+            instructor_id: Restrict the import to this instructor's batches and tests
+            format: "csv" or "jsonl"; determined from the file name when omitted
+
+        Returns:
+            The queued job
+
+        Raises:
+            HTTPException: 400 for unknown formats, 413 for files over the size limit
+        """
+        self._prune()
+        job = ImportJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            format=import_format(upload.filename, format),
+            owner_id=owner_id,
+            instructor_id=instructor_id
+        )
+        path = self._upload_path(job)
+        try:
+            job.bytes_total = await self._save_upload(upload, path)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return self._enqueue(job)
+
+    async def submit_items(
+        self,
+        kind: str,
+        items: Sequence[BaseModel],
+        owner_id: int,
+        instructor_id: Optional[int] = None
+    ) -> ImportJob:
+        """
+        Queue the import of already parsed items (large JSON bulk requests).
+
+        The items are written to the upload directory as JSONL, so the job can resume like an upload.
+
+        Args:
+            kind: "questions" or "students"
+            items: Bulk upload items of that kind
+            owner_id: ID of the user submitting the import
+            instructor_id: Restrict the import to this instructor's batches and tests
+
+        Returns:
+            The queued job
+        """
+        self._prune()
+        job = ImportJob(id=uuid.uuid4().hex, kind=kind, format="jsonl", owner_id=owner_id, instructor_id=instructor_id)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        with open(self._upload_path(job), "w", encoding="utf-8") as f:
+            for item in items:
+                f.write(item.model_dump_json() + "\n")
+            job.bytes_total = f.tell()
+        return self._enqueue(job)
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        """Get a job by ID (None if unknown or expired)."""
+        return self._jobs.get(job_id)
+
+    def results(
+        self,
+        job: ImportJob,
+        offset: int = 0,
+        limit: int = 1000,
+        failed_only: bool = False
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Page through the per-row results of a job, in file order.
+
+        Returns:
+            (number of matching results so far, results from offset to offset + limit)
+        """
+        if self._store is not None:
+            return self._store.results(job.id, offset, limit, failed_only)
+        results = [r for r in job.results if not r["success"]] if failed_only else job.results
+        return len(results), results[offset:offset + limit]
+
+    async def _run(self, job: ImportJob) -> None:
+        kind = IMPORT_KINDS[job.kind]
+        path = self._upload_path(job)
+        resume_at = job.processed
+        if resume_at:
+            logger.info(f"Resuming import {job.id} after row {resume_at}")
+        job.status = "running"
+        self._save(job)
+        try:
+            with open(path, "rb") as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                chunk: List[Tuple[Optional[Dict[str, Any]], Optional[str]]] = []
+                for index, parsed in enumerate(iter_rows(text, job.format)):
+                    if index < resume_at:
+                        # Imported before the restart
+                        if index % self.chunk_size == 0:
+                            await asyncio.sleep(0)
+                        continue
+                    chunk.append(parsed)
+                    if len(chunk) >= self.chunk_size:
+                        await self._import_chunk(job, kind, chunk, raw.tell())
+                        chunk = []
+                if chunk:
+                    await self._import_chunk(job, kind, chunk, job.bytes_total)
+            job.bytes_processed = job.bytes_total
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"Import {job.id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        # Cancellation (shutdown) leaves the job and its file for the next start
+        job.finished_at = datetime.utcnow()
+        self._save(job)
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"Import {job.id} {job.status}: {job.succeeded} succeeded, {job.failed} failed")
+
+    async def _import_chunk(
+        self,
+        job: ImportJob,
+        kind: ImportKind,
+        chunk: List[Tuple[Optional[Dict[str, Any]], Optional[str]]],
+        bytes_processed: int
+    ) -> None:
+        """Validate a chunk of parsed rows, write the valid ones and checkpoint one result per row."""
+        results: List[Optional[Dict[str, Any]]] = []
+        items = []
+        for row, error in chunk:
+            if error is None:
+                try:
+                    items.append(kind.item_model.model_validate(row))
+                    results.append(None)
+                    continue
+                except ValidationError as e:
+                    error = _validation_error_message(e)
+            row = row or {}
+            results.append({
+                **{name: row.get(name) for name in kind.result_fields},
+                "success": False,
+                "error": error
+            })
+
+        if items:
+            async with AsyncSessionLocal() as db:
+                written, hashing_seconds = await kind.handler(db, items, job.instructor_id)
+            if hashing_seconds is not None:
+                job.hashing_seconds = round((job.hashing_seconds or 0) + hashing_seconds, 3)
+            written = iter(written)
+            results = [result if result is not None else next(written).model_dump(mode="json") for result in results]
+
+        first_row = job.processed
+        job.processed += len(results)
+        succeeded = sum(result["success"] for result in results)
+        job.succeeded += succeeded
+        job.failed += len(results) - succeeded
+        job.bytes_processed = bytes_processed
+        if self._store is not None:
+            self._store.checkpoint(job, first_row, results)
+        else:
+            job.results.extend(results)
+
+    def _prune(self) -> None:
+        """Forget finished jobs past the retention period."""
+        cutoff = datetime.utcnow() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+            if self._store is not None:
+                self._store.delete(job_id)
+
+
+# Create global import job service
+import_jobs = ImportJobService(
+    upload_dir=settings.IMPORT_UPLOAD_DIR,
+    chunk_size=settings.IMPORT_CHUNK_SIZE,
+    max_upload_mb=settings.IMPORT_MAX_UPLOAD_MB,
+    retention_hours=settings.IMPORT_JOB_RETENTION_HOURS,
+    max_concurrent_jobs=settings.IMPORT_MAX_CONCURRENT_JOBS,
+    store_path=settings.IMPORT_JOB_STORE or None
+)
@@ -1,76 +1,168 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, insert, func, or_
 from app.db import models
-from app.schemas.bulk_student import BulkStudentUploadItem, BulkStudentUploadResponseItem
+from app.schemas.bulk_student import BulkStudentUploadItem, BulkStudentUploadResponse, BulkStudentUploadResponseItem
 from app.core import security
+from app.core.settings import settings
 from sqlalchemy.exc import IntegrityError
 from datetime import date
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from app.core.cache import async_cached
+from app.services.attendance_service import attendance_student_tag
+from app.services.attendance_today import today_attendance
+from app.services.face_index import face_index
 
-def bulk_student_upload(db: Session, students: list[BulkStudentUploadItem], instructor_id: int = None) -> list[BulkStudentUploadResponseItem]:
-    results = []
+# Students created per transaction during bulk import
+STUDENT_IMPORT_CHUNK_SIZE = 500
+
+def _student_batches_query(batch_names: Iterable[str], instructor_id: Optional[int] = None):
+    """Build the query resolving batch names to IDs, restricted to the instructor's batches if given.
+
+    Returns (name, batch_id) rows; when several batches share a name, the oldest one is used.
+    """
+    query = (
+        select(models.Batch.name, func.min(models.Batch.id))
+        .where(models.Batch.name.in_(set(batch_names)))
+        .group_by(models.Batch.name)
+    )
+    if instructor_id:
+        query = query.where(models.Batch.instructor_id == instructor_id)
+    return query
+
+def _existing_users_query(students: Sequence[BulkStudentUploadItem]):
+    """Build the query returning (email, username) of the users clashing with the incoming students."""
+    return select(models.User.email, models.User.username).where(or_(
+        models.User.email.in_({item.email for item in students}),
+        models.User.username.in_({_student_username(item) for item in students})
+    ))
+
+def _student_username(item: BulkStudentUploadItem) -> str:
+    return item.email.split('@')[0]
+
+def _student_import_errors(students: Sequence[BulkStudentUploadItem], existing: Iterable[Tuple[str, str]]) -> List[Optional[str]]:
+    """Check every row against the existing users and the rows before it; None for rows that can be created."""
+    existing = list(existing)
+    emails = {email for email, _ in existing}
+    usernames = {username for _, username in existing}
+    errors = []
     for item in students:
+        if item.email in emails:
+            errors.append('User with this email already exists')
+        elif _student_username(item) in usernames:
+            errors.append('User with this username already exists')
+        else:
+            errors.append(None)
+        emails.add(item.email)
+        usernames.add(_student_username(item))
+    return errors
+
+def _missing_batch_rows(students: Sequence[BulkStudentUploadItem], indexes: Iterable[int], batch_ids: Dict[str, int], instructor_id: Optional[int]) -> List[dict]:
+    """Rows of the batches to create for the given students (instructors can only create batches for themselves)."""
+    names = dict.fromkeys(students[index].batch_name for index in indexes if students[index].batch_name not in batch_ids)
+    return [{"name": name, "instructor_id": instructor_id or None} for name in names]
+
+def _student_rows(item: BulkStudentUploadItem, hashed_password: str, batch_id: int) -> Tuple[dict, dict]:
+    """User and student column values of one new student."""
+    user = {
+        "username": _student_username(item),
+        "email": item.email,
+        "full_name": item.full_name,
+        "hashed_password": hashed_password,
+        "role": 'student',
+        "is_active": True,
+    }
+    student = {"batch_id": batch_id, "roll_number": item.roll_number, "dob": item.dob}
+    return user, student
+
+def _student_result(item: BulkStudentUploadItem, error: Optional[str] = None) -> BulkStudentUploadResponseItem:
+    return BulkStudentUploadResponseItem(
+        full_name=item.full_name,
+        email=item.email,
+        batch_name=item.batch_name,
+        success=error is None,
+        error=error
+    )
+
+def _initial_passwords(count: int) -> List[str]:
+    return [
+        security.generate_random_password() if hasattr(security, 'generate_random_password') else 'changeme123'
+        for _ in range(count)
+    ]
+
+# Multi-row INSERTs of users and students. RETURNING rows come back in any order, so they carry
+# the natural key (email, user ID) used to match them to the incoming rows.
+_insert_users = insert(models.User).returning(models.User.email, models.User.id)
+_insert_students = insert(models.Student).returning(models.Student.id, models.Student.user_id, models.Student.batch_id)
+
+def _students_created(created: Iterable[Tuple[int, int, int]]) -> None:
+    """
+    Tell the in-memory views about committed students.
+
+    Bulk INSERT statements bypass the session flush events that keep today's attendance view and
+    the face index in step with Student rows, so every bulk path reports its students here.
+
+    Args:
+        created: (student_id, user_id, batch_id) of each new student
+    """
+    for student_id, user_id, batch_id in created:
+        today_attendance.set_student_batch(student_id, batch_id)
+        if face_index.loaded:
+            face_index.set_user_batch(user_id, batch_id)
+
+def _insert_student_rows(db: Session, rows: Sequence[Tuple[dict, dict]]) -> List[Tuple[int, int, int]]:
+    user_ids = dict(db.execute(_insert_users, [user for user, _ in rows]).all())
+    students = [{**student, "user_id": user_ids[user["email"]]} for user, student in rows]
+    return [tuple(row) for row in db.execute(_insert_students, students).all()]
+
+def bulk_student_upload(db: Session, students: list[BulkStudentUploadItem], instructor_id: int = None) -> list[BulkStudentUploadResponseItem]:
+    """Bulk upload students (sync version for backward compatibility)."""
+    if not students:
+        return []
+    
+    batch_ids = dict(db.execute(_student_batches_query((item.batch_name for item in students), instructor_id)).all())
+    errors = _student_import_errors(students, db.execute(_existing_users_query(students)).all())
+    pending = [index for index, error in enumerate(errors) if error is None]
+    rounds = settings.BULK_PASSWORD_HASH_ROUNDS
+    hashed_passwords = dict(zip(pending, security.password_hash_executor.map(
+        lambda password: security.get_password_hash(password, rounds), _initial_passwords(len(pending))
+    )))
+    
+    batch_rows = _missing_batch_rows(students, pending, batch_ids, instructor_id)
+    if batch_rows:
         try:
-            # Find or create batch (instructor_id restricts batch for instructors)
-            batch_query = db.query(models.Batch).filter(models.Batch.name == item.batch_name)
-            if instructor_id:
-                batch_query = batch_query.filter(models.Batch.instructor_id == instructor_id)
-            batch = batch_query.first()
-            if not batch:
-                if instructor_id:
-                    # Instructors can only create batches for themselves
-                    batch = models.Batch(name=item.batch_name, instructor_id=instructor_id)
-                else:
-                    batch = models.Batch(name=item.batch_name)
-                db.add(batch)
-                db.commit()
-                db.refresh(batch)
-            # Check for existing user
-            user = db.query(models.User).filter(models.User.email == item.email).first()
-            if user:
-                raise ValueError('User with this email already exists')
-            # Create user
-            password = security.generate_random_password() if hasattr(security, 'generate_random_password') else 'changeme123'
-            user = models.User(
-                username=item.email.split('@')[0],
-                email=item.email,
-                full_name=item.full_name,
-                hashed_password=security.get_password_hash(password),
-                role='student',
-                is_active=True,
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            # Create student
-            student = models.Student(
-                user_id=user.id,
-                batch_id=batch.id,
-                roll_number=item.roll_number,
-                dob=item.dob
-            )
-            db.add(student)
+            result = db.execute(insert(models.Batch).returning(models.Batch.name, models.Batch.id), batch_rows)
+            batch_ids.update(result.all())
             db.commit()
-            db.refresh(student)
-            results.append(BulkStudentUploadResponseItem(
-                full_name=item.full_name,
-                email=item.email,
-                batch_name=item.batch_name,
-                success=True,
-                error=None
-            ))
         except Exception as e:
             db.rollback()
-            results.append(BulkStudentUploadResponseItem(
-                full_name=item.full_name,
-                email=item.email,
-                batch_name=item.batch_name,
-                success=False,
-                error=str(e)
-            ))
-    return results
+            for index in pending:
+                if students[index].batch_name not in batch_ids:
+                    errors[index] = str(e)
+            pending = [index for index in pending if errors[index] is None]
+    
+    rows = {
+        index: _student_rows(students[index], hashed_passwords[index], batch_ids[students[index].batch_name])
+        for index in pending
+    }
+    for offset in range(0, len(pending), STUDENT_IMPORT_CHUNK_SIZE):
+        chunk = pending[offset:offset + STUDENT_IMPORT_CHUNK_SIZE]
+        try:
+            created = _insert_student_rows(db, [rows[index] for index in chunk])
+            db.commit()
+        except Exception:
+            db.rollback()
+            created = []
+            for index in chunk:
+                try:
+                    with db.begin_nested():
+                        created += _insert_student_rows(db, [rows[index]])
+                except Exception as e:
+                    errors[index] = str(e)
+            db.commit()
+        _students_created(created)
+    
+    return [_student_result(item, error) for item, error in zip(students, errors)]
 
 # Async methods (modern approach)
 @async_cached(ttl=60, key_prefix="student_tests")
@@ -92,7 +184,9 @@ async def get_student_tests_async(db: AsyncSession, student_id: int) -> List[mod
     )
     return result.scalars().all()
 
-@async_cached(ttl=60, key_prefix="student_attendance")
+@async_cached(
+    ttl=600, key_prefix="student_attendance", tags=lambda args: [attendance_student_tag(args["student_id"])]
+)
 async def get_student_attendance_async(db: AsyncSession, student_id: int) -> List[models.Attendance]:
     """Get attendance records for a student with async SQLAlchemy."""
     result = await db.execute(
@@ -100,88 +194,76 @@ async def get_student_attendance_async(db: AsyncSession, student_id: int) -> Lis
     )
     return result.scalars().all()
 
-async def bulk_student_upload_async(db: AsyncSession, students: List[BulkStudentUploadItem], instructor_id: Optional[int] = None) -> List[BulkStudentUploadResponseItem]:
-    """Bulk upload students with async SQLAlchemy."""
-    results = []
+async def _insert_student_rows_async(db: AsyncSession, rows: Sequence[Tuple[dict, dict]]) -> List[Tuple[int, int, int]]:
+    user_ids = dict((await db.execute(_insert_users, [user for user, _ in rows])).all())
+    students = [{**student, "user_id": user_ids[user["email"]]} for user, student in rows]
+    return [tuple(row) for row in (await db.execute(_insert_students, students)).all()]
+
+async def bulk_student_upload_async(db: AsyncSession, students: List[BulkStudentUploadItem], instructor_id: Optional[int] = None) -> BulkStudentUploadResponse:
+    """
+    Bulk upload students with async SQLAlchemy.
     
-    for item in students:
+    The referenced batches and the users clashing with the incoming emails and usernames are
+    prefetched with one query each, and missing batches are created with one statement. The
+    initial passwords of the remaining rows are then hashed in the password hashing thread pool
+    (with BULK_PASSWORD_HASH_ROUNDS bcrypt rounds), and users and students are inserted with
+    multi-row statements, one transaction per STUDENT_IMPORT_CHUNK_SIZE rows. If a chunk fails,
+    its rows are retried one by one so that only the failing ones are reported.
+    
+    Returns:
+        One result per student, in order, and the time spent hashing passwords
+    """
+    if not students:
+        return BulkStudentUploadResponse(results=[], hashing_seconds=0.0)
+    
+    result = await db.execute(_student_batches_query((item.batch_name for item in students), instructor_id))
+    batch_ids = dict(result.all())
+    result = await db.execute(_existing_users_query(students))
+    errors = _student_import_errors(students, result.all())
+    pending = [index for index, error in enumerate(errors) if error is None]
+    hashes, hashing_seconds = await security.get_password_hashes_async(
+        _initial_passwords(len(pending)), rounds=settings.BULK_PASSWORD_HASH_ROUNDS
+    )
+    hashed_passwords = dict(zip(pending, hashes))
+    
+    batch_rows = _missing_batch_rows(students, pending, batch_ids, instructor_id)
+    if batch_rows:
         try:
-            # Find or create batch (instructor_id restricts batch for instructors)
-            result = await db.execute(
-                select(models.Batch).where(models.Batch.name == item.batch_name)
-            )
-            if instructor_id:
-                result = await db.execute(
-                    select(models.Batch).where(
-                        (models.Batch.name == item.batch_name) & 
-                        (models.Batch.instructor_id == instructor_id)
-                    )
-                )
-            
-            batch = result.scalars().first()
-            
-            if not batch:
-                if instructor_id:
-                    # Instructors can only create batches for themselves
-                    batch = models.Batch(name=item.batch_name, instructor_id=instructor_id)
-                else:
-                    batch = models.Batch(name=item.batch_name)
-                db.add(batch)
-                await db.commit()
-                await db.refresh(batch)
-            
-            # Check for existing user
-            result = await db.execute(
-                select(models.User).where(models.User.email == item.email)
-            )
-            user = result.scalars().first()
-            
-            if user:
-                raise ValueError('User with this email already exists')
-            
-            # Create user
-            password = security.generate_random_password() if hasattr(security, 'generate_random_password') else 'changeme123'
-            user = models.User(
-                username=item.email.split('@')[0],
-                email=item.email,
-                full_name=item.full_name,
-                hashed_password=security.get_password_hash(password),
-                role='student',
-                is_active=True,
-            )
-            db.add(user)
+            result = await db.execute(insert(models.Batch).returning(models.Batch.name, models.Batch.id), batch_rows)
+            batch_ids.update(result.all())
             await db.commit()
-            await db.refresh(user)
-            
-            # Create student
-            student = models.Student(
-                user_id=user.id,
-                batch_id=batch.id,
-                roll_number=item.roll_number,
-                dob=item.dob
-            )
-            db.add(student)
-            await db.commit()
-            await db.refresh(student)
-            
-            results.append(BulkStudentUploadResponseItem(
-                full_name=item.full_name,
-                email=item.email,
-                batch_name=item.batch_name,
-                success=True,
-                error=None
-            ))
         except Exception as e:
             await db.rollback()
-            results.append(BulkStudentUploadResponseItem(
-                full_name=item.full_name,
-                email=item.email,
-                batch_name=item.batch_name,
-                success=False,
-                error=str(e)
-            ))
+            for index in pending:
+                if students[index].batch_name not in batch_ids:
+                    errors[index] = str(e)
+            pending = [index for index in pending if errors[index] is None]
+    
+    rows = {
+        index: _student_rows(students[index], hashed_passwords[index], batch_ids[students[index].batch_name])
+        for index in pending
+    }
+    for offset in range(0, len(pending), STUDENT_IMPORT_CHUNK_SIZE):
+        chunk = pending[offset:offset + STUDENT_IMPORT_CHUNK_SIZE]
+        try:
+            created = await _insert_student_rows_async(db, [rows[index] for index in chunk])
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            created = []
+            for index in chunk:
+                try:
+                    async with db.begin_nested():
+                        created += await _insert_student_rows_async(db, [rows[index]])
+                except Exception as e:
+                    errors[index] = str(e)
+            await db.commit()
+        _students_created(created)
     
-    return results
+    return BulkStudentUploadResponse(
+        results=[_student_result(item, error) for item, error in zip(students, errors)],
+        hashing_seconds=round(hashing_seconds, 3)
+    )
 
 # Sync methods (for backward compatibility)
 def get_student_tests(db: Session, student_id: int) -> List[models.Test]:
@@ -1,13 +1,62 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func
 from app.db import models
 from app.schemas.test import TestCreate
 from app.schemas.bulk_question import BulkQuestionUploadItem, BulkQuestionUploadResponseItem
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from app.core.cache import async_cached
 import json
 
+# Questions inserted per multi-row INSERT during bulk import
+QUESTION_IMPORT_CHUNK_SIZE = 500
+
+def _question_tests_query(test_names: Iterable[str], instructor_id: Optional[int] = None):
+    """Build the query resolving test names to IDs, restricted to the instructor's batches if given.
+    
+    Test names are not unique; like the per-question lookup it replaces, one test is picked per name
+    (the oldest).
+    """
+    query = select(models.Test.name, func.min(models.Test.id)).where(models.Test.name.in_(set(test_names)))
+    if instructor_id:
+        query = query.join(models.Batch).where(models.Batch.instructor_id == instructor_id)
+    return query.group_by(models.Test.name)
+
+def _question_import_rows(
+    questions: List[BulkQuestionUploadItem],
+    test_ids: Dict[str, int]
+) -> Tuple[List[Optional[BulkQuestionUploadResponseItem]], List[Tuple[int, Dict[str, Any]]]]:
+    """Validate questions against the resolved tests.
+    
+    Returns:
+        (results, rows): results holds the failure of each rejected question and None for the others;
+        rows holds (index, insert parameters) of each valid question
+    """
+    results: List[Optional[BulkQuestionUploadResponseItem]] = []
+    rows = []
+    for index, item in enumerate(questions):
+        test_id = test_ids.get(item.test_name)
+        if test_id is None:
+            results.append(_question_result(item, 'Test not found. Please create the test first.'))
+            continue
+        results.append(None)
+        rows.append((index, {
+            "test_id": test_id,
+            "question_text": item.question_text,
+            "question_type": item.question_type,
+            "options": item.options,
+            "correct_answer": item.correct_answer
+        }))
+    return results, rows
+
+def _question_result(item: BulkQuestionUploadItem, error: Optional[str] = None) -> BulkQuestionUploadResponseItem:
+    return BulkQuestionUploadResponseItem(
+        question_text=item.question_text,
+        test_name=item.test_name,
+        success=error is None,
+        error=error
+    )
+
 # Async methods (modern approach)
 async def create_test_async(db: AsyncSession, test: TestCreate) -> models.Test:
     """Create a new test with questions using async SQLAlchemy."""
@@ -57,54 +106,34 @@ async def get_test_questions_async(db: AsyncSession, test_id: int) -> List[model
     return result.scalars().all()
 
 async def bulk_question_upload_async(db: AsyncSession, questions: List[BulkQuestionUploadItem], instructor_id: Optional[int] = None) -> List[BulkQuestionUploadResponseItem]:
-    """Bulk upload questions using async SQLAlchemy."""
-    results = []
+    """Bulk upload questions using async SQLAlchemy.
     
-    for item in questions:
+    All test names are resolved with one query and the questions are inserted in chunks of
+    QUESTION_IMPORT_CHUNK_SIZE rows, each in a savepoint, within a single transaction. If a chunk
+    fails, its questions are retried one by one so that only the failing ones are reported.
+    """
+    if not questions:
+        return []
+    
+    result = await db.execute(_question_tests_query((item.test_name for item in questions), instructor_id))
+    results, rows = _question_import_rows(questions, dict(result.all()))
+    
+    statement = models.Question.__table__.insert()
+    for offset in range(0, len(rows), QUESTION_IMPORT_CHUNK_SIZE):
+        chunk = rows[offset:offset + QUESTION_IMPORT_CHUNK_SIZE]
         try:
-            # Find test (by name, restrict to instructor's batches if instructor_id is set)
-            test_query = select(models.Test).where(models.Test.name == item.test_name)
-            
-            if instructor_id:
-                test_query = select(models.Test).join(models.Batch).where(
-                    (models.Test.name == item.test_name) & 
-                    (models.Batch.instructor_id == instructor_id)
-                )
-            
-            result = await db.execute(test_query)
-            test = result.scalars().first()
-            
-            if not test:
-                raise ValueError('Test not found. Please create the test first.')
-            
-            # Insert question
-            db_question = models.Question(
-                test_id=test.id,
-                question_text=item.question_text,
-                question_type=item.question_type,
-                options=item.options,
-                correct_answer=item.correct_answer
-            )
-            db.add(db_question)
-            await db.commit()
-            await db.refresh(db_question)
-            
-            results.append(BulkQuestionUploadResponseItem(
-                question_text=item.question_text,
-                test_name=item.test_name,
-                success=True,
-                error=None
-            ))
-        except Exception as e:
-            await db.rollback()
-            results.append(BulkQuestionUploadResponseItem(
-                question_text=item.question_text,
-                test_name=item.test_name,
-                success=False,
-                error=str(e)
-            ))
+            async with db.begin_nested():
+                await db.execute(statement, [params for _, params in chunk])
+        except Exception:
+            for index, params in chunk:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(statement, params)
+                except Exception as e:
+                    results[index] = _question_result(questions[index], str(e))
+    await db.commit()
     
-    return results
+    return [result or _question_result(item) for item, result in zip(questions, results)]
 
 # Sync methods (for backward compatibility)
 def create_test(db: Session, test: TestCreate) -> models.Test:
@@ -137,42 +166,28 @@ def list_tests(db: Session) -> List[models.Test]:
 
 def bulk_question_upload(db: Session, questions: List[BulkQuestionUploadItem], instructor_id: Optional[int] = None) -> List[BulkQuestionUploadResponseItem]:
     """Bulk upload questions (sync version for backward compatibility)."""
-    results = []
-    for item in questions:
+    if not questions:
+        return []
+    
+    test_ids = dict(db.execute(_question_tests_query((item.test_name for item in questions), instructor_id)).all())
+    results, rows = _question_import_rows(questions, test_ids)
+    
+    statement = models.Question.__table__.insert()
+    for offset in range(0, len(rows), QUESTION_IMPORT_CHUNK_SIZE):
+        chunk = rows[offset:offset + QUESTION_IMPORT_CHUNK_SIZE]
         try:
-            # Find test (by name, restrict to instructor's batches if instructor_id is set)
-            test_query = db.query(models.Test).filter(models.Test.name == item.test_name)
-            if instructor_id:
-                test_query = test_query.join(models.Batch).filter(models.Batch.instructor_id == instructor_id)
-            test = test_query.first()
-            if not test:
-                raise ValueError('Test not found. Please create the test first.')
-            # Insert question
-            db_question = models.Question(
-                test_id=test.id,
-                question_text=item.question_text,
-                question_type=item.question_type,
-                options=item.options,
-                correct_answer=item.correct_answer
-            )
-            db.add(db_question)
-            db.commit()
-            db.refresh(db_question)
-            results.append(BulkQuestionUploadResponseItem(
-                question_text=item.question_text,
-                test_name=item.test_name,
-                success=True,
-                error=None
-            ))
-        except Exception as e:
-            db.rollback()
-            results.append(BulkQuestionUploadResponseItem(
-                question_text=item.question_text,
-                test_name=item.test_name,
-                success=False,
-                error=str(e)
-            ))
-    return results
+            with db.begin_nested():
+                db.execute(statement, [params for _, params in chunk])
+        except Exception:
+            for index, params in chunk:
+                try:
+                    with db.begin_nested():
+                        db.execute(statement, params)
+                except Exception as e:
+                    results[index] = _question_result(questions[index], str(e))
+    db.commit()
+    
+    return [result or _question_result(item) for item, result in zip(questions, results)]
 
 def get_test(db: Session, test_id: int) -> Optional[models.Test]:
     """Get a test by ID (sync version for backward compatibility)."""
@@ -25,3 +25,616 @@ async def test_async_check_in_flow(async_client: AsyncClient):
     # Should fail if student_id is not mapped, or succeed if test DB auto-creates student
     assert resp.status_code in (200, 403, 400)
     # Add more logic here as your test DB evolves
+
+@pytest.mark.asyncio
+async def test_async_face_checkin_batch_reports_invalid_items(async_client: AsyncClient, async_db):
+    from sqlalchemy import select
+    from app.db import models
+
+    user_data = {
+        "username": "kioskinstructor",
+        "email": "kioskinstructor@example.com",
+        "full_name": "Kiosk Instructor",
+        "role": "instructor",
+        "password": "kioskpass"
+    }
+    await async_client.post("/api/auth/register", json=user_data)
+    login = await async_client.post("/api/auth/login", json={"username": "kioskinstructor", "password": "kioskpass"})
+    assert login.status_code == 200
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    user_id = (await async_db.execute(select(models.User.id).where(models.User.username == "kioskinstructor"))).scalar_one()
+    instructor = models.Instructor(user_id=user_id)
+    async_db.add(instructor)
+    await async_db.flush()
+    own, other = models.Batch(name="Kiosk", instructor_id=instructor.id), models.Batch(name="Not Mine")
+    async_db.add_all([own, other])
+    await async_db.flush()
+    own_id, other_id = own.id, other.id
+    await async_db.commit()
+
+    payload = {"items": [{"embedding": "not_a_valid_embedding"}, {}], "batch_id": own_id}
+    resp = await async_client.post("/api/attendance/face-checkin/batch", json=payload, headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["invalid"] == 2
+    assert [r["status"] for r in data["results"]] == ["invalid", "invalid"]
+
+    # Instructors can only check in students of their own batches
+    resp = await async_client.post("/api/attendance/face-checkin/batch", json={**payload, "batch_id": other_id}, headers=headers)
+    assert resp.status_code == 403
+    resp = await async_client.post("/api/attendance/face-checkin/batch", json={"items": payload["items"]}, headers=headers)
+    assert resp.status_code == 422
+
+@pytest.mark.asyncio
+async def test_face_checkin_batch_skips_students_of_other_batches(async_client: AsyncClient, async_db, monkeypatch):
+    from sqlalchemy import select
+    from app.db import models
+    from app.services.face_index import face_index
+
+    await async_client.post("/api/auth/register", json={
+        "username": "kioskowner", "email": "kioskowner@example.com", "full_name": "Kiosk Owner",
+        "role": "instructor", "password": "kioskpass"
+    })
+    login = await async_client.post("/api/auth/login", json={"username": "kioskowner", "password": "kioskpass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    user_id = (await async_db.execute(select(models.User.id).where(models.User.username == "kioskowner"))).scalar_one()
+    instructor = models.Instructor(user_id=user_id)
+    async_db.add(instructor)
+    await async_db.flush()
+    own, other = models.Batch(name="Own", instructor_id=instructor.id), models.Batch(name="Foreign")
+    async_db.add_all([own, other])
+    await async_db.flush()
+    users = [models.User(username=f"kiosk{i}", email=f"kiosk{i}@example.com", hashed_password="x", role="student") for i in range(2)]
+    async_db.add_all(users)
+    await async_db.flush()
+    member, outsider = models.Student(user_id=users[0].id, batch_id=own.id), models.Student(user_id=users[1].id, batch_id=other.id)
+    async_db.add_all([member, outsider])
+    await async_db.flush()
+    own_id, member_id, outsider_id = own.id, member.id, outsider.id
+    user_ids = [u.id for u in users]
+    await async_db.commit()
+
+    async def ensure_loaded_async(db):
+        pass
+    # The in-memory index may lag behind batch moves; the database decides who belongs to the batch
+    monkeypatch.setattr(face_index, "ensure_loaded_async", ensure_loaded_async)
+    monkeypatch.setattr(face_index, "search_batch", lambda embeddings, k=1, batch_id=None: [[(1, u, 0.1)] for u in user_ids])
+    embedding = ",".join(["0.0"] * 128)
+    payload = {"items": [{"embedding": embedding}, {"embedding": embedding}], "batch_id": own_id, "date": "2024-07-01"}
+
+    resp = await async_client.post("/api/attendance/face-checkin/batch", json=payload, headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert [(r["status"], r["student_id"]) for r in resp.json()["results"]] == [("recognized", member_id), ("unknown", None)]
+    written = (await async_db.execute(
+        select(models.Attendance.student_id).where(models.Attendance.student_id.in_((member_id, outsider_id)))
+    )).scalars().all()
+    assert written == [member_id]
+
+@pytest.mark.asyncio
+async def test_face_checkin_records_attendance_for_matched_student(async_client: AsyncClient, async_db, monkeypatch):
+    from sqlalchemy import func, select
+    from app.db import models
+    from app.services.face_index import face_index
+
+    user_data = {
+        "username": "facecheckin",
+        "email": "facecheckin@example.com",
+        "full_name": "Face Checkin",
+        "role": "student",
+        "password": "facepass"
+    }
+    await async_client.post("/api/auth/register", json=user_data)
+    login = await async_client.post("/api/auth/login", json={"username": "facecheckin", "password": "facepass"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    user_id = (await async_db.execute(select(models.User.id).where(models.User.username == "facecheckin"))).scalar_one()
+    # A student id that differs from the user id, so one cannot pass for the other
+    student_id = max((await async_db.execute(select(func.max(models.Student.id)))).scalar() or 0, user_id) + 1
+    async_db.add(models.Student(id=student_id, user_id=user_id))
+    await async_db.commit()
+
+    async def ensure_loaded_async(db):
+        pass
+    matched_user = {"id": user_id}
+    monkeypatch.setattr(face_index, "ensure_loaded_async", ensure_loaded_async)
+    monkeypatch.setattr(face_index, "search", lambda embedding, k=1, batch_id=None: [(1, matched_user["id"], 0.1)])
+    payload = {"embedding": ",".join(["0.0"] * 128)}
+
+    resp = await async_client.post("/api/attendance/face-checkin", json=payload, headers=headers)
+    assert resp.status_code == 200, resp.text
+    attendance = (await async_db.execute(
+        select(models.Attendance.student_id).where(models.Attendance.id == resp.json()["attendance_id"])
+    )).scalar_one()
+    assert attendance == student_id
+
+    matched_user["id"] = user_id + 1000
+    resp = await async_client.post("/api/attendance/face-checkin", json=payload, headers=headers)
+    assert resp.status_code == 400 and resp.json()["detail"] == "Matched user is not a student"
+
+@pytest.mark.asyncio
+async def test_batch_attendance_query_count_is_constant(async_db):
+    from sqlalchemy import event
+    from app.db import models
+    from app.services.attendance_service import get_batch_attendance_async
+
+    async def make_batch(name: str, size: int) -> int:
+        batch = models.Batch(name=name)
+        async_db.add(batch)
+        await async_db.flush()
+        batch_id = batch.id
+        for i in range(size):
+            user = models.User(
+                username=f"{name}_student_{i}",
+                email=f"{name}_student_{i}@example.com",
+                full_name=f"{name} Student {i}",
+                hashed_password="x",
+                role="student"
+            )
+            async_db.add(user)
+            await async_db.flush()
+            student = models.Student(user_id=user.id, batch_id=batch_id, roll_number=str(i))
+            async_db.add(student)
+            await async_db.flush()
+            async_db.add(models.Attendance(student_id=student.id, date=datetime.date.today(), status="present"))
+        await async_db.commit()
+        return batch_id
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    counts = {}
+    for name, size in (("small", 2), ("large", 12)):
+        batch_id = await make_batch(name, size)
+        statements.clear()
+        event.listen(async_db.bind.sync_engine, "before_cursor_execute", count)
+        try:
+            report = await get_batch_attendance_async(async_db, batch_id, datetime.date.today())
+        finally:
+            event.remove(async_db.bind.sync_engine, "before_cursor_execute", count)
+        assert len(report["students"]) == size
+        assert all(len(s["attendance"]) == 1 for s in report["students"])
+        counts[name] = len(statements)
+    assert counts["small"] == counts["large"] == 2
+
+@pytest.mark.asyncio
+async def test_check_in_upsert_reports_duplicates(async_db):
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import check_in_async
+
+    attendance = AttendanceCreate(student_id=9001, date=datetime.date.today(), status="present")
+    first = await check_in_async(async_db, attendance)
+    assert first is not None and first.id
+    assert first.status == "present"
+    assert await check_in_async(async_db, attendance) is None
+
+@pytest.mark.asyncio
+async def test_bulk_check_in_tolerates_rows_written_concurrently(async_db):
+    from sqlalchemy import event
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import bulk_check_in_async
+
+    day = datetime.date(2024, 3, 4)
+    # Written by another request after the kiosk batch was matched
+    async_db.add(models.Attendance(student_id=9201, date=day, status="present"))
+    await async_db.commit()
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+    event.listen(async_db.bind.sync_engine, "before_cursor_execute", record)
+    try:
+        records = await bulk_check_in_async(async_db, [
+            AttendanceCreate(student_id=student_id, date=day, status="present") for student_id in (9201, 9202, 9202, 9203)
+        ])
+    finally:
+        event.remove(async_db.bind.sync_engine, "before_cursor_execute", record)
+
+    assert [record is not None for record in records] == [False, True, False, True]
+    assert records[1].student_id == 9202 and records[1].id and records[3].student_id == 9203
+    assert statements.count("INSERT") >= 1 and "SELECT" not in statements[:statements.index("INSERT")]
+
+@pytest.mark.asyncio
+async def test_attendance_history_filters_and_pages(async_db):
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import check_in_async, attendance_history_async
+
+    start = datetime.date(2024, 3, 1)
+    for day in range(5):
+        await check_in_async(async_db, AttendanceCreate(
+            student_id=9002, date=start + datetime.timedelta(days=day), status="present"
+        ))
+
+    records = await attendance_history_async(async_db, 9002)
+    assert [r.date.day for r in records] == [5, 4, 3, 2, 1]
+    # Filter arguments are part of the cache key
+    records = await attendance_history_async(
+        async_db, 9002, from_date=datetime.date(2024, 3, 2), to_date=datetime.date(2024, 3, 4)
+    )
+    assert [r.date.day for r in records] == [4, 3, 2]
+
+    first_page = await attendance_history_async(async_db, 9002, limit=2)
+    last = first_page[-1]
+    next_page = await attendance_history_async(async_db, 9002, before_date=last.date, before_id=last.id, limit=2)
+    assert [r.date.day for r in first_page + next_page] == [5, 4, 3, 2]
+
+@pytest.mark.asyncio
+async def test_attendance_summary_matches_rebuild(async_db):
+    from sqlalchemy import select
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import (
+        check_in_async, bulk_check_in_async, get_batch_summary_async, rebuild_attendance_summary
+    )
+
+    batch = models.Batch(name="Summary Batch")
+    async_db.add(batch)
+    await async_db.flush()
+    batch_id = batch.id
+    students = [models.Student(batch_id=batch_id) for _ in range(2)]
+    async_db.add_all(students)
+    await async_db.flush()
+    first, second = students[0].id, students[1].id
+    await async_db.commit()
+
+    for day, status in ((1, "present"), (2, "absent"), (31, "present")):
+        await check_in_async(async_db, AttendanceCreate(student_id=first, date=datetime.date(2024, 1, day), status=status))
+    await check_in_async(async_db, AttendanceCreate(student_id=first, date=datetime.date(2024, 1, 1), status="present"))
+    await bulk_check_in_async(async_db, [
+        AttendanceCreate(student_id=second, date=datetime.date(2024, 2, day), status="present") for day in (1, 2)
+    ])
+
+    summary = await get_batch_summary_async(async_db, batch_id)
+    assert summary["total"] == 5
+    assert [(m["month"], m["total"]) for m in summary["months"]] == [("2024-01", 3), ("2024-02", 2)]
+    assert {s["student_id"]: s["attendance_rate"] for s in summary["students"]} == {first: 66.7, second: 100.0}
+
+    summary_rows = select(
+        models.AttendanceSummary.student_id, models.AttendanceSummary.batch_id,
+        models.AttendanceSummary.month, models.AttendanceSummary.status, models.AttendanceSummary.count
+    ).where(models.AttendanceSummary.student_id.in_((first, second)))
+    incremental = sorted((await async_db.execute(summary_rows)).all())
+    await async_db.run_sync(rebuild_attendance_summary)
+    assert len(incremental) == 3
+    assert sorted((await async_db.execute(summary_rows)).all()) == incremental
+
+@pytest.mark.asyncio
+async def test_mark_batch_attendance_upserts_members_only(async_db):
+    from app.db import models
+    from app.services.attendance_service import mark_batch_attendance_async, get_student_summary_async
+
+    batch, other = models.Batch(name="Roll Call"), models.Batch(name="Other")
+    async_db.add_all([batch, other])
+    await async_db.flush()
+    batch_id = batch.id
+    students = [models.Student(batch_id=batch_id) for _ in range(3)] + [models.Student(batch_id=other.id)]
+    async_db.add_all(students)
+    await async_db.flush()
+    ids = [s.id for s in students]
+    async_db.add(models.Attendance(student_id=ids[0], date=datetime.date(2024, 5, 1), status="present"))
+    async_db.add(models.Attendance(student_id=ids[1], date=datetime.date(2024, 5, 1), status="present"))
+    await async_db.commit()
+
+    marks = [(ids[0], "present"), (ids[1], "absent"), (ids[2], "present"), (ids[3], "present")]
+    results = await mark_batch_attendance_async(async_db, batch_id, datetime.date(2024, 5, 1), marks)
+    assert [r["result"] for r in results] == ["unchanged", "updated", "created", "not_in_batch"]
+    assert results[2]["attendance_id"] is not None
+    assert results[3]["attendance_id"] is None
+
+    summary = await get_student_summary_async(async_db, ids[1])
+    assert summary["counts"] == {"absent": 1}
+
+@pytest.mark.asyncio
+async def test_mark_batch_attendance_counts_concurrent_check_in_as_update(async_db):
+    import sqlite3
+    from sqlalchemy import event, select
+    from app.db import models
+    from app.services.attendance_service import mark_batch_attendance_async, get_student_summary_async
+
+    batch = models.Batch(name="Racing Roll Call")
+    async_db.add(batch)
+    await async_db.flush()
+    batch_id = batch.id
+    student = models.Student(batch_id=batch_id)
+    async_db.add(student)
+    await async_db.flush()
+    student_id = student.id
+    await async_db.commit()
+
+    day = datetime.date(2024, 8, 5)
+    concurrent = []
+    def check_in_first(conn, cursor, statement, parameters, context, executemany):
+        # Another process checks the student in right before the roll call writes
+        if statement.startswith("INSERT INTO attendance ") and not concurrent:
+            with sqlite3.connect(async_db.bind.url.database) as other:
+                concurrent.append(other.execute(
+                    "INSERT INTO attendance (student_id, date, status) VALUES (?, ?, 'present')", (student_id, day.isoformat())
+                ).lastrowid)
+                other.execute(
+                    "INSERT INTO attendance_summary (student_id, batch_id, month, status, count) VALUES (?, ?, ?, 'present', 1)",
+                    (student_id, batch_id, day.replace(day=1).isoformat())
+                )
+    event.listen(async_db.bind.sync_engine, "before_cursor_execute", check_in_first)
+    try:
+        results = await mark_batch_attendance_async(async_db, batch_id, day, [(student_id, "absent")])
+    finally:
+        event.remove(async_db.bind.sync_engine, "before_cursor_execute", check_in_first)
+
+    assert results == [{"student_id": student_id, "result": "updated", "attendance_id": concurrent[0]}]
+    statuses = (await async_db.execute(
+        select(models.Attendance.status).where(models.Attendance.student_id == student_id)
+    )).scalars().all()
+    assert statuses == ["absent"]
+    summary = await get_student_summary_async(async_db, student_id)
+    assert summary["counts"] == {"absent": 1}
+
+def test_batch_attendance_mark_rejects_unknown_status():
+    from pydantic import ValidationError
+    from app.api.attendance import BatchAttendanceMark
+
+    assert BatchAttendanceMark(student_id=1, status="late").status == "late"
+    with pytest.raises(ValidationError):
+        BatchAttendanceMark(student_id=1, status="on holiday")
+
+@pytest.mark.asyncio
+async def test_mark_batch_attendance_replaces_status_under_check_in_batch(async_db):
+    from sqlalchemy import select, update
+    from app.db import models
+    from app.services.attendance_service import check_in_async, mark_batch_attendance_async
+    from app.schemas.attendance import AttendanceCreate
+
+    before, after = models.Batch(name="Moved From"), models.Batch(name="Moved To")
+    async_db.add_all([before, after])
+    await async_db.flush()
+    before_id, after_id = before.id, after.id
+    student = models.Student(batch_id=before_id)
+    async_db.add(student)
+    await async_db.flush()
+    student_id = student.id
+    await async_db.commit()
+
+    day = datetime.date(2024, 6, 3)
+    await check_in_async(async_db, AttendanceCreate(student_id=student_id, date=day, status="present"))
+    await async_db.execute(update(models.Student).where(models.Student.id == student_id).values(batch_id=after_id))
+    await async_db.commit()
+
+    results = await mark_batch_attendance_async(async_db, after_id, day, [(student_id, "absent")])
+    assert [r["result"] for r in results] == ["updated"]
+
+    counters = (await async_db.execute(
+        select(models.AttendanceSummary.batch_id, models.AttendanceSummary.status, models.AttendanceSummary.count)
+        .where(models.AttendanceSummary.student_id == student_id)
+    )).all()
+    # The present counted under the old batch is removed, not a phantom one under the new batch
+    assert sorted(counters) == [(after_id, "absent", 1)]
+
+@pytest.mark.asyncio
+async def test_moving_a_student_evicts_both_batch_summaries(async_db, monkeypatch):
+    from sqlalchemy import select
+    from app.db import models
+    from app.services import attendance_service
+    from app.services.attendance_service import attendance_batch_tag, attendance_student_tag
+
+    left, joined = models.Batch(name="Left"), models.Batch(name="Joined")
+    async_db.add_all([left, joined])
+    await async_db.flush()
+    student = models.Student(batch_id=left.id)
+    async_db.add(student)
+    await async_db.flush()
+    left_id, joined_id, student_id = left.id, joined.id, student.id
+    await async_db.commit()
+
+    evicted = []
+    monkeypatch.setattr(attendance_service, "invalidate_cache_tags", lambda tags: evicted.append(set(tags)))
+    student = (await async_db.execute(select(models.Student).where(models.Student.id == student_id))).scalar_one()
+    student.batch_id = joined_id
+    await async_db.flush()
+    await async_db.rollback()
+    assert evicted == []
+
+    student = (await async_db.execute(select(models.Student).where(models.Student.id == student_id))).scalar_one()
+    student.batch_id = joined_id
+    await async_db.commit()
+    assert evicted == [{attendance_batch_tag(left_id), attendance_batch_tag(joined_id), attendance_student_tag(student_id)}]
+
+@pytest.mark.asyncio
+async def test_attendance_export_streams_csv_in_chunks(async_db):
+    import csv
+    from app.db import models
+    from app.services.attendance_service import EXPORT_COLUMNS, stream_attendance_export_async
+    from app.services.export_service import csv_stream
+
+    batch = models.Batch(name="Export")
+    async_db.add(batch)
+    await async_db.flush()
+    batch_id = batch.id
+    student = models.Student(batch_id=batch_id, roll_number="R1")
+    async_db.add(student)
+    await async_db.flush()
+    async_db.add_all([
+        models.Attendance(student_id=student.id, date=datetime.date(2024, 6, day), status="present")
+        for day in range(1, 6)
+    ])
+    await async_db.commit()
+
+    chunks = stream_attendance_export_async(
+        async_db, batch_id=batch_id, from_date=datetime.date(2024, 6, 2), chunk_size=2
+    )
+    blocks = [block async for block in csv_stream(EXPORT_COLUMNS, chunks)]
+    assert len(blocks) == 3  # header, then chunks of 2 and 2 rows
+    rows = list(csv.reader("".join(blocks).splitlines()))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert [row[0] for row in rows[1:]] == ["2024-06-02", "2024-06-03", "2024-06-04", "2024-06-05"]
+    assert rows[1][2] == "R1"
+
+@pytest.mark.asyncio
+async def test_write_behind_buffer_flushes_and_replays_journal(async_db, tmp_path, monkeypatch):
+    import json
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services import attendance_buffer as buffer_module
+    from app.services.attendance_buffer import AttendanceWriteBuffer
+
+    monkeypatch.setattr(
+        buffer_module, "AsyncSessionLocal",
+        sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    )
+    journal = tmp_path / "attendance_journal.jsonl"
+    day = datetime.date(2024, 7, 1)
+    # Left over from a crashed run
+    journal.write_text(json.dumps({"student_id": 9101, "date": day.isoformat(), "status": "present"}) + "\n")
+
+    buffer = AttendanceWriteBuffer(enabled=True, flush_interval_ms=60000, journal_path=str(journal))
+    await buffer.start()
+    assert journal.read_text() == ""
+
+    acknowledged = await buffer.check_in_async(async_db, AttendanceCreate(student_id=9102, date=day, status="present"))
+    assert acknowledged is not None and acknowledged.id is None
+    assert await buffer.check_in_async(async_db, AttendanceCreate(student_id=9101, date=day, status="present")) is None
+    assert buffer.pending == 1
+    assert len(journal.read_text().splitlines()) == 1
+
+    await buffer.stop()
+    assert buffer.pending == 0
+    assert journal.read_text() == ""
+    result = await async_db.execute(select(models.Attendance.student_id).where(models.Attendance.date == day))
+    assert sorted(result.scalars().all()) == [9101, 9102]
+
+@pytest.mark.asyncio
+async def test_today_attendance_serves_duplicates_and_roster_from_memory(async_db, monkeypatch):
+    from sqlalchemy import event
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import check_in_async, get_batch_attendance_async
+    from app.services.attendance_today import today_attendance
+
+    for name in ("_day", "_status", "_by_batch", "_batch_of"):
+        monkeypatch.setattr(today_attendance, name, getattr(today_attendance, name))
+    monkeypatch.setattr(today_attendance, "enabled", True)
+
+    today = datetime.date.today()
+    batches = [models.Batch(name="Today A"), models.Batch(name="Today B")]
+    async_db.add_all(batches)
+    await async_db.flush()
+    batch_a, batch_b = batches[0].id, batches[1].id
+    users = [
+        models.User(username=f"today_{i}", email=f"today_{i}@example.com", hashed_password="x", role="student")
+        for i in range(2)
+    ]
+    async_db.add_all(users)
+    await async_db.flush()
+    students = [models.Student(user_id=u.id, batch_id=batch_a, roll_number=str(i)) for i, u in enumerate(users)]
+    async_db.add_all(students)
+    await async_db.flush()
+    ids = [s.id for s in students]
+    async_db.add(models.Attendance(student_id=ids[0], date=today, status="present"))
+    await async_db.commit()
+
+    await today_attendance.load_async(async_db)
+    assert today_attendance.batch_roster(batch_a, today) == {ids[0]: "present"}
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(async_db.bind.sync_engine, "before_cursor_execute", count)
+    try:
+        assert await check_in_async(async_db, AttendanceCreate(student_id=ids[0], date=today, status="late")) is None
+        assert statements == []
+    finally:
+        event.remove(async_db.bind.sync_engine, "before_cursor_execute", count)
+
+    assert await check_in_async(async_db, AttendanceCreate(student_id=ids[1], date=today, status="late")) is not None
+    report = await get_batch_attendance_async(async_db, batch_a, today)
+    assert [s["attendance"] for s in report["students"]] == [
+        [{"date": str(today), "status": "present"}], [{"date": str(today), "status": "late"}]
+    ]
+
+    # Moving a student follows them to the new batch once committed
+    students[1].batch_id = batch_b
+    await async_db.commit()
+    assert today_attendance.batch_roster(batch_a, today) == {ids[0]: "present"}
+    assert today_attendance.batch_roster(batch_b, today) == {ids[1]: "late"}
+
+    # A new day starts empty
+    monkeypatch.setattr(today_attendance, "_day", today - datetime.timedelta(days=1))
+    assert today_attendance.is_checked_in(ids[0], today) is False
+    assert today_attendance.day == today
+
+@pytest.mark.asyncio
+async def test_attendance_events_feed_and_resume(async_db):
+    import asyncio
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_events import AttendanceEventHub, CHECK_IN, RESET, attendance_events
+    from app.services.attendance_service import check_in_async
+
+    batch = models.Batch(name="Live")
+    async_db.add(batch)
+    await async_db.flush()
+    batch_id = batch.id
+    student = models.Student(batch_id=batch_id, roll_number="1")
+    async_db.add(student)
+    await async_db.flush()
+    student_id = student.id
+    await async_db.commit()
+
+    feed = attendance_events.subscribe(batch_id)
+    first = asyncio.ensure_future(feed.__anext__())
+    await asyncio.sleep(0)
+    await check_in_async(async_db, AttendanceCreate(student_id=student_id, date=datetime.date(2024, 8, 1), status="present"))
+    event = await asyncio.wait_for(first, timeout=1)
+    assert event.type == CHECK_IN
+    assert event.data == {"student_id": student_id, "date": "2024-08-01", "status": "present"}
+    await feed.aclose()
+    assert attendance_events.subscriber_count(batch_id) == 0
+
+    # Resuming replays what was missed; a gap beyond the history asks the client to reload
+    hub = AttendanceEventHub(history_size=2)
+    ids = [hub.publish(1, CHECK_IN, {"n": n}).id for n in range(3)]
+    resumed = hub.subscribe(1, last_event_id=ids[1])
+    assert (await resumed.__anext__()).data == {"n": 2}
+    await resumed.aclose()
+    reset = hub.subscribe(1, last_event_id=ids[0] - 1)
+    assert (await reset.__anext__()).type == RESET
+    await reset.aclose()
+    heartbeat = hub.subscribe(1, heartbeat=0.01)
+    assert await heartbeat.__anext__() is None
+    await heartbeat.aclose()
+
+@pytest.mark.asyncio
+async def test_attendance_writes_evict_cached_reads(async_db):
+    from app.core.cache import cache
+    from app.db import models
+    from app.schemas.attendance import AttendanceCreate
+    from app.services.attendance_service import (
+        attendance_history_async, attendance_student_tag, check_in_async, get_student_summary_async,
+        mark_batch_attendance_async
+    )
+
+    batch = models.Batch(name="Cached")
+    async_db.add(batch)
+    await async_db.flush()
+    batch_id = batch.id
+    student = models.Student(batch_id=batch_id, roll_number="1")
+    async_db.add(student)
+    await async_db.flush()
+    student_id = student.id
+    await async_db.commit()
+
+    day = datetime.date(2024, 9, 2)
+    await check_in_async(async_db, AttendanceCreate(student_id=student_id, date=day, status="present"))
+    assert len(await attendance_history_async(async_db, student_id)) == 1
+    assert (await get_student_summary_async(async_db, student_id))["counts"] == {"present": 1}
+
+    await check_in_async(async_db, AttendanceCreate(student_id=student_id, date=day + datetime.timedelta(days=1), status="late"))
+    assert len(await attendance_history_async(async_db, student_id)) == 2
+    await mark_batch_attendance_async(async_db, batch_id, day, [(student_id, "absent")])
+    assert (await get_student_summary_async(async_db, student_id))["counts"] == {"absent": 1, "late": 1}
+
+    # A read that started before a write does not cache its possibly stale result
+    versions = cache.tag_versions([attendance_student_tag(student_id)])
+    cache.invalidate_tags([attendance_student_tag(student_id)])
+    assert not cache.set("stale", [], tags=[attendance_student_tag(student_id)], tag_versions=versions)
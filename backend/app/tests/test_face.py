@@ -130,5 +130,86 @@ async def test_get_my_face_images(async_client: AsyncClient):
     images = response.json()
     assert isinstance(images, list)
     if images:
-        assert "image_data" in images[0]
+        assert "image_url" in images[0]
+        assert "image_data" not in images[0]
         assert "user_id" in images[0]
+
+@pytest.mark.asyncio
+async def test_upload_near_duplicate_is_not_stored(async_client: AsyncClient):
+    token = await get_student_token(async_client)
+    img_base64 = await load_image_base64(async_client, "face1.jpg")
+    payload = {"image_data": img_base64, "created_at": str(date.today())}
+    headers = {"Authorization": f"Bearer {token}"}
+    first = await async_client.post("/api/face/upload", json=payload, headers=headers)
+    second = await async_client.post("/api/face/upload", json=payload, headers=headers)
+    assert first.status_code in (200, 201), first.text
+    assert second.json()["id"] == first.json()["id"]
+    assert second.json()["duplicate"] is True
+    images = (await async_client.get("/api/face/my-images", headers=headers)).json()
+    assert len(images) == 1
+
+@pytest.mark.asyncio
+async def test_face_image_is_only_served_to_its_owner(async_client: AsyncClient, async_db, tmp_path, monkeypatch):
+    from sqlalchemy import select
+    from app.core.settings import settings
+    from app.db import models
+    from app.services.file_storage_service import FileStorageService
+
+    monkeypatch.setattr(settings, "FACE_IMAGE_DIR", str(tmp_path))
+    token = await get_student_token(async_client)
+    owner_id = (await async_db.execute(select(models.User.id).where(models.User.username == "student1"))).scalar_one()
+    content = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8/x8AAwMB/6X6kXwAAAAASUVORK5CYII=")
+    image_path = FileStorageService.save_content_addressed(content, ext=".png", base_dir=str(tmp_path))
+    face = models.FaceImage(user_id=owner_id, image_path=image_path, created_at=date.today())
+    async_db.add(face)
+    await async_db.flush()
+    face_id = face.id
+    await async_db.commit()
+
+    headers = {"Authorization": f"Bearer {token}"}
+    images = (await async_client.get("/api/face/my-images", headers=headers)).json()
+    assert next(i for i in images if i["id"] == face_id)["image_url"] == f"/api/face/{face_id}/image"
+    response = await async_client.get(f"/api/face/{face_id}/image", headers=headers)
+    assert response.status_code == 200 and response.content == content
+
+    await async_client.post("/api/auth/register", json={
+        "username": "student2", "email": "student2@example.com", "full_name": "Student Two",
+        "password": "password", "role": "student"
+    })
+    login = await async_client.post("/api/auth/login", json={"username": "student2", "password": "password"})
+    other = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert (await async_client.get(f"/api/face/{face_id}/image", headers=other)).status_code == 403
+    assert (await async_client.get(f"/api/face/{face_id}/image")).status_code == 401
+    # Face images are not reachable through the public uploads mount
+    assert (await async_client.get(f"/api/static/uploads/face_images/{image_path}")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_does_not_mutate_stored_record(async_db, monkeypatch):
+    from sqlalchemy import inspect
+    from app.core.embedding_codec import encode_embedding
+    from app.db import models
+    from app.schemas.face import FaceImageCreate
+    from app.services import face_service
+    from app.services.face_compute import FaceComputeResult
+
+    user = models.User(username="face_duplicate", email="face_duplicate@example.com", hashed_password="x", role="student")
+    async_db.add(user)
+    await async_db.flush()
+    existing = models.FaceImage(user_id=user.id, embedding_vector=encode_embedding([0.0] * 128), created_at=date.today())
+    async_db.add(existing)
+    await async_db.flush()
+    user_id, face_id = user.id, existing.id
+
+    async def extract_embedding(image_bytes):
+        return FaceComputeResult(embedding=[0.0] * 128, face_count=1)
+    async def ensure_loaded_async(db):
+        pass
+    monkeypatch.setattr(face_service.face_compute, "extract_embedding", extract_embedding)
+    monkeypatch.setattr(face_service.face_index, "ensure_loaded_async", ensure_loaded_async)
+    monkeypatch.setattr(face_service.FaceService, "_find_duplicate", staticmethod(lambda embedding, user_id: face_id))
+
+    response = await face_service.FaceService.create_face_image_async(
+        async_db, user_id, FaceImageCreate(image_data=base64.b64encode(b"image").decode())
+    )
+    assert response.id == face_id and response.duplicate is True
+    assert "duplicate" not in vars(existing) and not inspect(existing).modified
@@ -0,0 +1,92 @@
+from io import BytesIO
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from app.services.face_compute import FaceComputeService, crop_face, map_face_location, prepare_face_image
+
+def make_jpeg(width: int, height: int) -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (120, 90, 60)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+def test_face_compute_rejects_when_saturated():
+    service = FaceComputeService(max_workers=1, max_queue=1, retry_after=3)
+    service._acquire()
+    service._acquire()
+    with pytest.raises(HTTPException) as exc_info:
+        service._acquire()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "3"
+    service._release()
+    service._acquire()
+    assert service.in_flight == 2
+
+def test_prepare_face_image_downscales_for_detection():
+    image, detect_image, scale = prepare_face_image(make_jpeg(4000, 3000), detect_max_dimension=800, decode_max_dimension=1600)
+    assert max(image.shape[:2]) == 1600
+    assert detect_image.shape[:2] == (600, 800)
+    assert scale == pytest.approx(2.0)
+    image, detect_image, scale = prepare_face_image(make_jpeg(300, 200), detect_max_dimension=800, decode_max_dimension=1600)
+    assert image.shape[:2] == detect_image.shape[:2] == (200, 300)
+    assert scale == 1.0
+    with pytest.raises(ValueError):
+        prepare_face_image(b"not an image")
+
+def test_face_location_maps_back_and_crops_with_margin():
+    image = np.zeros((1200, 1600, 3), dtype=np.uint8)
+    location = map_face_location((100, 300, 200, 200), 2.0, image.shape)
+    assert location == (200, 600, 400, 400)
+    crop, crop_location = crop_face(image, location, margin=0.5)
+    assert crop.shape[:2] == (400, 400)
+    assert crop_location == (100, 300, 300, 100)
+
+@pytest.mark.asyncio
+async def test_extract_embeddings_reports_worker_errors_per_image(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services import face_compute as face_compute_module
+    from app.services.face_compute import FaceComputeResult
+
+    def compute(image_bytes, detect_max_dimension, decode_max_dimension):
+        if image_bytes == b"crash":
+            raise RuntimeError("dlib failure")
+        if image_bytes == b"invalid":
+            raise ValueError("Invalid image format")
+        return FaceComputeResult(embedding=[0.0] * 128, face_count=1, timings={"started_at": 0.0})
+    monkeypatch.setattr(face_compute_module, "compute_face_embedding", compute)
+    service = FaceComputeService(max_workers=2, max_queue=2)
+    service._executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        results = await service.extract_embeddings([b"ok", b"crash", b"invalid"])
+    finally:
+        service._executor.shutdown()
+    assert results[0].error is None and results[0].face_count == 1
+    assert results[1].embedding is None and results[1].error == "Face processing failed: dlib failure"
+    assert results[2].error == "Invalid image format"
+    assert service.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_replaced_and_reported_as_busy(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    from app.services import face_compute as face_compute_module
+    from app.services.face_compute import FaceComputeResult
+
+    def compute(image_bytes, detect_max_dimension, decode_max_dimension):
+        if image_bytes == b"crash":
+            raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+        return FaceComputeResult(embedding=None, face_count=0, timings={"started_at": 0.0})
+    monkeypatch.setattr(face_compute_module, "compute_face_embedding", compute)
+    service = FaceComputeService(max_workers=1, max_queue=1, retry_after=4)
+    broken = service._executor = ThreadPoolExecutor(max_workers=1)
+    with pytest.raises(HTTPException) as exc_info:
+        await service.extract_embedding(b"crash")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "4"
+    assert service._executor is None and service.in_flight == 0
+
+    service._executor = ThreadPoolExecutor(max_workers=1)
+    results = await service.extract_embeddings([b"ok", b"crash"])
+    assert results[0].error is None and "stopped unexpectedly" in results[1].error
+    assert service._executor is None
+    broken.shutdown()
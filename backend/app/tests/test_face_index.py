@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+from app.core.embedding_codec import encode_embedding, decode_embedding, format_embedding, parse_embedding, EMBEDDING_BYTES
+from app.services.face_ann import IVFIndex
+from app.services.face_index import FaceEmbeddingIndex
+
+def make_embedding(seed: int):
+    rng = np.random.default_rng(seed)
+    return rng.random(128).astype(np.float32)
+
+def test_parse_embedding_formats():
+    vector = make_embedding(1)
+    as_json = "[" + ",".join(str(float(x)) for x in vector) + "]"
+    as_csv = ",".join(str(float(x)) for x in vector)
+    assert np.allclose(parse_embedding(as_json), vector)
+    assert np.allclose(parse_embedding(as_csv), vector)
+    assert parse_embedding("not_a_valid_embedding") is None
+    assert parse_embedding("[1.0, 2.0]") is None
+
+def test_embedding_codec_roundtrip():
+    vector = make_embedding(2)
+    data = encode_embedding(vector)
+    assert len(data) == EMBEDDING_BYTES
+    assert np.array_equal(decode_embedding(data), vector)
+    assert np.array_equal(parse_embedding(data), vector)
+    assert np.allclose(parse_embedding(format_embedding(data)), vector)
+    assert decode_embedding(data[:-4]) is None
+    with pytest.raises(ValueError):
+        encode_embedding([0.1, 0.2])
+
+def test_search_returns_nearest_first():
+    index = FaceEmbeddingIndex(initial_capacity=2)
+    for face_id in range(1, 11):
+        index.add(face_id, user_id=face_id * 10, embedding=encode_embedding(make_embedding(face_id)))
+    assert len(index) == 10
+    probe = make_embedding(7)
+    matches = index.search(probe, k=3)
+    assert len(matches) == 3
+    assert matches[0][0] == 7
+    assert matches[0][1] == 70
+    assert matches[0][2] == pytest.approx(0.0, abs=1e-5)
+    assert matches[0][2] <= matches[1][2] <= matches[2][2]
+
+def test_search_restricted_to_user():
+    index = FaceEmbeddingIndex()
+    index.add(1, user_id=1, embedding=make_embedding(1))
+    index.add(2, user_id=2, embedding=make_embedding(2))
+    matches = index.search(make_embedding(1), k=5, user_id=2)
+    assert [m[0] for m in matches] == [2]
+    assert index.count(1) == 1
+    assert index.search(make_embedding(1), user_id=3) == []
+
+def test_remove_keeps_remaining_rows_searchable():
+    index = FaceEmbeddingIndex()
+    for face_id in range(1, 6):
+        index.add(face_id, user_id=face_id, embedding=make_embedding(face_id))
+    assert index.remove(2)
+    assert not index.remove(2)
+    assert len(index) == 4
+    for face_id in (1, 3, 4, 5):
+        assert index.search(make_embedding(face_id), k=1)[0][0] == face_id
+
+def test_search_batch_matches_single_search():
+    index = FaceEmbeddingIndex()
+    for face_id in range(1, 51):
+        index.add(face_id, user_id=face_id % 7, embedding=make_embedding(face_id))
+    probes = np.stack([make_embedding(seed) for seed in (3, 17, 42, 99)])
+    batch = index.search_batch(probes, k=2)
+    assert len(batch) == 4
+    for probe, matches in zip(probes, batch):
+        assert matches == index.search(probe, k=2)
+    assert batch[0][0][0] == 3
+
+def test_search_restricted_to_batch():
+    index = FaceEmbeddingIndex()
+    index.load(
+        [(face_id, face_id, make_embedding(face_id)) for face_id in range(1, 7)],
+        user_batches=[(1, 10), (2, 10), (3, 10), (4, 20), (5, 20)]
+    )
+    matches = index.search(make_embedding(4), k=10, batch_id=10)
+    assert sorted(m[1] for m in matches) == [1, 2, 3]
+    assert index.search(make_embedding(4), k=1, batch_id=20)[0][0] == 4
+    assert index.search(make_embedding(4), batch_id=30) == []
+    assert index.count(batch_id=20) == 2
+    # Face 6 belongs to a user without a batch: only reachable through the global search
+    assert index.search(make_embedding(6), k=1)[0][0] == 6
+
+def test_batch_membership_follows_add_remove_and_moves():
+    index = FaceEmbeddingIndex()
+    index.load([], user_batches=[(1, 10), (2, 20)])
+    index.add(1, user_id=1, embedding=make_embedding(1))
+    index.add(2, user_id=2, embedding=make_embedding(2))
+    assert index.count(batch_id=10) == 1
+    index.set_user_batch(2, 10)
+    assert index.count(batch_id=10) == 2
+    assert index.count(batch_id=20) == 0
+    index.remove(1)
+    assert [m[0] for m in index.search(make_embedding(1), k=5, batch_id=10)] == [2]
+    index.set_user_batch(2, None)
+    assert index.count(batch_id=10) == 0
+    assert len(index) == 1
+
+def load_ann_index(ann, count=2000):
+    index = FaceEmbeddingIndex(ann=ann)
+    rng = np.random.default_rng(0)
+    vectors = rng.random((count, 128)).astype(np.float32)
+    index.load([(face_id, face_id, vectors[face_id - 1]) for face_id in range(1, count + 1)])
+    return index, vectors
+
+def test_ann_search_finds_stored_faces_and_persists(tmp_path):
+    path = str(tmp_path / "face_ann.npz")
+    index, vectors = load_ann_index(IVFIndex(n_lists=16, n_probe=1, min_size=100, path=path))
+    for face_id in (1, 500, 2000):
+        match = index.search(vectors[face_id - 1], k=1)[0]
+        assert match[0] == face_id
+        assert match[2] == pytest.approx(0.0, abs=1e-5)
+    # Adds and removes are reflected without retraining
+    index.add(5000, user_id=5000, embedding=make_embedding(5000))
+    assert index.search(make_embedding(5000), k=1)[0][0] == 5000
+    index.remove(500)
+    assert index.search(vectors[499], k=1)[0][0] != 500
+
+    reloaded = IVFIndex(n_lists=16, n_probe=1, min_size=100, path=path)
+    assert reloaded.load(128)
+    assert reloaded.trained_size == 2000
+
+def test_ann_search_with_all_lists_matches_exact_search():
+    index, vectors = load_ann_index(IVFIndex(n_lists=8, n_probe=8, rerank=2000, min_size=100))
+    exact = FaceEmbeddingIndex()
+    exact.load([(face_id, face_id, vectors[face_id - 1]) for face_id in range(1, 2001)])
+    probes = np.stack([make_embedding(seed) for seed in (3, 17, 42)])
+    assert index.search_batch(probes, k=3) == exact.search_batch(probes, k=3)
+
+def test_centroid_pass_matches_exact_search():
+    index = FaceEmbeddingIndex(centroid_candidates=3)
+    exact = FaceEmbeddingIndex()
+    rng = np.random.default_rng(5)
+    users = rng.random((20, 128)).astype(np.float32)
+    face_id = 0
+    for user_id, base in enumerate(users, start=1):
+        for _ in range(4):
+            face_id += 1
+            vector = base + rng.normal(scale=0.01, size=128).astype(np.float32)
+            index.add(face_id, user_id=user_id, embedding=vector)
+            exact.add(face_id, user_id=user_id, embedding=vector)
+    probes = users[[2, 11, 19]] + 0.005
+    assert index.search_batch(probes, k=2) == exact.search_batch(probes, k=2)
+
+def test_centroid_pass_is_off_by_default_so_search_stays_exact():
+    from app.core.settings import Settings
+
+    default = Settings.model_fields["FACE_CENTROID_CANDIDATES"].default
+    assert default == 0
+    # User 1 owns the closest face, but their centroid is dragged far away by a second face
+    faces = [(1, 1, np.zeros(128, dtype=np.float32)), (2, 1, np.full(128, 10.0, dtype=np.float32))]
+    faces += [(face_id, face_id, np.full(128, 0.5, dtype=np.float32)) for face_id in range(3, 7)]
+    indexes = {}
+    for candidates in (default, 1):
+        indexes[candidates] = FaceEmbeddingIndex(centroid_candidates=candidates)
+        for face_id, user_id, vector in faces:
+            indexes[candidates].add(face_id, user_id=user_id, embedding=vector)
+    exact = FaceEmbeddingIndex()
+    exact.load(faces)
+    probe = np.full((1, 128), 0.01, dtype=np.float32)
+
+    assert indexes[default].search_batch(probe, k=1) == exact.search_batch(probe, k=1)
+    assert exact.search_batch(probe, k=1)[0][0][1] == 1
+    assert indexes[1].search_batch(probe, k=1)[0][0][1] != 1
+
+def test_centroid_follows_adds_and_removes():
+    index = FaceEmbeddingIndex(centroid_candidates=1)
+    index.add(1, user_id=7, embedding=np.zeros(128, dtype=np.float32))
+    index.add(2, user_id=7, embedding=np.ones(128, dtype=np.float32))
+    assert np.allclose(index.centroid(7), 0.5)
+    index.remove(1)
+    assert np.allclose(index.centroid(7), 1.0)
+    index.remove(2)
+    assert index.centroid(7) is None
@@ -22,3 +22,110 @@ async def test_student_registration_and_test_listing(async_client: AsyncClient):
     resp = await async_client.get("/api/students/tests", headers=headers)
     assert resp.status_code in (200, 403)
     # (You can expand this test to enroll student in a batch, create a test, etc.)
+
+@pytest.mark.asyncio
+async def test_bulk_student_upload_hashes_passwords_in_pool(async_db, monkeypatch):
+    import threading
+    import uuid
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.core import security
+    from app.core.settings import settings
+    from app.db import models
+    from app.schemas.bulk_student import BulkStudentUploadItem
+    from app.services import student_service
+
+    monkeypatch.setattr(settings, "BULK_PASSWORD_HASH_ROUNDS", 4)
+    threads = []
+    get_password_hash = security.get_password_hash
+    def recording_hash(password, rounds=None):
+        threads.append(threading.current_thread().name)
+        return get_password_hash(password, rounds)
+    monkeypatch.setattr(security, "get_password_hash", recording_hash)
+
+    tag = uuid.uuid4().hex[:8]
+    ada, bob = f"ada.{tag}@example.com", f"bob.{tag}@example.com"
+    students = [
+        BulkStudentUploadItem(full_name="Ada", email=ada, batch_name=f"Hash {tag}"),
+        BulkStudentUploadItem(full_name="Bob", email=bob, batch_name=f"Hash {tag}"),
+        BulkStudentUploadItem(full_name="Ada Again", email=ada, batch_name=f"Hash {tag}"),
+    ]
+    Session = sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        response = await student_service.bulk_student_upload_async(db, students)
+
+    assert [r.success for r in response.results] == [True, True, False]
+    assert response.hashing_seconds is not None and response.hashing_seconds >= 0
+    # The duplicate is rejected before hashing
+    assert len(threads) == 2 and all(name.startswith("password-hash") for name in threads)
+    hashed = (await async_db.execute(
+        select(models.User.hashed_password).where(models.User.email == ada)
+    )).scalar_one()
+    assert hashed.startswith("$2b$04$") and security.verify_password("changeme123", hashed)
+
+@pytest.mark.asyncio
+async def test_bulk_student_upload_prefetches_and_inserts_in_chunks(async_db, monkeypatch):
+    import uuid
+    from sqlalchemy import event, select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.core.settings import settings
+    from app.db import models
+    from app.schemas.bulk_student import BulkStudentUploadItem
+    from app.services import student_service
+    from app.services.attendance_today import today_attendance
+    from app.services.face_index import face_index
+
+    monkeypatch.setattr(settings, "BULK_PASSWORD_HASH_ROUNDS", 4)
+    monkeypatch.setattr(student_service, "STUDENT_IMPORT_CHUNK_SIZE", 2)
+    followed, face_batches = {}, {}
+    monkeypatch.setattr(today_attendance, "set_student_batch", lambda student_id, batch_id: followed.__setitem__(student_id, batch_id))
+    monkeypatch.setattr(face_index, "_loaded", True)
+    monkeypatch.setattr(face_index, "set_user_batch", lambda user_id, batch_id: face_batches.__setitem__(user_id, batch_id))
+    tag = uuid.uuid4().hex[:8]
+    existing, new, other = (f"{name} {tag}" for name in ("Existing", "New", "Other"))
+    async_db.add_all([
+        models.Batch(name=existing),
+        models.User(username=f"taken{tag}", email=f"someone{tag}@example.com", hashed_password="x", role="student"),
+    ])
+    await async_db.commit()
+
+    emails = [f"student{i}.{tag}@example.com" for i in range(5)]
+    students = [
+        BulkStudentUploadItem(full_name=f"Student {i}", email=email, batch_name=name, roll_number=str(i))
+        for i, (email, name) in enumerate(zip(emails, [existing, new, existing, new, other]))
+    ] + [
+        BulkStudentUploadItem(full_name="Again", email=emails[1], batch_name=new),
+        BulkStudentUploadItem(full_name="Taken", email=f"taken{tag}@example.org", batch_name=existing),
+    ]
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]))
+    event.listen(async_db.bind.sync_engine, "before_cursor_execute", record)
+    Session = sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as db:
+            response = await student_service.bulk_student_upload_async(db, students)
+    finally:
+        event.remove(async_db.bind.sync_engine, "before_cursor_execute", record)
+
+    assert [r.success for r in response.results] == [True] * 5 + [False, False]
+    assert response.results[5].error == "User with this email already exists"
+    assert response.results[6].error == "User with this username already exists"
+    assert sum(s.startswith("SELECT") for s in statements) == 2
+    assert statements.count("INSERT INTO batches") == 1
+    assert statements.count("INSERT INTO users") == 3 and statements.count("INSERT INTO students") == 3
+
+    rows = (await async_db.execute(
+        select(models.Student.id, models.Student.user_id, models.Batch.name, models.Student.roll_number)
+        .join(models.Batch).join(models.User).where(models.User.email.in_(emails)).order_by(models.User.email)
+    )).all()
+    assert [(name, roll) for _, _, name, roll in rows] == [(existing, "0"), (new, "1"), (existing, "2"), (new, "3"), (other, "4")]
+    batches = (await async_db.execute(
+        select(models.Batch.name, models.Batch.id).where(models.Batch.name.in_((existing, new, other)))
+    )).all()
+    batch_ids = dict(batches)
+    assert len(batches) == 3 and sorted(batch_ids) == sorted((existing, new, other))
+    assert followed == {student_id: batch_ids[name] for student_id, _, name, _ in rows}
+    assert face_batches == {user_id: batch_ids[name] for _, user_id, name, _ in rows}
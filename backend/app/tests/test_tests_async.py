@@ -23,3 +23,183 @@ async def test_create_and_list_tests(async_client: AsyncClient):
     assert resp.status_code == 200
     assert isinstance(resp.json(), list)
     # (You can expand this test to create a batch, then create a test, then list again)
+
+@pytest.mark.asyncio
+async def test_bulk_question_upload_resolves_tests_in_one_query(async_db):
+    from sqlalchemy import event, select
+    from app.db import models
+    from app.schemas.bulk_question import BulkQuestionUploadItem
+    from app.services import test_service
+
+    user = models.User(username="bulkq_instructor", email="bulkq@example.com", hashed_password="x", role="instructor")
+    async_db.add(user)
+    await async_db.flush()
+    instructor = models.Instructor(user_id=user.id)
+    async_db.add(instructor)
+    await async_db.flush()
+    batch = models.Batch(name="Bulk Q", instructor_id=instructor.id)
+    other_batch = models.Batch(name="Other")
+    async_db.add_all([batch, other_batch])
+    await async_db.flush()
+    async_db.add_all([
+        models.Test(name="Quiz A", batch_id=batch.id),
+        models.Test(name="Quiz B", batch_id=batch.id),
+        models.Test(name="Foreign", batch_id=other_batch.id),
+    ])
+    instructor_id, batch_id = instructor.id, batch.id
+    await async_db.commit()
+
+    questions = [
+        BulkQuestionUploadItem(test_name=name, question_text=f"Q{i}", question_type="mcq", options='["a","b"]', correct_answer="a")
+        for i, name in enumerate(["Quiz A", "Quiz B", "Missing", "Foreign"] * 300)
+    ]
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(async_db.bind.sync_engine, "before_cursor_execute", count)
+    try:
+        results = await test_service.bulk_question_upload_async(async_db, questions, instructor_id=instructor_id)
+    finally:
+        event.remove(async_db.bind.sync_engine, "before_cursor_execute", count)
+
+    assert [r.success for r in results[:4]] == [True, True, False, False]
+    assert results[2].error == "Test not found. Please create the test first."
+    assert results[0].question_text == "Q0" and results[0].test_name == "Quiz A"
+    assert sum(r.success for r in results) == 600
+    assert sum(s.lstrip().upper().startswith("SELECT") for s in statements) == 1
+    inserted = (await async_db.execute(
+        select(models.Question.question_text).join(models.Test).where(models.Test.batch_id == batch_id)
+    )).scalars().all()
+    assert len(inserted) == 600
+
+@pytest.mark.asyncio
+async def test_question_import_job_streams_upload_in_chunks(async_db, tmp_path, monkeypatch):
+    import asyncio
+    import io
+    import os
+    import uuid
+    from fastapi import UploadFile
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.db import models
+    from app.services import import_jobs as import_jobs_module
+    from app.services.import_jobs import ImportJobService
+
+    monkeypatch.setattr(
+        import_jobs_module, "AsyncSessionLocal",
+        sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    )
+    batch = models.Batch(name="Import")
+    async_db.add(batch)
+    await async_db.flush()
+    test_name = f"Quiz {uuid.uuid4().hex}"
+    quiz = models.Test(name=test_name, batch_id=batch.id)
+    async_db.add(quiz)
+    await async_db.flush()
+    test_id = quiz.id
+    await async_db.commit()
+
+    lines = ["test_name,question_text,question_type,options,correct_answer"]
+    lines += [f'{test_name if i % 4 else "Missing"},"Q{i}, part two",mcq,"[""a"",""b""]",a' for i in range(250)]
+    lines.append(f"{test_name},,mcq,,")
+    upload_dir = tmp_path / "imports"
+    service = ImportJobService(upload_dir=str(upload_dir), chunk_size=100)
+    job = await service.submit("questions", UploadFile(io.BytesIO("\n".join(lines).encode()), filename="bank.csv"), owner_id=1)
+    await service.join()
+    await service.stop()
+
+    assert service.get(job.id) is job
+    assert job.status == "completed" and job.progress == 100.0
+    assert (job.processed, job.succeeded, job.failed) == (251, 187, 64)
+    assert job.results[0] == {"question_text": "Q0, part two", "test_name": "Missing", "success": False,
+                              "error": "Test not found. Please create the test first."}
+    assert job.results[1]["success"] is True
+    assert job.results[-1]["success"] is False and job.results[-1]["error"].startswith("question_text")
+    assert os.listdir(upload_dir) == []
+    inserted = (await async_db.execute(
+        select(models.Question.question_text).where(models.Question.test_id == test_id)
+    )).scalars().all()
+    assert len(inserted) == 187
+
+@pytest.mark.asyncio
+async def test_import_job_resumes_from_store_after_restart(async_db, tmp_path, monkeypatch):
+    import asyncio
+    import io
+    import uuid
+    from fastapi import UploadFile
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.db import models
+    from app.services import import_jobs as import_jobs_module
+    from app.services.import_jobs import IMPORT_KINDS, ImportJobService, ImportKind
+
+    monkeypatch.setattr(
+        import_jobs_module, "AsyncSessionLocal",
+        sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    )
+    batch = models.Batch(name="Resume")
+    async_db.add(batch)
+    await async_db.flush()
+    test_name = f"Quiz {uuid.uuid4().hex}"
+    quiz = models.Test(name=test_name, batch_id=batch.id)
+    async_db.add(quiz)
+    await async_db.flush()
+    test_id = quiz.id
+    await async_db.commit()
+
+    questions = IMPORT_KINDS["questions"]
+    chunks = []
+    async def stall_after_two_chunks(db, items, instructor_id):
+        chunks.append(len(items))
+        if len(chunks) > 2:
+            await asyncio.Event().wait()  # the process "dies" while writing the third chunk
+        return await questions.handler(db, items, instructor_id)
+    monkeypatch.setitem(IMPORT_KINDS, "questions", ImportKind(questions.item_model, stall_after_two_chunks, questions.result_fields))
+
+    body = "".join(f'{{"test_name": "{test_name}", "question_text": "Q{i}", "question_type": "mcq"}}\n' for i in range(450))
+    options = dict(upload_dir=str(tmp_path / "imports"), chunk_size=100, store_path=str(tmp_path / "jobs.sqlite3"))
+    service = ImportJobService(**options)
+    await service.start()
+    job = await service.submit("questions", UploadFile(io.BytesIO(body.encode()), filename="bank.jsonl"), owner_id=1)
+    while len(chunks) < 3:
+        await asyncio.sleep(0.01)
+    await service.stop()
+    assert job.processed == 200
+
+    monkeypatch.setitem(IMPORT_KINDS, "questions", questions)
+    restarted = ImportJobService(**options)
+    await restarted.start()
+    await restarted.join()
+    resumed = restarted.get(job.id)
+    assert resumed.status == "completed"
+    assert (resumed.processed, resumed.succeeded, resumed.failed) == (450, 450, 0)
+    total, results = restarted.results(resumed, offset=195, limit=10)
+    assert total == 450 and [r["question_text"] for r in results] == [f"Q{i}" for i in range(195, 205)]
+    await restarted.stop()
+    count = (await async_db.execute(
+        select(func.count()).select_from(models.Question).where(models.Question.test_id == test_id)
+    )).scalar()
+    assert count == 450
+
+@pytest.mark.asyncio
+async def test_list_tests_sees_tests_created_in_another_session(async_db):
+    import uuid
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from app.db import models
+    from app.services.test_service import list_tests_async
+
+    Session = sessionmaker(bind=async_db.bind, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        before = len(await list_tests_async(db))
+
+    name = f"Listed {uuid.uuid4().hex}"
+    async with Session() as db:
+        db.add(models.Test(name=name))
+        await db.commit()
+
+    async with Session() as db:
+        tests = await list_tests_async(db)
+    assert len(tests) == before + 1 and name in [t.name for t in tests]
@@ -0,0 +1,288 @@
+"""
+Face pipeline benchmark for the MCQ Test & Attendance System.
+
+Seeds N users with random 128-d embeddings directly into face_images on a throwaway SQLite
+database, then measures:
+
+- POST /api/face/verify (unscoped identification)
+- POST /api/attendance/face-checkin (client-supplied embedding)
+- FaceService._find_best_match called directly
+
+Each enrolment size runs in its own process, so database, index and peak RSS are per size.
+By default the face compute step of /face/verify is replaced by a lookup of the probe embedding,
+so the numbers cover HTTP, matching and database work and the run needs neither dlib nor the
+network; pass --real-compute to run face detection on app/tests/assets/face1.jpg instead.
+
+Usage (from backend/):
+    python -m benchmarks.face_pipeline --sizes 1000 10000 100000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Spread of the synthetic embeddings: random pairs end up ~1.0 apart like different people,
+# probes ~0.25 from their enrolment like new photos of the same person
+EMBEDDING_SCALE = 0.06
+PROBE_NOISE = 0.02
+SEED_CHUNK_SIZE = 5000
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def summarize(samples: List[float], wall_time: float) -> Dict[str, Any]:
+    """Latency percentiles (milliseconds) and throughput for one benchmark target."""
+    latencies = np.asarray(samples) * 1000.0
+    return {
+        "requests": len(samples),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p90_ms": float(np.percentile(latencies, 90)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "throughput_rps": len(samples) / wall_time if wall_time > 0 else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def seed_enrolments(size: int, seed: int) -> np.ndarray:
+    """Insert `size` student users with one random face embedding each; returns the embeddings."""
+    from app.core import security
+    from app.core.embedding_codec import encode_embedding
+    from app.db import models
+    from app.db.session import sync_engine
+
+    models.Base.metadata.create_all(sync_engine)
+    rng = np.random.default_rng(seed)
+    embeddings = (rng.standard_normal((size, 128)) * EMBEDDING_SCALE).astype(np.float32)
+    hashed_password = security.get_password_hash("benchmark")
+    today = date.today()
+
+    with sync_engine.begin() as conn:
+        for offset in range(0, size, SEED_CHUNK_SIZE):
+            end = min(offset + SEED_CHUNK_SIZE, size)
+            conn.execute(models.User.__table__.insert(), [
+                {
+                    "id": i + 1,
+                    "username": f"bench_user_{i + 1}",
+                    "email": f"bench_user_{i + 1}@example.com",
+                    "full_name": f"Bench User {i + 1}",
+                    "hashed_password": hashed_password,
+                    "role": "student",
+                    "is_active": True,
+                }
+                for i in range(offset, end)
+            ])
+            conn.execute(models.FaceImage.__table__.insert(), [
+                {"user_id": i + 1, "embedding_vector": encode_embedding(embeddings[i]), "created_at": today}
+                for i in range(offset, end)
+            ])
+
+    return embeddings
+
+
+async def run_http(client, method: str, url: str, payloads: List[Dict], headers: Dict, concurrency: int):
+    """Send one request per payload and return (latencies, wall time, status code counts)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(payload):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(payload) for payload in payloads))
+    return latencies, time.perf_counter() - start, statuses
+
+
+async def benchmark_size(size: int, requests: int, concurrency: int, seed: int, real_compute: bool) -> Dict[str, Any]:
+    """Seed one enrolment size and measure every target against it (runs in a child process)."""
+    from httpx import AsyncClient, ASGITransport
+    from app.core import security
+    from app.db.session import AsyncSessionLocal
+    from app.main import app
+    from app.services.face_compute import FaceComputeResult, face_compute
+    from app.services.face_index import face_index
+    from app.services.face_service import FaceService
+
+    logging.disable(logging.INFO)
+
+    start = time.perf_counter()
+    embeddings = seed_enrolments(size, seed)
+    seed_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed + 1)
+    requests = min(requests, size)
+    targets = rng.choice(size, size=requests, replace=False)
+    probes = embeddings[targets] + (rng.standard_normal((requests, 128)) * PROBE_NOISE).astype(np.float32)
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await face_index.load_async(db)
+    index_load_seconds = time.perf_counter() - start
+
+    results: Dict[str, Any] = {
+        "size": size,
+        "seed_seconds": seed_seconds,
+        "index_load_seconds": index_load_seconds,
+    }
+
+    # Direct matcher
+    latencies, matched = [], 0
+    wall_start = time.perf_counter()
+    for probe, target in zip(probes, targets):
+        start = time.perf_counter()
+        best = FaceService._find_best_match(probe)
+        latencies.append(time.perf_counter() - start)
+        matched += bool(best and best[0] == target + 1)
+    results["find_best_match"] = summarize(latencies, time.perf_counter() - wall_start)
+    results["find_best_match"]["recall"] = matched / requests
+
+    if real_compute:
+        with open(os.path.join(BACKEND_DIR, "app", "tests", "assets", "face1.jpg"), "rb") as f:
+            image = base64.b64encode(f.read()).decode("utf-8")
+        verify_payloads = [{"image_data": image} for _ in range(requests)]
+    else:
+        # The image payload carries the probe number; the compute step returns that probe's embedding
+        async def lookup_probe(image_bytes: bytes) -> FaceComputeResult:
+            return FaceComputeResult(embedding=probes[int(image_bytes)].tolist(), face_count=1)
+
+        face_compute.extract_embedding = lookup_probe
+        verify_payloads = [{"image_data": base64.b64encode(str(i).encode()).decode()} for i in range(requests)]
+
+    headers = {"Authorization": "Bearer " + security.create_access_token({"sub": "bench_user_1"})}
+    checkin_payloads = [{"embedding": ",".join(f"{x:.6f}" for x in probe)} for probe in probes]
+
+    async with AsyncClient(transport=ASGITransport(app), base_url="http://benchmark") as client:
+        latencies, wall_time, statuses = await run_http(
+            client, "POST", "/api/face/verify", verify_payloads, {}, concurrency
+        )
+        results["face_verify"] = {**summarize(latencies, wall_time), "status_codes": statuses}
+
+        latencies, wall_time, statuses = await run_http(
+            client, "POST", "/api/attendance/face-checkin", checkin_payloads, headers, concurrency
+        )
+        results["face_checkin"] = {**summarize(latencies, wall_time), "status_codes": statuses}
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def run_child(args) -> None:
+    """Entry point of the per-size child process: configure the app, run, print JSON."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(args.workdir, f'face_bench_{args.child}.db')}"
+    os.environ["UPLOAD_DIR"] = os.path.join(args.workdir, "uploads")
+    os.environ["FACE_IMAGE_DIR"] = os.path.join(args.workdir, "face_images")
+    os.environ["FACE_ANN_INDEX_PATH"] = os.path.join(args.workdir, f"face_ann_{args.child}.npz")
+    sys.path.insert(0, BACKEND_DIR)
+
+    results = asyncio.run(
+        benchmark_size(args.child, args.requests, args.concurrency, args.seed, args.real_compute)
+    )
+    print(json.dumps(results))
+
+
+def run_parent(args) -> None:
+    """Run every enrolment size in a fresh process and write the combined results."""
+    from app.core.settings import settings
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "real_compute": args.real_compute,
+            "settings": {
+                "FACE_ANN_ENABLED": settings.FACE_ANN_ENABLED,
+                "FACE_ANN_MIN_SIZE": settings.FACE_ANN_MIN_SIZE,
+                "FACE_ANN_PROBES": settings.FACE_ANN_PROBES,
+                "FACE_CENTROID_CANDIDATES": settings.FACE_CENTROID_CANDIDATES,
+            },
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="face_bench_") as workdir:
+        for size in args.sizes:
+            print(f"Benchmarking {size} enrolments...", file=sys.stderr)
+            command = [
+                sys.executable, "-m", "benchmarks.face_pipeline",
+                "--child", str(size),
+                "--workdir", workdir,
+                "--requests", str(args.requests),
+                "--concurrency", str(args.concurrency),
+                "--seed", str(args.seed),
+            ]
+            if args.real_compute:
+                command.append("--real-compute")
+            completed = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+            if completed.returncode != 0:
+                sys.stderr.write(completed.stderr)
+                raise SystemExit(f"Benchmark for {size} enrolments failed")
+            report["results"].append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark face verification and check-in against synthetic enrolments.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Enrolment sizes to benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per target and size")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight HTTP requests")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for embeddings and probes")
+    parser.add_argument("--real-compute", action="store_true", help="Run face detection on a real image for /face/verify")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args)
+    else:
+        run_parent(args)
+
+
+if __name__ == "__main__":
+    main()
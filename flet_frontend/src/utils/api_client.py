@@ -102,6 +102,32 @@ class APIClient:
             f"/api/v1/tests/{test_id}/result"
         )
     
+    async def get_batch_attendance_summary(
+        self,
+        batch_id: int,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> dict:
+        params = {k: v for k, v in (("from", from_date), ("to", to_date)) if v}
+        return await self._make_request(
+            "GET",
+            f"/api/v1/attendance/summary/batch/{batch_id}",
+            params=params
+        )
+    
+    async def get_student_attendance_summary(
+        self,
+        student_id: int,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None
+    ) -> dict:
+        params = {k: v for k, v in (("from", from_date), ("to", to_date)) if v}
+        return await self._make_request(
+            "GET",
+            f"/api/v1/attendance/summary/student/{student_id}",
+            params=params
+        )
+    
     async def update_profile(self, profile_data: dict) -> dict:
         return await self._make_request(
             "PUT",
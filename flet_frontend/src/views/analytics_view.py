@@ -1,8 +1,54 @@
+import asyncio
 import flet as ft
 from utils.state_manager import StateManager
 from services.permissions_service import PermissionsService
+from components.loading import LoadingIndicator
+from components.error import ErrorDisplay
+
+def rate_color(rate) -> str:
+    if rate is None:
+        return ft.colors.GREY_400
+    if rate >= 80:
+        return ft.colors.GREEN
+    elif rate >= 60:
+        return ft.colors.ORANGE
+    else:
+        return ft.colors.RED
+
+def build_rate_badge(rate) -> ft.Container:
+    return ft.Container(
+        content=ft.Text(
+            f"{rate:.1f}%" if rate is not None else "-",
+            color=ft.colors.WHITE,
+        ),
+        bgcolor=rate_color(rate),
+        padding=ft.padding.all(5),
+        border_radius=5,
+    )
+
+def build_months_table(months: list) -> ft.DataTable:
+    """Monthly totals from an attendance summary response."""
+    return ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Month")),
+            ft.DataColumn(ft.Text("Present"), numeric=True),
+            ft.DataColumn(ft.Text("Total"), numeric=True),
+            ft.DataColumn(ft.Text("Attendance")),
+        ],
+        rows=[
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(month["month"])),
+                ft.DataCell(ft.Text(str(month["counts"].get("present", 0)))),
+                ft.DataCell(ft.Text(str(month["total"]))),
+                ft.DataCell(build_rate_badge(month["attendance_rate"])),
+            ])
+            for month in months
+        ],
+    )
 
 class AnalyticsView(ft.UserControl):
+    """Attendance rates of a batch per month and per student, from the attendance summary endpoint."""
+
     def __init__(
         self,
         page: ft.Page,
@@ -13,15 +59,113 @@ class AnalyticsView(ft.UserControl):
         self.page = page
         self.state_manager = state_manager
         self.permissions_service = permissions_service
+        self.api_client = self.state_manager.get_state("api_client")
+        self.summary = None
+        self.loading = False
+        self.error = None
+        self.batch_field = ft.TextField(
+            label="Batch ID",
+            keyboard_type=ft.KeyboardType.NUMBER,
+            width=150,
+            on_submit=self.handle_load
+        )
+        self.from_field = ft.TextField(label="From (YYYY-MM-DD)", width=180)
+        self.to_field = ft.TextField(label="To (YYYY-MM-DD)", width=180)
         
+    async def handle_load(self, e):
+        await self.load_summary()
+        
+    async def load_summary(self):
+        if not self.batch_field.value or not self.batch_field.value.isdigit():
+            return
+        self.loading = True
+        self.error = None
+        self._render()
+        
+        try:
+            self.summary = await self.api_client.get_batch_attendance_summary(
+                int(self.batch_field.value),
+                from_date=self.from_field.value or None,
+                to_date=self.to_field.value or None
+            )
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.loading = False
+            self._render()
+        
+    def _render(self, update: bool = True):
+        self.body.controls.clear()
+        if self.loading:
+            self.body.controls.append(LoadingIndicator(text="Loading attendance summary..."))
+        elif self.error:
+            self.body.controls.append(ErrorDisplay(
+                message=f"Error loading attendance summary: {self.error}",
+                on_retry=lambda: asyncio.create_task(self.load_summary())
+            ))
+        elif self.summary:
+            self.body.controls.extend(self._build_summary(self.summary))
+        else:
+            self.body.controls.append(ft.Text("Enter a batch ID to see its attendance.", size=16))
+        if update:
+            self.update()
+    
     def build(self):
-        return ft.Container(
-            content=ft.Column(
+        controls = [
+            ft.Text("Analytics", size=32, weight=ft.FontWeight.BOLD),
+            ft.Row(
                 [
-                    ft.Text("Analytics", size=32, weight=ft.FontWeight.BOLD),
-                    ft.Text("Analytics view coming soon...", size=16),
+                    self.batch_field,
+                    self.from_field,
+                    self.to_field,
+                    ft.ElevatedButton(
+                        "Load",
+                        icon=ft.icons.INSIGHTS,
+                        on_click=self.handle_load
+                    ),
                 ],
-                spacing=20,
+                wrap=True,
             ),
+        ]
+        
+        self.body = ft.Column(spacing=20)
+        controls.append(self.body)
+        self._render(update=False)
+        
+        return ft.Container(
+            content=ft.Column(controls, spacing=20, scroll=ft.ScrollMode.AUTO),
             padding=40,
-        )
\ No newline at end of file
+        )
+    
+    def _build_summary(self, summary: dict) -> list:
+        students_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Student")),
+                ft.DataColumn(ft.Text("Present"), numeric=True),
+                ft.DataColumn(ft.Text("Total"), numeric=True),
+                ft.DataColumn(ft.Text("Attendance")),
+            ],
+            rows=[
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(student["name"] or f"Student {student['student_id']}")),
+                    ft.DataCell(ft.Text(str(student["counts"].get("present", 0)))),
+                    ft.DataCell(ft.Text(str(student["total"]))),
+                    ft.DataCell(build_rate_badge(student["attendance_rate"])),
+                ])
+                for student in summary["students"]
+            ],
+        )
+        
+        return [
+            ft.Row(
+                [
+                    ft.Text(f"Batch {summary['batch_id']}: {summary['total']} check-ins", size=18),
+                    build_rate_badge(summary["attendance_rate"]),
+                ],
+                spacing=10,
+            ),
+            ft.Text("By month", size=20, weight=ft.FontWeight.BOLD),
+            build_months_table(summary["months"]),
+            ft.Text("By student", size=20, weight=ft.FontWeight.BOLD),
+            students_table,
+        ]
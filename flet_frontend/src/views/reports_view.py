@@ -1,8 +1,14 @@
+import asyncio
 import flet as ft
 from utils.state_manager import StateManager
 from services.permissions_service import PermissionsService
+from components.loading import LoadingIndicator
+from components.error import ErrorDisplay
+from views.analytics_view import build_months_table, build_rate_badge
 
 class ReportsView(ft.UserControl):
+    """Monthly attendance report of a student, from the attendance summary endpoint."""
+
     def __init__(
         self,
         page: ft.Page,
@@ -13,15 +19,92 @@ class ReportsView(ft.UserControl):
         self.page = page
         self.state_manager = state_manager
         self.permissions_service = permissions_service
+        self.api_client = self.state_manager.get_state("api_client")
+        self.summary = None
+        self.loading = False
+        self.error = None
+        self.student_field = ft.TextField(
+            label="Student ID",
+            keyboard_type=ft.KeyboardType.NUMBER,
+            width=150,
+            on_submit=self.handle_load
+        )
+        self.from_field = ft.TextField(label="From (YYYY-MM-DD)", width=180)
+        self.to_field = ft.TextField(label="To (YYYY-MM-DD)", width=180)
+        
+    async def handle_load(self, e):
+        await self.load_report()
+        
+    async def load_report(self):
+        if not self.student_field.value or not self.student_field.value.isdigit():
+            return
+        self.loading = True
+        self.error = None
+        self._render()
+        
+        try:
+            self.summary = await self.api_client.get_student_attendance_summary(
+                int(self.student_field.value),
+                from_date=self.from_field.value or None,
+                to_date=self.to_field.value or None
+            )
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.loading = False
+            self._render()
         
+    def _render(self, update: bool = True):
+        self.body.controls.clear()
+        if self.loading:
+            self.body.controls.append(LoadingIndicator(text="Generating attendance report..."))
+        elif self.error:
+            self.body.controls.append(ErrorDisplay(
+                message=f"Error generating report: {self.error}",
+                on_retry=lambda: asyncio.create_task(self.load_report())
+            ))
+        elif self.summary:
+            self.body.controls.extend([
+                ft.Row(
+                    [
+                        ft.Text(
+                            f"Student {self.summary['student_id']}: {self.summary['total']} check-ins",
+                            size=18
+                        ),
+                        build_rate_badge(self.summary["attendance_rate"]),
+                    ],
+                    spacing=10,
+                ),
+                build_months_table(self.summary["months"]),
+            ])
+        else:
+            self.body.controls.append(ft.Text("Enter a student ID to generate an attendance report.", size=16))
+        if update:
+            self.update()
+    
     def build(self):
-        return ft.Container(
-            content=ft.Column(
+        controls = [
+            ft.Text("Reports", size=32, weight=ft.FontWeight.BOLD),
+            ft.Row(
                 [
-                    ft.Text("Reports", size=32, weight=ft.FontWeight.BOLD),
-                    ft.Text("Reports view coming soon...", size=16),
+                    self.student_field,
+                    self.from_field,
+                    self.to_field,
+                    ft.ElevatedButton(
+                        "Generate",
+                        icon=ft.icons.SUMMARIZE,
+                        on_click=self.handle_load
+                    ),
                 ],
-                spacing=20,
+                wrap=True,
             ),
+        ]
+        
+        self.body = ft.Column(spacing=20)
+        controls.append(self.body)
+        self._render(update=False)
+        
+        return ft.Container(
+            content=ft.Column(controls, spacing=20, scroll=ft.ScrollMode.AUTO),
             padding=40,
-        )
\ No newline at end of file
+        )